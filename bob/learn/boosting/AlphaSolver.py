@@ -0,0 +1,212 @@
+import numpy
+import scipy.optimize
+import logging
+logger = logging.getLogger('bob.learn.boosting')
+
+from .ExponentialLoss import ExponentialLoss
+from ._library import ExponentialLoss as NativeExponentialLoss
+
+
+def _bucket_statistics(loss_function, targets, previous_scores, current_scores, buckets = None):
+  """Returns the sufficient statistics of the loss function for the current round, or None if the loss does not provide them; the given ``buckets`` are returned, if they were already computed."""
+  if buckets is not None:
+    return buckets
+  if hasattr(loss_function, 'bucket_statistics'):
+    return loss_function.bucket_statistics(targets, previous_scores, current_scores)
+  return None
+
+
+class AlphaSolver:
+  """Base class for all solvers that compute the weights (alpha) of the weak machines in :py:class:`bob.learn.boosting.Boosting`.
+
+  A solver can refuse to compute the weights by returning ``None``, e.g., when it is not applicable to the given loss function.
+  In this case, the next solver is tried.
+  """
+
+  def solve(self, loss_function, targets, previous_scores, current_scores, buckets = None):
+    """Computes the weights of the current weak machine that minimize the loss.
+
+    Keyword parameters
+
+      loss_function : a class derived from :py:class:`bob.learn.boosting.LossFunction`
+        The loss function to minimize
+
+      targets : float <#samples, #outputs>
+        The targets for the samples
+
+      previous_scores : float <#samples, #outputs>
+        The cumulative prediction scores of the samples until the previous round of the boosting
+
+      current_scores : float <#samples, #outputs>
+        The prediction scores of the samples for the current round of the boosting
+
+      buckets : the result of :py:meth:`bob.learn.boosting.LossFunction.bucket_statistics` or ``None``
+        The sufficient statistics of the loss for the current round, if they were already computed by :py:class:`bob.learn.boosting.Boosting`
+
+    Returns : float <#outputs> or None
+      The weights of the current weak machine, or ``None`` if this solver cannot compute them
+    """
+    raise NotImplementedError("This is a pure abstract function. Please implement that in your derived class.")
+
+
+class AnalyticAlphaSolver(AlphaSolver):
+  """Computes the weights in closed form for the exponential loss, as in AdaBoost.
+
+  When all products of targets and weak machine outputs are +1 or -1 (e.g., for stumps or LUTs with outputs +1 and -1), the loss of each output is minimized by:
+
+  .. math:: \\alpha = \\frac12 \\log\\frac{W_+}{W_-}
+
+  where :math:`W_+` and :math:`W_-` are the sums of the sample weights :math:`e^{-t s}` of the correctly and incorrectly classified samples.
+  For other loss functions or outputs, or if one of the sums is zero (i.e., the optimal weight is infinite), ``None`` is returned.
+  """
+
+  def solve(self, loss_function, targets, previous_scores, current_scores, buckets = None):
+    """Computes the weights of the current weak machine; see :py:meth:`AlphaSolver.solve` for details."""
+    if not isinstance(loss_function, (ExponentialLoss, NativeExponentialLoss)):
+      return None
+
+    if buckets is not None:
+      # the empty buckets that pad the outputs have zero weight
+      correct = buckets.m_values == 1.
+      wrong = buckets.m_values == -1.
+      if not numpy.all(correct | wrong | (buckets.m_weights == 0.)):
+        return None
+      weights = buckets.m_weights
+    else:
+      agreement = targets * current_scores
+      correct = agreement == 1.
+      wrong = agreement == -1.
+      if not numpy.all(correct | wrong):
+        return None
+      weights = numpy.exp(-(targets * previous_scores))
+
+    plus = numpy.sum(weights * correct, 0)
+    minus = numpy.sum(weights * wrong, 0)
+    if not numpy.all(plus > 0.) or not numpy.all(minus > 0.):
+      return None
+
+    return 0.5 * numpy.log(plus / minus)
+
+
+class NewtonAlphaSolver(AlphaSolver):
+  """Computes the weights with a vectorized Newton method, safeguarded by bisection, independently for each output.
+
+  This solver requires that the loss is computed independently for each output, and that the loss function provides a ``loss_second_derivative`` function, which is the case for :py:class:`bob.learn.boosting.ExponentialLoss`, :py:class:`bob.learn.boosting.LogitLoss` and :py:class:`bob.learn.boosting.TangentialLoss`.
+  When the loss function provides :py:meth:`bob.learn.boosting.LossFunction.bucket_statistics`, these are used instead, so that each step is independent of the number of samples.
+  First, the root of the gradient sum is bracketed by doubling the weight, starting at 1, until the sign of the gradient sum changes.
+  Inside the bracket, Newton steps are taken, which are replaced by bisection steps whenever they leave the bracket.
+  If no bracket is found up to ``maximum_alpha`` (e.g., when the training samples are separated by the weak machine and the optimal weight is infinite), ``None`` is returned.
+
+  **Constructor Documentation**
+
+  Keyword parameters
+
+    maximum_alpha : float
+      The largest absolute weight that is tested while bracketing the root
+
+    tolerance : float
+      The relative precision of the weights
+
+    maximum_iterations : int
+      The maximum number of Newton or bisection steps
+  """
+
+  def __init__(self, maximum_alpha = 64., tolerance = 1e-10, maximum_iterations = 100):
+    self.m_maximum_alpha = maximum_alpha
+    self.m_tolerance = tolerance
+    self.m_maximum_iterations = maximum_iterations
+
+
+  def solve(self, loss_function, targets, previous_scores, current_scores, buckets = None):
+    """Computes the weights of the current weak machine; see :py:meth:`AlphaSolver.solve` for details."""
+    buckets = _bucket_statistics(loss_function, targets, previous_scores, current_scores, buckets)
+    if buckets is not None:
+      # evaluate the gradient sums in O(#buckets)
+      gradient = buckets.loss_gradient_sum
+      second_derivative = buckets.loss_second_derivative_sum
+
+    elif hasattr(loss_function, 'loss_second_derivative'):
+      def gradient(alpha):
+        return numpy.sum(loss_function.loss_gradient(targets, previous_scores + alpha * current_scores) * current_scores, 0)
+
+      def second_derivative(alpha):
+        return numpy.sum(loss_function.loss_second_derivative(targets, previous_scores + alpha * current_scores) * current_scores ** 2, 0)
+
+    else:
+      return None
+
+    number_of_outputs = targets.shape[1]
+    alpha = numpy.zeros(number_of_outputs)
+    start = gradient(alpha)
+
+    # bracket the root of the gradient sum, such that the gradient is negative at the lower and positive at the upper bound
+    direction = numpy.where(start > 0., -1., 1.)
+    lower, upper = numpy.zeros(number_of_outputs), numpy.zeros(number_of_outputs)
+    previous = numpy.zeros(number_of_outputs)
+    searching = start != 0.
+    step = 1.
+    while searching.any():
+      if step > self.m_maximum_alpha:
+        logger.debug("Could not bracket the optimal weight up to %f; the optimal weight might be infinite", self.m_maximum_alpha)
+        return None
+      probe = numpy.where(searching, direction * step, 0.)
+      closed = searching & (gradient(probe) * direction >= 0.)
+      lower = numpy.where(closed, numpy.minimum(previous, probe), lower)
+      upper = numpy.where(closed, numpy.maximum(previous, probe), upper)
+      previous = numpy.where(searching, probe, previous)
+      searching &= ~closed
+      step *= 2.
+
+    # Newton steps inside the brackets, or bisection when they leave the brackets
+    alpha = 0.5 * (lower + upper)
+    for iteration in range(self.m_maximum_iterations):
+      g = gradient(alpha)
+      lower = numpy.where(g <= 0., alpha, lower)
+      upper = numpy.where(g >= 0., alpha, upper)
+
+      h = second_derivative(alpha)
+      with numpy.errstate(divide='ignore', invalid='ignore'):
+        newton = alpha - g / h
+      inside = (h > 0.) & (newton > lower) & (newton < upper)
+      update = numpy.where(inside, newton, 0.5 * (lower + upper))
+
+      precision = self.m_tolerance * (1. + numpy.abs(alpha))
+      converged = (g == 0.) | (upper - lower <= precision) | (inside & (numpy.abs(update - alpha) <= precision))
+      if converged.all():
+        return numpy.where(inside & (g != 0.), update, alpha)
+      alpha = numpy.where(converged, alpha, update)
+
+    logger.debug("The Newton method did not converge in %d iterations", self.m_maximum_iterations)
+    return alpha
+
+
+class LBFGSAlphaSolver(AlphaSolver):
+  """Computes the weights using the ``scipy.optimize.fmin_l_bfgs_b`` function.
+
+  This solver can be used with any loss function, including the ones that combine several outputs, such as the :py:class:`bob.learn.boosting.JesorskyLoss`.
+  When the loss function provides :py:meth:`bob.learn.boosting.LossFunction.bucket_statistics`, these are optimized instead.
+  It returns ``None`` only if L-BFGS failed and returned zero weights.
+  """
+
+  def solve(self, loss_function, targets, previous_scores, current_scores, buckets = None):
+    """Computes the weights of the current weak machine; see :py:meth:`AlphaSolver.solve` for details."""
+    number_of_outputs = targets.shape[1]
+    # the loss and its gradient are computed together, so that the scores are combined only once per evaluation
+    # if possible, the samples are grouped into buckets, so that each evaluation is independent of the number of samples
+    buckets = _bucket_statistics(loss_function, targets, previous_scores, current_scores, buckets)
+    alpha, _, flags = scipy.optimize.fmin_l_bfgs_b(
+        func   = buckets.loss_and_gradient_sum if buckets is not None else loss_function.loss_and_gradient_sum,
+        x0     = numpy.zeros(number_of_outputs),
+        args   = () if buckets is not None else (targets, previous_scores, current_scores),
+#        disp = 1
+    )
+    # check output of L-BFGS
+    if flags['warnflag'] != 0:
+      msg = "too many function evaluations or too many iterations" if flags['warnflag'] == 1 else flags['task']
+      if (alpha == numpy.zeros(number_of_outputs)).all():
+        logger.warn("L-BFGS returned zero weights with error '%d': %s" % (flags['warnflag'], msg))
+        return None
+      else:
+        logger.warn("L-BFGS returned warning '%d': %s" % (flags['warnflag'], msg))
+
+    return alpha
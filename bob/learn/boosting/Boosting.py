@@ -1,6 +1,9 @@
 from ._library import BoostedMachine
+from .AlphaSolver import AnalyticAlphaSolver, NewtonAlphaSolver, LBFGSAlphaSolver
+import bob.io.base
 import numpy
-import scipy.optimize
+import os
+import time
 import logging
 logger = logging.getLogger('bob.learn.boosting')
 
@@ -21,12 +24,23 @@ class Boosting:
     loss_function : a class derived from :py:class:`bob.learn.boosting.LossFunction`
       The function to define the weights for the weak machines.
 
+    alpha_solvers : [:py:class:`bob.learn.boosting.AlphaSolver`] or None
+      The solvers that compute the weights of the weak machines; in each round, they are tried in the given order until one of them returns the weights.
+      By default, the :py:class:`bob.learn.boosting.AnalyticAlphaSolver` and the :py:class:`bob.learn.boosting.NewtonAlphaSolver` are tried, and the :py:class:`bob.learn.boosting.LBFGSAlphaSolver` is the fallback.
+      If no solver returns weights, the training stops.
+
+    gradient_refresh_rounds : int or None
+      If the loss function updates the loss gradient incrementally (see :py:meth:`bob.learn.boosting.LossFunction.update_loss_gradient`), the rounding errors of the updates accumulate over the rounds.
+      To bound them, the loss gradient is recomputed from the prediction scores after every ``gradient_refresh_rounds`` rounds; use ``None`` to never recompute it.
+
   """
 
 
-  def __init__(self, weak_trainer, loss_function):
+  def __init__(self, weak_trainer, loss_function, alpha_solvers = None, gradient_refresh_rounds = 100):
     self.m_trainer = weak_trainer
     self.m_loss_function = loss_function
+    self.m_alpha_solvers = alpha_solvers if alpha_solvers is not None else [AnalyticAlphaSolver(), NewtonAlphaSolver(), LBFGSAlphaSolver()]
+    self.m_gradient_refresh_rounds = gradient_refresh_rounds
 
 
   def get_loss_function(self):
@@ -34,15 +48,85 @@ class Boosting:
     return self.m_loss_function
 
 
-  def train(self, training_features, training_targets, number_of_rounds = 20, boosted_machine = None):
+  def _prepare(self, training_features, checkpoint_file):
+    """Lets the weak trainer pre-compute everything that does not change between the rounds.
+
+    With a checkpoint file, the pre-computed state of the weak trainer (e.g., the sort order of the :py:class:`bob.learn.boosting.StumpTrainer`) is written only once, to the file ``checkpoint_file + ".prepared"``.
+    When this file exists and belongs to the same training features, it is read instead of preparing the weak trainer again.
+    """
+    if not hasattr(self.m_trainer, 'prepare'):
+      return
+    prepared_file = checkpoint_file + ".prepared" if checkpoint_file is not None and hasattr(self.m_trainer, 'save_prepared') else None
+    if prepared_file is not None and os.path.exists(prepared_file):
+      if self.m_trainer.load_prepared(bob.io.base.HDF5File(prepared_file), training_features):
+        logger.info("Read the prepared state of the weak trainer from file '%s'" % prepared_file)
+        return
+    self.m_trainer.prepare(training_features)
+    if prepared_file is not None:
+      temporary_file = prepared_file + ".tmp"
+      hdf5 = bob.io.base.HDF5File(temporary_file, 'w')
+      self.m_trainer.save_prepared(hdf5)
+      del hdf5
+      os.rename(temporary_file, prepared_file)
+      logger.debug("Wrote the prepared state of the weak trainer to file '%s'" % prepared_file)
+
+
+  def _save_checkpoint(self, checkpoint_file, round, boosted_machine, strong_predicted_scores, loss_gradient):
+    """Writes the current state of the training to the given checkpoint file.
+
+    The file is written to a temporary file first, which replaces the checkpoint file only when it is complete.
+    The pre-computed state of the weak trainer is not part of the checkpoint, see :py:meth:`_prepare`.
+    """
+    temporary_file = checkpoint_file + ".tmp"
+    hdf5 = bob.io.base.HDF5File(temporary_file, 'w')
+    hdf5.set("Round", round)
+    hdf5.set("StrongScores", strong_predicted_scores)
+    hdf5.set("LossGradient", loss_gradient)
+    hdf5.create_group("Machine")
+    hdf5.cd("Machine")
+    boosted_machine.save(hdf5)
+    hdf5.cd("..")
+    if hasattr(self.m_trainer, 'save_state'):
+      hdf5.create_group("Trainer")
+      hdf5.cd("Trainer")
+      self.m_trainer.save_state(hdf5)
+      hdf5.cd("..")
+    del hdf5
+    os.rename(temporary_file, checkpoint_file)
+    logger.debug("Wrote checkpoint after round %d to file '%s'" % (round, checkpoint_file))
+
+
+  def _load_checkpoint(self, checkpoint_file, training_features, training_targets):
+    """Reads the state of the training from the given checkpoint file.
+
+    Returns the number of finished rounds, the boosted machine, the strong scores and the loss gradient.
+    """
+    hdf5 = bob.io.base.HDF5File(checkpoint_file)
+    strong_predicted_scores = hdf5.read("StrongScores")
+    if strong_predicted_scores.shape != training_targets.shape:
+      raise ValueError("The checkpoint file '%s' contains scores of shape %s, but the training data has shape %s" % (checkpoint_file, strong_predicted_scores.shape, training_targets.shape))
+    hdf5.cd("Machine")
+    boosted_machine = BoostedMachine(hdf5)
+    hdf5.cd("..")
+    if hasattr(self.m_trainer, 'load_state') and hdf5.has_group("Trainer"):
+      hdf5.cd("Trainer")
+      self.m_trainer.load_state(hdf5)
+      hdf5.cd("..")
+    return int(hdf5.read("Round")), boosted_machine, strong_predicted_scores, hdf5.read("LossGradient")
+
+
+  def train(self, training_features, training_targets, number_of_rounds = 20, boosted_machine = None, checkpoint_file = None, checkpoint_rounds = None, checkpoint_seconds = None, feature_major = False):
     """The function to train a boosting machine.
 
     The function boosts the training features and returns a strong classifier as a weighted combination of weak classifiers.
 
     Keyword parameters:
 
-    training_features : uint16 <#samples, #features> or float <#samples, #features>)
+    training_features : uint16 or uint8 <#samples, #features> or float <#samples, #features>)
       Features extracted from the training samples.
+      For data sets that do not fit into memory, a :py:class:`numpy.memmap` can be given, see :py:func:`bob.learn.boosting.utils.hdf5_to_memmap`.
+      The features can be stored in sample-major (C) or in feature-major (Fortran) order, see ``feature_major``.
+      When the weak trainer is a :py:class:`bob.learn.boosting.ShardedTrainer`, whose workers keep the training features, ``None`` can be given.
 
     training_targets : float <#samples, #outputs>
       The values that the boosted classifier should reach for the given samples.
@@ -53,6 +137,25 @@ class Boosting:
     boosted_machine :py:class:`bob.learn.boosting.BoostedMachine` or None
       The machine to add the weak machines to. If not given, a new machine is created.
 
+    checkpoint_file : str or None
+      An HDF5 file to store the state of the training, i.e., the current machine, the strong scores, the loss gradient, the round counter and the state of the weak trainer.
+      The state that the weak trainer pre-computes once (e.g., the sorted feature indices of the :py:class:`bob.learn.boosting.StumpTrainer`) is written only once, to the file ``checkpoint_file + ".prepared"``, which is re-used as long as the training features are the same.
+      If the file exists, the training is resumed from it without re-scoring the training set, and the given ``boosted_machine`` is ignored.
+      In this case, the ``number_of_rounds`` includes the rounds that are stored in the checkpoint, so the training can be continued after a crash, or extended by increasing the ``number_of_rounds``.
+
+    checkpoint_rounds : int or None
+      Write the checkpoint file after this number of rounds.
+
+    checkpoint_seconds : float or None
+      Write the checkpoint file when this number of seconds has passed since it was last written.
+      If neither ``checkpoint_rounds`` nor ``checkpoint_seconds`` is given, the checkpoint is written every 10 minutes.
+      The checkpoint is always written after the last round.
+
+    feature_major : bool
+      Convert the training features into feature-major (Fortran) order once before the first round, and keep them for all rounds.
+      Since the weak trainers scan the features one column at a time, each column is then read from contiguous memory.
+      This requires a copy of the training features in memory; features that are already in feature-major order are used as they are.
+
     Returns : :py:class:`bob.learn.boosting.BoostedMachine`
       The boosted machine that is combination of the weak classifiers.
     """
@@ -61,56 +164,94 @@ class Boosting:
     if(len(training_targets.shape) == 1):
       training_targets = training_targets[:,numpy.newaxis]
 
-    number_of_samples = training_features.shape[0]
+    if feature_major and training_features is not None and not training_features.flags.f_contiguous:
+      logger.debug("Converting the training features into feature-major order")
+      training_features = numpy.asfortranarray(training_features)
+
+    number_of_samples = training_targets.shape[0]
     number_of_outputs = training_targets.shape[1]
 
-    strong_predicted_scores = numpy.zeros((number_of_samples, number_of_outputs))
     weak_predicted_scores = numpy.ndarray((number_of_samples, number_of_outputs))
 
-    if boosted_machine is not None:
-      boosted_machine(training_features, strong_predicted_scores)
+    if checkpoint_file is not None and os.path.exists(checkpoint_file):
+      # resume the training from the checkpoint
+      first_round, boosted_machine, strong_predicted_scores, loss_gradient = self._load_checkpoint(checkpoint_file, training_features, training_targets)
+      logger.info("Resuming training after round %d from checkpoint file '%s'" % (first_round, checkpoint_file))
+      self._prepare(training_features, checkpoint_file)
+
     else:
-      boosted_machine = BoostedMachine()
+      first_round = 0
+      strong_predicted_scores = numpy.zeros((number_of_samples, number_of_outputs))
+      if boosted_machine is not None:
+        if training_features is None:
+          raise ValueError("The training features are required to continue the training of the given boosted machine")
+        boosted_machine(training_features, strong_predicted_scores)
+      else:
+        boosted_machine = BoostedMachine()
+
+      # let the weak trainer pre-compute everything that does not change between the rounds
+      self._prepare(training_features, checkpoint_file)
+
+      # Compute the gradient of the loss function, l'(y,f(x)) using loss_class
+      # it is kept for all rounds and updated after each round
+      loss_gradient = self.m_loss_function.loss_gradient(training_targets, strong_predicted_scores)
+
+    if checkpoint_rounds is None and checkpoint_seconds is None:
+      checkpoint_seconds = 600.
+    last_checkpoint_round, last_checkpoint_time = first_round, time.time()
 
     # Start boosting iterations for num_rnds rounds
-    logger.info("Starting %d rounds of boosting" % number_of_rounds)
-    for round in range(number_of_rounds):
+    logger.info("Starting %d rounds of boosting" % (number_of_rounds - first_round))
+    for round in range(first_round, number_of_rounds):
 
       logger.debug("Starting round %d" % (round+1))
 
-      # Compute the gradient of the loss function, l'(y,f(x)) using loss_class
-      loss_gradient = self.m_loss_function.loss_gradient(training_targets, strong_predicted_scores)
-
       # Select the best weak machine for current round of boosting
       weak_machine = self.m_trainer.train(training_features, loss_gradient)
 
       # Compute the classification scores of the samples based only on the current round weak classifier (g_r)
-      weak_machine(training_features, weak_predicted_scores)
-
-      # Perform L-BFGS minimization and compute the scale (alpha_r) for current weak machine
-      alpha, _, flags = scipy.optimize.fmin_l_bfgs_b(
-          func   = self.m_loss_function.loss_sum,
-          x0     = numpy.zeros(number_of_outputs),
-          fprime = self.m_loss_function.loss_gradient_sum,
-          args   = (training_targets, strong_predicted_scores, weak_predicted_scores),
-#          disp = 1
-      )
-      # check output of L-BFGS
-      if flags['warnflag'] != 0:
-        msg = "too many function evaluations or too many iterations" if flags['warnflag'] == 1 else flags['task']
-        if (alpha == numpy.zeros(number_of_outputs)).all():
-          logger.warn("L-BFGS returned zero weights with error '%d': %s" % (flags['warnflag'], msg))
-          return boosted_machine
-        else:
-          logger.warn("L-BFGS returned warning '%d': %s" % (flags['warnflag'], msg))
-
+      if training_features is None:
+        # the features are kept by the workers of the sharded trainer
+        self.m_trainer.weak_scores(weak_predicted_scores)
+      else:
+        weak_machine(training_features, weak_predicted_scores)
+
+      # Group the samples by their weak outputs once, for the solvers and for the update of the loss gradient
+      buckets = self.m_loss_function.bucket_statistics(training_targets, strong_predicted_scores, weak_predicted_scores) if hasattr(self.m_loss_function, 'bucket_statistics') else None
+
+      # Compute the scale (alpha_r) for current weak machine with the first applicable solver
+      alpha = None
+      for solver in self.m_alpha_solvers:
+        alpha = solver.solve(self.m_loss_function, training_targets, strong_predicted_scores, weak_predicted_scores, buckets = buckets)
+        if alpha is not None:
+          logger.debug("Computed weights with %s" % type(solver).__name__)
+          break
+      if alpha is None:
+        logger.warn("None of the solvers could compute the weights of the weak machine; stopping the training")
+        return boosted_machine
 
       # Update the prediction score after adding the score from the current weak classifier f(x) = f(x) + alpha_r*g_r
       strong_predicted_scores += alpha * weak_predicted_scores
 
+      # Update the loss gradient for the next round, incrementally if the loss function supports it
+      # the rounds of the exact recomputation do not depend on the first round, so that a resumed training is identical
+      refresh = self.m_gradient_refresh_rounds is not None and (round + 1) % self.m_gradient_refresh_rounds == 0
+      if hasattr(self.m_loss_function, 'update_loss_gradient') and not refresh:
+        self.m_loss_function.update_loss_gradient(training_targets, strong_predicted_scores, loss_gradient, alpha, weak_predicted_scores, buckets = buckets)
+      else:
+        loss_gradient = self.m_loss_function.loss_gradient(training_targets, strong_predicted_scores)
+
       # Add the current weak machine into the boosting machine
       boosted_machine.add_weak_machine(weak_machine, alpha)
 
       logger.info("Finished round %d / %d" % (round+1, number_of_rounds))
 
+      # write the checkpoint, if requested
+      if checkpoint_file is not None:
+        due_rounds = checkpoint_rounds is not None and round + 1 - last_checkpoint_round >= checkpoint_rounds
+        due_seconds = checkpoint_seconds is not None and time.time() - last_checkpoint_time >= checkpoint_seconds
+        if due_rounds or due_seconds or round + 1 == number_of_rounds:
+          self._save_checkpoint(checkpoint_file, round + 1, boosted_machine, strong_predicted_scores, loss_gradient)
+          last_checkpoint_round, last_checkpoint_time = round + 1, time.time()
+
     return boosted_machine
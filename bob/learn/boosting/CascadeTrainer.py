@@ -0,0 +1,103 @@
+import numpy
+import math
+import logging
+logger = logging.getLogger('bob.learn.boosting')
+
+
+class CascadeTrainer:
+  """Turns a uni-variate :py:class:`bob.learn.boosting.BoostedMachine` into a cascade.
+
+  The weak machines of the boosted machine are split into stages, and for each stage a rejection threshold is selected on a validation set.
+  The thresholds are chosen such that the given detection rate is reached on the positive validation samples, i.e., such that this fraction of positive samples passes all stages.
+  The detection rate is split evenly between the stages: each stage keeps the fraction ``detection_rate ** (1 / #stages)`` of the positive samples that passed the previous stages.
+
+  **Constructor Documentation**
+
+  Keyword parameters
+
+    detection_rate : float
+      The fraction of positive validation samples that should be accepted by the cascade.
+  """
+
+  def __init__(self, detection_rate = 0.99):
+    if not 0. < detection_rate <= 1.:
+      raise ValueError("The detection rate must be in range (0, 1], but it is %f" % detection_rate)
+    self.m_detection_rate = detection_rate
+
+
+  def partial_scores(self, boosted_machine, features, stage_ends):
+    """Computes the partial scores of the given features after each stage.
+
+    The weak machines are evaluated in the same order as in the cascade evaluation of the :py:class:`bob.learn.boosting.BoostedMachine`.
+
+    Keyword parameters
+
+      boosted_machine : :py:class:`bob.learn.boosting.BoostedMachine`
+        The uni-variate machine to evaluate
+
+      features : uint16 or uint8 <#samples, #features>
+        The features of the samples
+
+      stage_ends : [int]
+        The index after the last weak machine of each stage
+
+    Returns : float <#samples, #stages>
+      The partial scores of the samples after each stage
+    """
+    weak_machines = boosted_machine.weak_machines
+    weights = boosted_machine.weights[:,0]
+    scores = numpy.zeros(features.shape[0])
+    weak_scores = numpy.ndarray(features.shape[0])
+    partial = numpy.ndarray((features.shape[0], len(stage_ends)))
+
+    start = 0
+    for stage, end in enumerate(stage_ends):
+      for i in range(start, end):
+        weak_machines[i](features, weak_scores)
+        scores += weights[i] * weak_scores
+      partial[:,stage] = scores
+      start = end
+    return partial
+
+
+  def train(self, boosted_machine, validation_features, validation_targets, stage_ends):
+    """Selects the rejection thresholds of the stages and turns the given machine into a cascade.
+
+    Keyword parameters
+
+      boosted_machine : :py:class:`bob.learn.boosting.BoostedMachine`
+        The uni-variate machine that should be turned into a cascade; it is modified in place
+
+      validation_features : uint16 or uint8 <#samples, #features>
+        The features of the validation samples
+
+      validation_targets : float <#samples>
+        The targets of the validation samples: +1 for positive samples, and -1 for negative samples
+
+      stage_ends : [int]
+        The index after the last weak machine of each stage; the last one must be the number of weak machines
+
+    Returns : :py:class:`bob.learn.boosting.BoostedMachine`
+      The given machine, which is now a cascade
+    """
+    stage_ends = numpy.array(stage_ends, numpy.int32)
+    validation_targets = numpy.reshape(validation_targets, (validation_features.shape[0],))
+    positives = validation_targets > 0
+    if not numpy.any(positives):
+      raise ValueError("The validation set does not contain any positive samples")
+
+    partial = self.partial_scores(boosted_machine, validation_features, stage_ends)
+    stage_rate = self.m_detection_rate ** (1. / len(stage_ends))
+
+    thresholds = numpy.ndarray(len(stage_ends))
+    accepted = numpy.ones(validation_features.shape[0], bool)
+    for stage in range(len(stage_ends)):
+      # select the threshold such that the desired fraction of the remaining positives is accepted
+      scores = numpy.sort(partial[accepted & positives, stage])
+      rejected = scores.shape[0] - int(math.ceil(stage_rate * scores.shape[0] - 1e-8))
+      thresholds[stage] = scores[rejected] if scores.shape[0] else -numpy.inf
+      accepted &= partial[:, stage] >= thresholds[stage]
+      logger.debug("Stage %d: threshold %f accepts %d positive and %d negative samples", stage, thresholds[stage], numpy.count_nonzero(accepted & positives), numpy.count_nonzero(accepted & ~positives))
+
+    boosted_machine.set_cascade(stage_ends, thresholds)
+    return boosted_machine
@@ -2,6 +2,40 @@ import numpy
 from . import LossFunction
 
 
+class ExponentialLossBuckets(object):
+    """Sufficient statistics of the exponential loss for weak machines with few distinct outputs.
+
+    Since :math:`e^{-t(s + \\alpha c)} = e^{-ts} e^{-\\alpha tc}`, the exponential loss of all samples with the same product :math:`tc` of target and weak machine output can be combined into a single bucket.
+    Each bucket stores this product and the sum of the weights :math:`e^{-ts}` of its samples.
+    Additionally, the bucket of each sample is stored, so that the loss gradient can be updated with one factor per bucket, see :py:meth:`bob.learn.boosting.ExponentialLoss.update_loss_gradient`.
+    See :py:meth:`bob.learn.boosting.ExponentialLoss.bucket_statistics`.
+    """
+
+    def __init__(self, values, weights, indices = None):
+        # the products of target and weak output, and the summed weights; both of shape (#buckets, #outputs)
+        self.m_values = values
+        self.m_weights = weights
+        # the bucket index of each sample and output, of shape (#samples, #outputs)
+        self.m_indices = indices
+
+    def loss_sum(self, alpha):
+        """Returns the sum of the loss values for the given alpha, see :py:meth:`bob.learn.boosting.LossFunction.loss_sum`."""
+        return numpy.sum(self.m_weights * numpy.exp(-alpha * self.m_values), 0)
+
+    def loss_gradient_sum(self, alpha):
+        """Returns the sum of the loss gradients for the given alpha, see :py:meth:`bob.learn.boosting.LossFunction.loss_gradient_sum`."""
+        return numpy.sum(-self.m_values * self.m_weights * numpy.exp(-alpha * self.m_values), 0)
+
+    def loss_and_gradient_sum(self, alpha):
+        """Returns the total loss and the sum of the loss gradients for the given alpha, see :py:meth:`bob.learn.boosting.LossFunction.loss_and_gradient_sum`."""
+        losses = self.m_weights * numpy.exp(-alpha * self.m_values)
+        return numpy.sum(losses), numpy.sum(-self.m_values * losses, 0)
+
+    def loss_second_derivative_sum(self, alpha):
+        """Returns the second derivative of the loss sum with respect to alpha."""
+        return numpy.sum(self.m_values ** 2 * self.m_weights * numpy.exp(-alpha * self.m_values), 0)
+
+
 class ExponentialLoss(LossFunction):
     """ The class implements the exponential loss function for the boosting framework."""
 
@@ -34,3 +68,98 @@ class ExponentialLoss(LossFunction):
         """
         loss = numpy.exp(-(targets * scores))
         return -targets * loss
+
+    def loss_second_derivative(self, targets, scores):
+        """The function computes the derivative of :py:meth:`loss_gradient` with respect to the scores, e.g., for the :py:class:`bob.learn.boosting.NewtonAlphaSolver`.
+
+        Keyword parameters:
+
+          targets (float <#samples, #outputs>): The target values that should be reached.
+
+          scores (float <#samples, #outputs>): The scores provided by the classifier.
+
+        Returns
+          (float <#samples, #outputs>): The second derivative of the loss based on the given scores and targets.
+        """
+        return targets ** 2 * numpy.exp(-(targets * scores))
+
+    def loss_and_gradient_sum(self, alpha, targets, previous_scores, current_scores):
+        """The function computes the sum of the exponential loss and the sum of its gradient at once, computing the exponentials only once.
+
+        See :py:meth:`bob.learn.boosting.LossFunction.loss_and_gradient_sum` for details.
+        """
+        scores = previous_scores + alpha * current_scores
+        loss = numpy.exp(-(targets * scores))
+        gradient = -targets * loss
+        return numpy.sum(loss), numpy.sum(gradient * current_scores, 0)
+
+    def update_loss_gradient(self, targets, scores, loss_gradient, alpha, current_scores, buckets = None):
+        """The function updates the loss gradient multiplicatively, see :py:meth:`bob.learn.boosting.LossFunction.update_loss_gradient`.
+
+        Since the gradient is :math:`-t e^{-ts}`, adding :math:`\\alpha c` to the scores multiplies it with :math:`e^{-\\alpha tc}`, as in the weight update of AdaBoost.
+        When the ``buckets`` of the current round are given (see :py:meth:`bob.learn.boosting.ExponentialLoss.bucket_statistics`), e.g., for stumps or LUTs with discrete outputs, the factor is computed only once per bucket, and the gradient of each sample is scaled in place with the factor of its bucket.
+        Otherwise, e.g., for real-valued weak outputs, the factors of all samples are computed.
+
+        Each update multiplies the gradient with a rounded factor, so that the relative deviation from :py:meth:`loss_gradient` grows by about one unit in the last place per round.
+        :py:class:`bob.learn.boosting.Boosting` bounds this deviation by recomputing the gradient from the scores regularly.
+        """
+        if buckets is not None and buckets.m_indices is not None:
+            factors = numpy.exp(-alpha * buckets.m_values)
+            factor = numpy.ndarray(loss_gradient.shape[:1])
+            for output in range(loss_gradient.shape[1]):
+                indices = buckets.m_indices[:,output]
+                if len(factors) <= 2:
+                    # two buckets, e.g., for outputs +1 and -1: the factor is a linear function of the index, which is faster than a lookup
+                    numpy.multiply(indices, factors[-1,output] - factors[0,output], out=factor)
+                    factor += factors[0,output]
+                else:
+                    numpy.take(factors[:,output], indices, out=factor)
+                gradient = loss_gradient[:,output]
+                gradient *= factor
+            return
+
+        factor = numpy.multiply(targets, current_scores)
+        factor *= -alpha
+        numpy.exp(factor, out=factor)
+        loss_gradient *= factor
+
+    def bucket_statistics(self, targets, previous_scores, current_scores, maximum_buckets = 256):
+        """The function groups the samples into buckets of identical products of target and weak machine output, see :py:class:`bob.learn.boosting.ExponentialLossBuckets`.
+
+        The weights :math:`e^{-ts}` of the samples are pre-aggregated per bucket, so that the line search does not depend on the number of samples any more.
+
+        Keyword parameters:
+
+          targets (float <#samples, #outputs>): The targets for the samples
+
+          previous_scores (float <#samples, #outputs>): The cumulative prediction scores of the samples until the previous round of the boosting.
+
+          current_scores (float <#samples, #outputs>): The prediction scores of the samples for the current round of the boosting.
+
+          maximum_buckets (int): If any output has more distinct products, ``None`` is returned.
+
+        Returns
+          :py:class:`bob.learn.boosting.ExponentialLossBuckets` or ``None``
+        """
+        agreement = targets * current_scores
+        weights = numpy.exp(-(targets * previous_scores))
+
+        values, sums = [], []
+        indices = numpy.ndarray(targets.shape, numpy.uint8 if maximum_buckets <= 256 else numpy.intp)
+        for output in range(targets.shape[1]):
+            value, inverse = numpy.unique(agreement[:,output], return_inverse=True)
+            if len(value) > maximum_buckets:
+                return None
+            values.append(value)
+            sums.append(numpy.bincount(inverse.ravel(), weights[:,output], len(value)))
+            indices[:,output] = inverse.ravel()
+
+        # outputs with less buckets are padded with empty buckets
+        number_of_buckets = max(len(value) for value in values)
+        bucket_values = numpy.zeros((number_of_buckets, targets.shape[1]))
+        bucket_weights = numpy.zeros((number_of_buckets, targets.shape[1]))
+        for output in range(targets.shape[1]):
+            bucket_values[:len(values[output]), output] = values[output]
+            bucket_weights[:len(sums[output]), output] = sums[output]
+
+        return ExponentialLossBuckets(bucket_values, bucket_weights, indices)
@@ -8,7 +8,7 @@ class LUTTrainer():
   It requires that the features are discrete and have a maximum value.
   """
 
-  def __init__(self, maximum_feature_value, feature_length, number_of_outputs = 1, selection_type = 'independent'):
+  def __init__(self, maximum_feature_value, feature_length, number_of_outputs = 1, selection_type = 'independent', output_type = 'discrete'):
     """Initializes the parameters of the LUT Trainer that trains a weak LUTMachine.
 
     Keyword parameters
@@ -24,17 +24,22 @@ class LUTTrainer():
         For shared selection type the sum of the loss function is taken over the outputs and a single feature is used for all the outputs.
         See Cosmin's thesis for more details.
 
+      output_type (str):
+        The LUT entries can be either 'discrete' (+1 or -1) or 'real'.
+        For real outputs, the entries are the sums of the gradients for each feature value, normalized to the range [-1, 1].
+
     """
     self.m_maximum_feature_value = maximum_feature_value
     self.m_feature_length = feature_length
     self.m_number_of_outputs = number_of_outputs
     self.m_selection_type = selection_type
+    self.m_output_type = output_type
 
     # pre-allocate arrays for faster access
     self._feature_gradient = numpy.ndarray((self.m_maximum_feature_value, self.m_number_of_outputs))
     self._luts = numpy.ndarray((self.m_maximum_feature_value, self.m_number_of_outputs))
     self._selected_indices = numpy.ndarray((self.m_number_of_outputs,), numpy.int32)
-    self._gradient_histogram = numpy.ndarray((self.m_maximum_feature_value,))
+    self._gradient_histogram = numpy.ndarray((self.m_maximum_feature_value, self.m_number_of_outputs))
     self._loss_sum = numpy.ndarray((self.m_feature_length, self.m_number_of_outputs))
 
 
@@ -55,10 +60,10 @@ class LUTTrainer():
 
     # Compute the sum of the gradient based on the feature values or the loss associated with each feature index
     # Compute the loss for each feature
+    # The histograms of all outputs are computed in a single pass over the feature values
     for feature_index in range(self.m_feature_length):
-      for output_index in range(self.m_number_of_outputs):
-        weighted_histogram(training_features[:,feature_index], loss_gradient[:,output_index], self._gradient_histogram)
-        self._loss_sum[feature_index, output_index] = - numpy.sum(numpy.abs(self._gradient_histogram))
+      weighted_histogram(training_features[:,feature_index], loss_gradient, self._gradient_histogram)
+      self._loss_sum[feature_index] = - numpy.sum(numpy.abs(self._gradient_histogram), 0)
 
     # Select the most discriminative index (or indices) for classification which minimizes the loss
     #  and compute the sum of gradient for that index
@@ -76,13 +81,19 @@ class LUTTrainer():
       accumulated_loss = numpy.sum(self._loss_sum,1)
       self._selected_indices.fill(accumulated_loss.argmin())
 
-    for output_index in range(self.m_number_of_outputs):
-      feature_index = self._selected_indices[output_index]
-      self._feature_gradient[:,output_index] = weighted_histogram(training_features[:,feature_index], loss_gradient[:,output_index], self.m_maximum_feature_value)
+    # The histograms are computed once per selected feature, e.g., only once for 'shared' selection
+    for feature_index in numpy.unique(self._selected_indices):
+      weighted_histogram(training_features[:,feature_index], loss_gradient, self._gradient_histogram)
+      outputs = self._selected_indices == feature_index
+      self._feature_gradient[:,outputs] = self._gradient_histogram[:,outputs]
 
     # Assign the values to LookUp Table
-    self._luts.fill(1.)
-    self._luts[self._feature_gradient <= 0.0] = -1.
+    if self.m_output_type == 'discrete':
+      self._luts.fill(1.)
+      self._luts[self._feature_gradient <= 0.0] = -1.
+    else:
+      maximum = numpy.max(numpy.abs(self._feature_gradient), 0)
+      self._luts[:] = numpy.where(maximum > 0., self._feature_gradient / numpy.where(maximum > 0., maximum, 1.), 0.)
 
     # create new weak machine
     return LUTMachine(self._luts.copy(), self._selected_indices.copy())
@@ -36,3 +36,29 @@ class LogitLoss(LossFunction):
         e = numpy.exp(-(targets * scores))
         denom = 1. / (1. + e)
         return -targets * e * denom
+
+    def loss_second_derivative(self, targets, scores):
+        """The function computes the derivative of :py:meth:`loss_gradient` with respect to the scores, e.g., for the :py:class:`bob.learn.boosting.NewtonAlphaSolver`.
+
+        Keyword parameters:
+
+          targets (float <#samples, #outputs>): The target values that should be reached.
+
+          scores (float <#samples, #outputs>): The scores provided by the classifier.
+
+        Returns
+          (float <#samples, #outputs>): The second derivative of the loss based on the given scores and targets.
+        """
+        e = numpy.exp(-(targets * scores))
+        return targets ** 2 * e / (1. + e) ** 2
+
+    def loss_and_gradient_sum(self, alpha, targets, previous_scores, current_scores):
+        """The function computes the sum of the logit loss and the sum of its gradient at once, computing the exponentials only once.
+
+        See :py:meth:`bob.learn.boosting.LossFunction.loss_and_gradient_sum` for details.
+        """
+        scores = previous_scores + alpha * current_scores
+        e = numpy.exp(-(targets * scores))
+        loss = numpy.log(1. + e)
+        gradient = -targets * e * (1. / (1. + e))
+        return numpy.sum(loss), numpy.sum(gradient * current_scores, 0)
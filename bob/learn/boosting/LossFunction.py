@@ -96,3 +96,72 @@ class LossFunction(object):
 
         # take the sum of the loss gradient values
         return numpy.sum(loss_gradients * current_scores, 0)
+
+    def loss_and_gradient_sum(self, alpha, targets, previous_scores, current_scores):
+        """The function computes the sum of the loss and the sum of the loss gradients at once.
+
+        The combined scores are computed only once, and both sums are returned, so that this function can be given as ``func`` to the L-BFGS optimization function (without ``fprime``).
+        Derived classes might overwrite this function to share more computations between the loss and its gradient.
+
+        Keyword parameters:
+
+          alpha (float <#outputs>): The current value of the alpha.
+
+          targets (float <#samples, #outputs>): The targets for the samples
+
+          previous_scores (float <#samples, #outputs>): The cumulative prediction scores of the samples until the previous round of the boosting.
+
+          current_scores (float <#samples, #outputs>): The prediction scores of the samples for the current round of the boosting.
+
+        Returns
+          (float, float <#outputs>) The total sum of the loss values and the sum of the loss gradient for the current value of the alpha.
+        """
+
+        # compute the scores for the current alpha only once
+        scores = previous_scores + alpha * current_scores
+        losses = self.loss(targets, scores)
+        loss_gradients = self.loss_gradient(targets, scores)
+
+        return numpy.sum(losses), numpy.sum(loss_gradients * current_scores, 0)
+
+    def update_loss_gradient(self, targets, scores, loss_gradient, alpha, current_scores, buckets = None):
+        """The function updates the loss gradient in place after the scores have been updated with ``scores += alpha * current_scores``.
+
+        This function is called by :py:class:`bob.learn.boosting.Boosting` once per round, so that the loss gradient is kept as a persistent state of the training.
+        By default, the loss gradient is recomputed from the updated scores; derived classes might implement an incremental update instead.
+
+        Keyword parameters:
+
+          targets (float <#samples, #outputs>): The targets for the samples
+
+          scores (float <#samples, #outputs>): The updated cumulative prediction scores of the samples, including the current round.
+
+          loss_gradient (float <#samples, #outputs>): The loss gradient for the scores before the update, which will be overwritten.
+
+          alpha (float <#outputs>): The weight of the weak machine of the current round.
+
+          current_scores (float <#samples, #outputs>): The prediction scores of the samples for the current round of the boosting.
+
+          buckets: The result of :py:meth:`bob.learn.boosting.LossFunction.bucket_statistics` for the current round, or ``None``; ignored by default.
+        """
+        loss_gradient[:] = self.loss_gradient(targets, scores)
+
+    def bucket_statistics(self, targets, previous_scores, current_scores):
+        """The function computes sufficient statistics of the loss for the current round of boosting, if the loss permits it.
+
+        When the weak machine has only few distinct outputs (e.g., +1 and -1 for stumps), the samples can be grouped into buckets once per round.
+        The returned object provides the functions ``loss_sum(alpha)``, ``loss_gradient_sum(alpha)``, ``loss_and_gradient_sum(alpha)`` and ``loss_second_derivative_sum(alpha)``, which compute the same values as the functions of this class, but in O(#buckets) instead of O(#samples).
+        By default, ``None`` is returned, i.e., no sufficient statistics are available.
+
+        Keyword parameters:
+
+          targets (float <#samples, #outputs>): The targets for the samples
+
+          previous_scores (float <#samples, #outputs>): The cumulative prediction scores of the samples until the previous round of the boosting.
+
+          current_scores (float <#samples, #outputs>): The prediction scores of the samples for the current round of the boosting.
+
+        Returns
+          An object with the functions listed above, or ``None``
+        """
+        return None
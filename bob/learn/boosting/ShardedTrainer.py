@@ -0,0 +1,297 @@
+import numpy
+import multiprocessing
+import multiprocessing.connection
+import logging
+logger = logging.getLogger('bob.learn.boosting')
+
+from ._library import LUTMachine, StumpMachine, weighted_histogram
+
+
+def _gains(machine, training_features, loss_gradient, scores):
+  """Computes the gains of the given weak machine for each output, using the same criterion as the weak trainer that selected it."""
+  if isinstance(machine, StumpMachine):
+    # the stump trainer maximizes the absolute sum of the gradients above the threshold, where the stump returns its polarity
+    above = scores[:,0] * machine.polarity > 0
+    return numpy.array([abs(numpy.sum(loss_gradient[above]))])
+  # the LUT trainer maximizes the sum of the absolute histograms of the gradient, independent of the LUT entries (which might be real-valued)
+  # the histograms of all outputs are computed once for each selected feature
+  histogram = numpy.ndarray((machine.lut.shape[0], loss_gradient.shape[1]))
+  gains = numpy.ndarray(loss_gradient.shape[1])
+  for index in set(machine.lut_indices):
+    weighted_histogram(training_features[:,index], loss_gradient, histogram)
+    absolute = numpy.sum(numpy.abs(histogram), 0)
+    outputs = machine.lut_indices == index
+    gains[outputs] = absolute[outputs]
+  return gains
+
+
+def _check_trainer(weak_trainer):
+  """Raises a ValueError if the given weak trainer selects its machines on a subsample of the training samples."""
+  sample_fraction = getattr(weak_trainer, 'sample_fraction', getattr(weak_trainer, 'm_sample_fraction', 1.))
+  if sample_fraction < 1.:
+    raise ValueError("The weak trainer of a sharded training must use all samples, but it uses a sample_fraction of %g; the gains of the workers would not be comparable" % sample_fraction)
+
+
+def _describe(machine, first_feature):
+  """Returns the type name and constructor arguments of the given weak machine, with feature indices relative to the full feature matrix."""
+  if isinstance(machine, StumpMachine):
+    return 'StumpMachine', (machine.threshold, machine.polarity, numpy.int32(machine.feature_indices()[0] + first_feature))
+  return 'LUTMachine', (machine.lut.copy(), (machine.lut_indices + first_feature).astype(numpy.int32))
+
+
+class ShardedTrainer:
+  """A weak trainer that distributes the feature columns to several workers, e.g., when the training features do not fit into the memory of a single machine.
+
+  Since the best feature is selected independently for each feature, each worker selects the best weak machine for its shard of the feature columns.
+  The coordinator receives only the gain and the weak machine of each worker, and selects the best of them, independently for each output in case of the ``'independent'`` selection of the :py:class:`bob.learn.boosting.LUTTrainer`.
+  The resulting weak machines are identical to the ones selected on the full feature matrix.
+
+  The weak trainers of the workers must use all training samples, i.e., a ``sample_fraction`` of 1.
+  Otherwise, each worker would select its weak machine using the gradients of its own random subsample of the samples, while the coordinator compares the gains of the workers on all samples.
+
+  The workers run :py:meth:`serve`, either in local processes (see :py:meth:`local`), or on other machines connected via sockets (see :py:meth:`listen`).
+  When the features are kept by the workers only, ``None`` can be given as training features to :py:meth:`bob.learn.boosting.Boosting.train`.
+  The outputs of the weak machines are then collected from the workers with :py:meth:`weak_scores`.
+
+  **Constructor Documentation**
+
+  Keyword parameters
+
+    connections : [:py:class:`multiprocessing.connection.Connection`]
+      The connections to the workers
+  """
+
+  def __init__(self, connections):
+    self.m_connections = list(connections)
+    # the local worker processes, if any
+    self._processes = []
+    self._selection_type = None
+    # the workers that have computed the outputs of the last weak machine, for each output
+    self._winners = None
+
+
+  @staticmethod
+  def serve(connection, weak_trainer, training_features, first_feature = 0):
+    """Runs a worker, which trains weak machines on a shard of the feature columns.
+
+    The shard of the training features stays resident in the worker for all rounds of boosting, only the loss gradient is received in each round.
+    The worker returns when the coordinator closes the connection.
+    To run a worker on a different machine, connect to the address that :py:meth:`ShardedTrainer.listen` listens on:
+
+    .. code-block:: py
+
+       connection = multiprocessing.connection.Client(address, authkey = authkey)
+       bob.learn.boosting.ShardedTrainer.serve(connection, weak_trainer, features_of_shard, first_feature)
+
+    Keyword parameters
+
+      connection : :py:class:`multiprocessing.connection.Connection`
+        The connection to the coordinator
+
+      weak_trainer : :py:class:`bob.learn.boosting.LUTTrainer` or :py:class:`bob.learn.boosting.StumpTrainer`
+        The weak trainer, which is applied to the shard of the training features; its ``sample_fraction`` must be 1
+
+      training_features : uint16 <#samples, #features of shard> or float <#samples, #features of shard>
+        The columns of the training features that are handled by this worker
+
+      first_feature : int
+        The index of the first column of the shard in the full feature matrix
+    """
+    scores = None
+    while True:
+      try:
+        message = connection.recv()
+      except EOFError:
+        break
+      if message[0] == 'close':
+        break
+      try:
+        if message[0] == 'prepare':
+          _check_trainer(weak_trainer)
+          if hasattr(weak_trainer, 'prepare'):
+            weak_trainer.prepare(training_features)
+          reply = (first_feature, training_features.shape, getattr(weak_trainer, 'selection_type', 'shared'))
+        elif message[0] == 'train':
+          loss_gradient = message[1]
+          machine = weak_trainer.train(training_features, loss_gradient)
+          # keep the outputs of the machine, in case that it is selected by the coordinator
+          scores = numpy.zeros(loss_gradient.shape)
+          machine(training_features, scores)
+          reply = (_gains(machine, training_features, loss_gradient, scores), _describe(machine, first_feature))
+        elif message[0] == 'scores':
+          reply = scores[:,message[1]]
+        else:
+          raise ValueError("Unknown command '%s'" % message[0])
+      except Exception as e:
+        connection.send(('error', "%s: %s" % (type(e).__name__, e)))
+      else:
+        connection.send(('ok', reply))
+    connection.close()
+
+
+  @classmethod
+  def local(cls, weak_trainer, training_features, number_of_shards):
+    """Starts local worker processes, each of which keeps a shard of the given training features.
+
+    Keyword parameters
+
+      weak_trainer : :py:class:`bob.learn.boosting.LUTTrainer` or :py:class:`bob.learn.boosting.StumpTrainer`
+        The weak trainer that is applied to each shard; its ``sample_fraction`` must be 1
+
+      training_features : uint16 <#samples, #features> or float <#samples, #features>
+        The training features, which are split into contiguous blocks of columns
+
+      number_of_shards : int
+        The number of worker processes
+
+    Returns : :py:class:`ShardedTrainer`
+      The coordinator of the workers
+    """
+    _check_trainer(weak_trainer)
+    number_of_features = training_features.shape[1]
+    connections, processes = [], []
+    for shard in range(number_of_shards):
+      first, last = number_of_features * shard // number_of_shards, number_of_features * (shard+1) // number_of_shards
+      coordinator_end, worker_end = multiprocessing.Pipe()
+      process = multiprocessing.Process(target = cls.serve, args = (worker_end, weak_trainer, training_features[:,first:last], first))
+      process.daemon = True
+      process.start()
+      worker_end.close()
+      connections.append(coordinator_end)
+      processes.append(process)
+    trainer = cls(connections)
+    trainer._processes = processes
+    return trainer
+
+
+  @classmethod
+  def listen(cls, address, number_of_workers, authkey = None):
+    """Waits for the given number of workers to connect to the given address, see :py:meth:`serve`.
+
+    Keyword parameters
+
+      address : (str, int) or str
+        The address to listen on, e.g., ``('', 6000)``
+
+      number_of_workers : int
+        The number of workers to wait for
+
+      authkey : bytes or None
+        The key that the workers need to use to connect
+
+    Returns : :py:class:`ShardedTrainer`
+      The coordinator of the workers
+    """
+    listener = multiprocessing.connection.Listener(address, authkey = authkey)
+    try:
+      connections = []
+      for worker in range(number_of_workers):
+        connections.append(listener.accept())
+        logger.info("Worker %d of %d connected from %s" % (worker+1, number_of_workers, listener.last_accepted))
+    finally:
+      listener.close()
+    return cls(connections)
+
+
+  def prepare(self, training_features = None):
+    """Lets the workers prepare their shards of the training features, see :py:meth:`bob.learn.boosting.StumpTrainer.prepare`.
+
+    The workers are ordered by the index of their first feature, so that ties are resolved in the same way as by a single weak trainer.
+
+    Keyword parameters
+      training_features : ignored
+        The training features are kept by the workers
+    """
+    shards = self._call([('prepare',)] * len(self.m_connections))
+    order = sorted(range(len(shards)), key = lambda w: shards[w][0])
+    self.m_connections = [self.m_connections[w] for w in order]
+    shards = [shards[w] for w in order]
+    if len(set(shape[0] for _, shape, _ in shards)) > 1:
+      raise ValueError("The workers have different numbers of training samples: %s" % [shape[0] for _, shape, _ in shards])
+    self._selection_type = shards[0][2]
+
+
+  def train(self, training_features, loss_gradient):
+    """Trains a weak machine in each worker, and returns the best of them.
+
+    Keyword parameters
+      training_features : ignored
+        The training features are kept by the workers
+
+      loss_gradient (float<#samples, #outputs>): The loss gradient values for the training samples
+
+    Returns
+      The best weak machine of all workers, with feature indices relative to the full feature matrix
+    """
+    if self._selection_type is None:
+      self.prepare()
+    loss_gradient = numpy.asarray(loss_gradient, numpy.float64)
+    replies = self._call([('train', loss_gradient)] * len(self.m_connections))
+
+    gains = numpy.array([gain for gain, _ in replies])
+    machines = [machine for _, machine in replies]
+    if self._selection_type == 'independent':
+      # select the best worker for each output, and combine their look-up-tables
+      self._winners = gains.argmax(0)
+      if len(set(self._winners)) > 1:
+        luts = numpy.array([machines[w][1][0][:,o] for o, w in enumerate(self._winners)]).T
+        indices = numpy.array([machines[w][1][1][o] for o, w in enumerate(self._winners)], numpy.int32)
+        return LUTMachine(luts, indices)
+    else:
+      self._winners = numpy.repeat(gains.sum(1).argmax(), gains.shape[1])
+
+    machine_type, arguments = machines[self._winners[0]]
+    return {'StumpMachine' : StumpMachine, 'LUTMachine' : LUTMachine}[machine_type](*arguments)
+
+
+  def weak_scores(self, weak_predicted_scores):
+    """Collects the outputs of the weak machine that was returned by the last call to :py:meth:`train` from the workers.
+
+    Keyword parameters
+      weak_predicted_scores (float<#samples, #outputs>): The array that will be filled with the outputs
+    """
+    workers = sorted(set(self._winners))
+    outputs = [[o for o, w in enumerate(self._winners) if w == worker] for worker in workers]
+    for worker, worker_outputs in zip(workers, outputs):
+      self.m_connections[worker].send(('scores', worker_outputs))
+    replies = [self._receive(worker) for worker in workers]
+    for worker, worker_outputs, reply in zip(workers, outputs, replies):
+      weak_predicted_scores[:,worker_outputs] = self._check(worker, reply)
+
+
+  def close(self):
+    """Closes the connections to the workers, and waits for the local worker processes to finish."""
+    for connection in self.m_connections:
+      try:
+        connection.send(('close',))
+      except (IOError, OSError):
+        pass
+      connection.close()
+    for process in self._processes:
+      process.join()
+    self.m_connections, self._processes = [], []
+
+
+  def _call(self, messages):
+    """Sends one message to each worker, and returns their replies; the workers process the messages in parallel."""
+    for connection, message in zip(self.m_connections, messages):
+      connection.send(message)
+    # all replies are received before errors are raised, so that no reply is left in the connections
+    replies = [self._receive(worker) for worker in range(len(self.m_connections))]
+    return [self._check(worker, reply) for worker, reply in enumerate(replies)]
+
+
+  def _receive(self, worker):
+    """Receives the status and the reply of the given worker."""
+    try:
+      return self.m_connections[worker].recv()
+    except EOFError:
+      return ('error', "the worker has terminated")
+
+
+  def _check(self, worker, reply):
+    """Returns the reply of the given worker, or raises an exception if the worker failed."""
+    status, reply = reply
+    if status != 'ok':
+      raise RuntimeError("Worker %d failed with %s" % (worker, reply))
+    return reply
@@ -1,40 +1,250 @@
-from ._library import StumpMachine
+from ._library import StumpMachine, weighted_histogram
 import numpy
+import os
+import tempfile
+import zlib
+
+
+def _feature_key(training_features):
+  """Returns a key that identifies the given training features by their shape, their data type and a checksum of (at most) 16 of their samples."""
+  samples = training_features[::max(1, training_features.shape[0] // 16)][:16]
+  return "%s %s %08x" % (training_features.shape, training_features.dtype.str, zlib.crc32(numpy.ascontiguousarray(samples).tobytes()))
+
 
 class StumpTrainer():
   """ The class for training weak stump classifiers.
   The weak stump is parameterized the threshold and the polarity.
+
+  The training features are sorted only once (see :py:meth:`prepare`), and the sort order is re-used in all rounds of boosting.
+  The sort order is re-used as long as the same training features object is given to :py:meth:`train`.
+  When the values of the training features are modified in place, :py:meth:`prepare` needs to be called again, otherwise the stale sort order is used.
+  The thresholds of all features are then computed with a single cumulative sum over the sorted gradients.
+
+  The training features can be given as a :py:class:`numpy.memmap`, which is read in blocks of feature columns.
+  Since the sort order has the same size as the training features, it can be memory-mapped as well, by giving a ``cache_directory``.
+  For training features in feature-major (Fortran) order, the sort order is stored in feature-major order as well, so that each feature column is read from contiguous memory.
+
+  For large continuous features, the features can instead be quantized once into at most ``number_of_bins`` quantile bins per feature.
+  The thresholds are then searched with a :py:func:`bob.learn.boosting.weighted_histogram` of the gradients over the bins, which replaces the sort order.
+  Each threshold lies in the middle between the largest feature value of one bin and the smallest feature value of the next bin, so that the resulting :py:class:`bob.learn.boosting.StumpMachine` can be applied to the original features.
+  When a feature has at most ``number_of_bins`` different values, each value gets its own bin, and the stumps are identical to the ones without binning.
+
+  To reduce the cost of each round, only a random ``feature_fraction`` of the features can be evaluated in each round.
+  Additionally, the gains can be estimated from a ``sample_fraction`` of the samples, which are drawn with probabilities proportional to their absolute loss gradients.
+  The drawn samples are weighted such that the expected gains are identical to the ones of all samples.
+  The sample selection reduces the cost mainly in combination with ``number_of_bins``, since the sorted features are always scanned completely.
+
+  **Constructor Documentation**
+
+  Keyword parameters
+
+    cache_directory : str or None
+      If given, the sort order (or the bin indices) is stored in memory-mapped files in this directory, instead of being kept in memory.
+      The files get unique names, so that several trainers can use the same directory.
+
+    number_of_bins : int or None
+      If given, the features are quantized into at most this number of bins (at most 65536) before training.
+
+    feature_fraction : float
+      The fraction of features that are evaluated in each round.
+
+    sample_fraction : float
+      The fraction of samples that are drawn in each round to estimate the gains.
+
+    seed : int
+      The seed of the random number generator that selects the features and samples.
   """
 
+  def __init__(self, cache_directory = None, number_of_bins = None, feature_fraction = 1., sample_fraction = 1., seed = 0):
+    if number_of_bins is not None and not 2 <= number_of_bins <= 65536:
+      raise ValueError("The number of bins %d must be between 2 and 65536" % number_of_bins)
+    if not 0. < feature_fraction <= 1. or not 0. < sample_fraction <= 1.:
+      raise ValueError("The fractions of features %f and samples %f must be in range (0,1]" % (feature_fraction, sample_fraction))
+    self.m_cache_directory = cache_directory
+    self.m_number_of_bins = number_of_bins
+    self.m_feature_fraction = feature_fraction
+    self.m_sample_fraction = sample_fraction
+    self.m_seed = seed
+    # the random number generator for the feature and sample selection, which advances with each round
+    self._random = numpy.random.RandomState(seed)
+    # the features that have been sorted in the last call to prepare()
+    self._training_features = None
+    # the indices that sort each feature column, and the positions between two different feature values
+    self._sort_indices = None
+    self._boundaries = None
+    # the bin index of each feature value, and the thresholds between two neighboring bins
+    self._bins = None
+    self._bin_thresholds = None
+
+
+  def prepare(self, training_features):
+    """Sorts the given training features and keeps the sort order for the following calls to :py:meth:`train`.
+
+    This function is called automatically by :py:meth:`train` whenever new training features are given.
+    :py:class:`bob.learn.boosting.Boosting` calls it once at the beginning of the training.
+    New features are detected by their identity only, so this function needs to be called again after the values of the same features have been modified in place.
+
+    Keyword parameters
+      training_features (float<#samples, #features>): The training features samples
+    """
+    if self.m_number_of_bins is not None:
+      self._prepare_bins(training_features)
+      return
+
+    number_of_samples, number_of_features = training_features.shape
+    index_type = numpy.int32 if number_of_samples < numpy.iinfo(numpy.int32).max else numpy.int64
+    # keep the sort order in the same memory layout as the features
+    order = 'F' if training_features.flags.f_contiguous and not training_features.flags.c_contiguous else 'C'
+
+    self._sort_indices = self._allocate("sort_indices", (number_of_samples, number_of_features), index_type, order)
+    self._boundaries = self._allocate("boundaries", (max(number_of_samples-1, 0), number_of_features), bool, order)
+
+    # sort blocks of features to limit the memory needed for the temporaries
+    for block in self._feature_blocks(number_of_samples, number_of_features):
+      features = training_features[:,block]
+      sort_indices = numpy.argsort(features, axis=0, kind='stable')
+      sorted_features = numpy.take_along_axis(features, sort_indices, axis=0)
+      self._sort_indices[:,block] = sort_indices
+      # thresholds can only be placed between two different feature values
+      numpy.not_equal(sorted_features[1:], sorted_features[:-1], out=self._boundaries[:,block])
+
+    self._training_features = training_features
+
+
+  def save_state(self, hdf5):
+    """Writes the state of the random number generator that selects the features and samples to the given HDF5 file, e.g., for a checkpoint of :py:class:`bob.learn.boosting.Boosting`.
+
+    Only the state that changes between the rounds is written; the sort order is written by :py:meth:`save_prepared`.
+
+    Keyword parameters
+      hdf5 (:py:class:`bob.io.base.HDF5File`): The file to write into
+    """
+    _, keys, position, has_gaussian, gaussian = self._random.get_state()
+    hdf5.set("RandomKeys", keys)
+    hdf5.set("RandomPosition", position)
+    hdf5.set("RandomGaussian", numpy.array([has_gaussian, gaussian], numpy.float64))
+
+
+  def load_state(self, hdf5):
+    """Reads the state of the random number generator written by :py:meth:`save_state`, so that the features and samples are selected as if the training had not been interrupted.
+
+    Keyword parameters
+      hdf5 (:py:class:`bob.io.base.HDF5File`): The file to read from
+    """
+    has_gaussian, gaussian = hdf5.read("RandomGaussian")
+    self._random.set_state(('MT19937', hdf5.read("RandomKeys"), int(hdf5.read("RandomPosition")), int(has_gaussian), gaussian))
+
+
+  def save_prepared(self, hdf5):
+    """Writes the sort order (or the bins) computed in :py:meth:`prepare` to the given HDF5 file, e.g., once for all checkpoints of :py:class:`bob.learn.boosting.Boosting`.
+
+    The arrays are written one feature column at a time, so that they are never copied as a whole.
+    The file is keyed to the training features by their shape, their data type and a fingerprint of some of their samples.
+
+    Keyword parameters
+      hdf5 (:py:class:`bob.io.base.HDF5File`): The file to write into
+    """
+    if self._training_features is None:
+      return
+    hdf5.set("FeatureKey", _feature_key(self._training_features))
+    if self._bins is not None:
+      hdf5.set("BinThresholds", self._bin_thresholds)
+      for index in range(self._bins.shape[1]):
+        hdf5.append("Bins", numpy.ascontiguousarray(self._bins[:,index]))
+    else:
+      for index in range(self._sort_indices.shape[1]):
+        hdf5.append("SortIndices", numpy.ascontiguousarray(self._sort_indices[:,index]))
+        if self._boundaries.shape[0]:
+          hdf5.append("Boundaries", self._boundaries[:,index].astype(numpy.uint8))
+
+
+  def load_prepared(self, hdf5, training_features):
+    """Reads the sort order (or the bins) written by :py:meth:`save_prepared`, so that the given training features do not need to be sorted again.
+
+    The arrays are read one feature column at a time into the arrays that :py:meth:`prepare` would allocate, i.e., into memory-mapped files when a ``cache_directory`` is given.
+
+    Keyword parameters
+      hdf5 (:py:class:`bob.io.base.HDF5File`): The file to read from
+
+      training_features (float<#samples, #features>): The training features samples
+
+    Returns
+      ``True`` if the file contains the sort order (or the bins with the same ``number_of_bins``) of the given training features, ``False`` otherwise; in the latter case, :py:meth:`prepare` needs to be called
+    """
+    if not hdf5.has_dataset("FeatureKey") or hdf5.read("FeatureKey") != _feature_key(training_features):
+      return False
+    number_of_samples, number_of_features = training_features.shape
+    order = 'F' if training_features.flags.f_contiguous and not training_features.flags.c_contiguous else 'C'
+
+    if self.m_number_of_bins is not None:
+      if not hdf5.has_dataset("Bins") or hdf5.read("BinThresholds").shape != (self.m_number_of_bins - 1, number_of_features):
+        return False
+      self._bin_thresholds = hdf5.read("BinThresholds")
+      self._bins = self._allocate("bins", (number_of_samples, number_of_features), hdf5.describe("Bins")[0][0][0], order)
+      for index in range(number_of_features):
+        self._bins[:,index] = hdf5.lread("Bins", index)
+      self._sort_indices = self._boundaries = None
+
+    else:
+      if not hdf5.has_dataset("SortIndices"):
+        return False
+      self._sort_indices = self._allocate("sort_indices", (number_of_samples, number_of_features), hdf5.describe("SortIndices")[0][0][0], order)
+      self._boundaries = self._allocate("boundaries", (max(number_of_samples-1, 0), number_of_features), bool, order)
+      for index in range(number_of_features):
+        self._sort_indices[:,index] = hdf5.lread("SortIndices", index)
+        if number_of_samples > 1:
+          self._boundaries[:,index] = hdf5.lread("Boundaries", index)
+      self._bins = self._bin_thresholds = None
+
+    self._training_features = training_features
+    return True
+
+
   def train(self, training_features, loss_gradient):
     """Computes a weak stump machine.
 
     The best weak machine is chosen to maximize the dot product of the outputs and the weights (gain).
     The weights are the negative of the loss gradient for exponential loss.
 
+    The sort order of the last call to :py:meth:`prepare` is used, unless different training features are given.
+
     Keyword parameters
-      training_features (float<#samples, #features>): The training features samples
+      training_features (float<#samples, #features>): The training features samples; call :py:meth:`prepare` again after modifying them in place
 
       loss_gradient (float<#samples>): The loss gradient values for the training samples
 
     Returns
       A (weak) :py:class:`bob.learn.boosting.StumpMachine`
     """
+    if training_features is not self._training_features:
+      self.prepare(training_features)
 
-    # Initialization
-    number_of_features = training_features.shape[1]
-    threshold = numpy.zeros(number_of_features)
-    polarity = numpy.zeros(number_of_features)
-    gain = numpy.zeros(number_of_features)
+    number_of_samples, number_of_features = training_features.shape
+    gradient = -numpy.reshape(loss_gradient, (number_of_samples,))
 
-    # For each feature find the optimum threshold, polarity and the gain
-    for i in range(number_of_features):
-      polarity[i], threshold[i], gain[i] = self.compute_threshold(training_features[:,i], -loss_gradient)
+    # select the features and samples that are evaluated in this round
+    selected = self._select_features(number_of_features)
+    samples, weights = self._select_samples(gradient)
+    if self._bins is not None:
+      return self._train_bins(selected, samples, weights)
+    if samples is not None:
+      # the samples that are not drawn do not contribute to the gains
+      gradient = numpy.zeros(number_of_samples)
+      gradient[samples] = weights
 
-    #  Find the optimum id and its corresponding trainer
-    best_index = gain.argmax()
+    # For each block of features, find the optimum threshold, polarity and the gain
+    indices = numpy.arange(number_of_features) if selected is None else selected
+    best_gain, best_index = -1., 0
+    for block in self._feature_blocks(number_of_samples, len(indices)):
+      columns = block if selected is None else indices[block]
+      polarity, threshold, gain = self._compute_thresholds(training_features[:,columns], gradient, self._sort_indices[:,columns], self._boundaries[:,columns])
+      index = gain.argmax()
+      if gain[index] > best_gain:
+        best_gain = gain[index]
+        best_index = indices[block][index]
+        best_polarity, best_threshold = polarity[index], threshold[index]
 
-    return StumpMachine(threshold[best_index], polarity[best_index], numpy.int32(best_index))
+    return StumpMachine(best_threshold, best_polarity, numpy.int32(best_index))
 
 
   def compute_threshold(self, features, gradient):
@@ -52,38 +262,150 @@ class StumpTrainer():
       polarity (float): the polarity or the direction used for stump classification
       gain (float): gain of the classifier
     """
-    # Sort the feature and rearrange the corresponding weights and feature values
-    sort_indices = numpy.argsort(features)
-    features = features[sort_indices]
-    gradient = gradient[sort_indices]
+    features = features[:,numpy.newaxis]
+    sort_indices = numpy.argsort(features, axis=0, kind='stable')
+    sorted_features = numpy.take_along_axis(features, sort_indices, axis=0)
+    boundaries = sorted_features[1:] != sorted_features[:-1]
+
+    polarity, threshold, gain = self._compute_thresholds(features, numpy.reshape(gradient, (features.shape[0],)), sort_indices, boundaries)
+
+    # return polarity, threshold and the gain
+    return polarity[0], threshold[0], gain[0]
+
+
+  def _prepare_bins(self, training_features):
+    """Quantizes each feature column into at most ``number_of_bins`` quantile bins, and computes the thresholds between neighboring bins."""
+    number_of_samples, number_of_features = training_features.shape
+    order = 'F' if training_features.flags.f_contiguous and not training_features.flags.c_contiguous else 'C'
+    bin_type = numpy.uint8 if self.m_number_of_bins <= 256 else numpy.uint16
+
+    self._bins = self._allocate("bins", (number_of_samples, number_of_features), bin_type, order)
+    # unused thresholds (of features with less bins) are NaN
+    self._bin_thresholds = numpy.full((self.m_number_of_bins - 1, number_of_features), numpy.nan)
+
+    quantiles = numpy.arange(1, self.m_number_of_bins) * number_of_samples // self.m_number_of_bins
+    for index in range(number_of_features):
+      features = numpy.asarray(training_features[:,index])
+      sorted_features = numpy.sort(features)
+      values = numpy.unique(sorted_features)
+      if len(values) <= self.m_number_of_bins:
+        # one bin per feature value
+        lower_bounds = values[1:]
+      else:
+        # the lower bounds of the bins are feature values, so that no bin is empty
+        lower_bounds = numpy.unique(sorted_features[quantiles])
+        lower_bounds = lower_bounds[lower_bounds > values[0]]
+      self._bins[:,index] = numpy.searchsorted(lower_bounds, features, side='right')
+      # the thresholds lie between the lower bound of a bin and the largest feature value of the previous bin
+      previous = values[numpy.searchsorted(values, lower_bounds) - 1]
+      self._bin_thresholds[:len(lower_bounds),index] = (previous.astype(numpy.float64) + lower_bounds) * 0.5
+
+    self._sort_indices = self._boundaries = None
+    self._training_features = training_features
+
+
+  def _select_features(self, number_of_features):
+    """Returns the sorted indices of the randomly selected features, or None if all features are evaluated."""
+    count = max(1, int(round(self.m_feature_fraction * number_of_features)))
+    if count >= number_of_features:
+      return None
+    return numpy.sort(self._random.choice(number_of_features, count, replace=False))
+
+
+  def _select_samples(self, gradient):
+    """Draws samples with probabilities proportional to their absolute gradients, and returns the drawn samples with their weights, or (None, gradient) if all samples are used.
+
+    The weights are computed such that the expected sums of weights are identical to the sums of gradients of all samples."""
+    number_of_samples = len(gradient)
+    draws = max(1, int(round(self.m_sample_fraction * number_of_samples)))
+    absolute = numpy.absolute(gradient)
+    total = numpy.sum(absolute)
+    if draws >= number_of_samples or total <= 0.:
+      return None, gradient
+
+    counts = numpy.bincount(self._random.choice(number_of_samples, draws, p=absolute/total), minlength=number_of_samples)
+    samples = numpy.flatnonzero(counts)
+    # each draw has the weight gradient / (draws * probability), which is sign(gradient) * total / draws
+    return samples, numpy.sign(gradient[samples]) * counts[samples] * (total / draws)
+
+
+  def _train_bins(self, selected, samples, weights):
+    """Computes the weak stump machine from the weighted histograms of the bins of the selected features and samples."""
+    bins = self._bins if samples is None else self._bins[samples]
+    histogram = numpy.zeros(self.m_number_of_bins)
+    best_gain, best_index, best_polarity, best_threshold = -1., 0, 1., 0.
+    for index in (range(bins.shape[1]) if selected is None else selected):
+      histogram.fill(0.)
+      weighted_histogram(bins[:,index], weights, histogram)
+      # the gain of each threshold is the sum of the gradients in all bins above it; thresholds of unused bins are NaN
+      grad_cs = numpy.cumsum(histogram)
+      gains = grad_cs[-1] - grad_cs[:-1]
+      absolute = numpy.where(numpy.isnan(self._bin_thresholds[:,index]), -1., numpy.absolute(gains))
+      best = absolute.argmax()
+      if absolute[best] > best_gain:
+        best_gain, best_index = absolute[best], index
+        best_polarity = -1. if gains[best] > 0 else 1.
+        best_threshold = self._bin_thresholds[best,index]
+
+    return StumpMachine(best_threshold, best_polarity, numpy.int32(best_index))
+
+
+  def _allocate(self, name, shape, dtype, order = 'C'):
+    """Allocates an array for the sort order, either in memory or memory-mapped in the cache directory.
+
+    Each array gets a new file with a unique name, so that several trainers can share the same cache directory.
+    The file is removed as soon as it is mapped; its disk space is released when the array is deleted.
+    """
+    if self.m_cache_directory is None or not all(shape):
+      return numpy.ndarray(shape, dtype, order = order)
+    if not os.path.isdir(self.m_cache_directory):
+      os.makedirs(self.m_cache_directory)
+    handle, filename = tempfile.mkstemp(dir = self.m_cache_directory, prefix = name + "_", suffix = ".bin")
+    try:
+      return numpy.memmap(filename, dtype, 'w+', shape = shape, order = order)
+    finally:
+      os.close(handle)
+      os.remove(filename)
 
-    unique_features, unique_indices = numpy.unique(features,return_index=True)
 
-    if unique_features.shape[0] == 1:
-      # if all features are identical, we gain nothing
-      return 1., 0., 0.
+  def _feature_blocks(self, number_of_samples, number_of_features):
+    """Splits the features into blocks, so that the temporaries of one block hold roughly 2^22 values."""
+    block_size = max(1, (1 << 22) // max(number_of_samples, 1))
+    for start in range(0, number_of_features, block_size):
+      yield slice(start, min(start + block_size, number_of_features))
 
-    grad_cs = numpy.ndarray(unique_features.shape[0]-1)
-    for i in range(1,unique_features.shape[0]):
-      grad_cs[i-1] = numpy.sum(gradient[unique_indices[0]:unique_indices[i]])
 
-    # For all the threshold compute the dot product
-#    grad_cs =  numpy.cumsum(gradient)
-    grad_sum = numpy.sum(gradient)
-    gain = (grad_sum - grad_cs)
+  def _compute_thresholds(self, features, gradient, sort_indices, boundaries):
+    """Computes polarity, threshold and gain for all given (pre-sorted) feature columns at once."""
+    number_of_features = features.shape[1]
+    polarity = numpy.ones(number_of_features)
+    threshold = numpy.zeros(number_of_features)
+    gain = numpy.zeros(number_of_features)
+
+    if features.shape[0] < 2:
+      # with less than two samples, we gain nothing
+      return polarity, threshold, gain
 
-    # Find the index that maximizes the gain
-    best_gain = numpy.argmax(numpy.absolute(gain))
+    # Rearrange the gradients according to the sorted feature values and compute the dot product for all thresholds
+    grad_cs = numpy.cumsum(gradient[sort_indices], axis=0)
+    gains = grad_cs[-1] - grad_cs[:-1]
+
+    # Find the index that maximizes the gain; only positions between two different feature values are valid
+    absolute = numpy.where(boundaries, numpy.absolute(gains), -1.)
+    best = absolute.argmax(axis=0)
+    columns = numpy.arange(number_of_features)
+
+    # if all features are identical, we gain nothing
+    valid = boundaries[best, columns]
+    best, columns = best[valid], columns[valid]
 
     # Find the corresponding threshold value
-    threshold = (unique_features[best_gain] + unique_features[best_gain+1])*0.5
+    lower = features[sort_indices[best, columns], columns]
+    upper = features[sort_indices[best+1, columns], columns]
+    threshold[valid] = (lower.astype(numpy.float64) + upper) * 0.5
 
     # Find the polarity or the directionality of the current trainer
-    if gain[best_gain] > 0:
-        polarity = -1
-    else:
-        polarity =  1
-
-    # return polarity, threshold and the gain
-    return polarity, threshold, abs(gain[best_gain])
+    polarity[valid] = numpy.where(gains[best, columns] > 0, -1., 1.)
+    gain[valid] = absolute[best, columns]
 
+    return polarity, threshold, gain
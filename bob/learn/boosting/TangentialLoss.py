@@ -36,3 +36,29 @@ class TangentialLoss(LossFunction):
         numer = 4. * (2. * numpy.arctan(m) - 1.)
         denom = 1. + m ** 2
         return numer / denom
+
+    def loss_second_derivative(self, targets, scores):
+        """The function computes the derivative of :py:meth:`loss_gradient` with respect to the scores, e.g., for the :py:class:`bob.learn.boosting.NewtonAlphaSolver`.
+
+        Keyword parameters:
+
+          targets (float <#samples, #outputs>): The target values that should be reached.
+
+          scores (float <#samples, #outputs>): The scores provided by the classifier.
+
+        Returns
+          (float <#samples, #outputs>): The second derivative of the loss based on the given scores and targets.
+        """
+        m = targets * scores
+        return 8. * targets * (1. - m * (2. * numpy.arctan(m) - 1.)) / (1. + m ** 2) ** 2
+
+    def loss_and_gradient_sum(self, alpha, targets, previous_scores, current_scores):
+        """The function computes the sum of the tangential loss and the sum of its gradient at once, computing the arc tangents only once.
+
+        See :py:meth:`bob.learn.boosting.LossFunction.loss_and_gradient_sum` for details.
+        """
+        m = targets * (previous_scores + alpha * current_scores)
+        d = 2. * numpy.arctan(m) - 1.
+        loss = d ** 2
+        gradient = 4. * d / (1. + m ** 2)
+        return numpy.sum(loss), numpy.sum(gradient * current_scores, 0)
@@ -9,14 +9,17 @@ from bob.learn.boosting.version import api as __api_version__
 
 # include loss functions
 from bob.learn.boosting.LossFunction import LossFunction # Just to get the documentation for it
-from bob.learn.boosting.ExponentialLoss import ExponentialLoss
+from bob.learn.boosting.ExponentialLoss import ExponentialLoss, ExponentialLossBuckets
 from bob.learn.boosting.LogitLoss import LogitLoss
 from bob.learn.boosting.TangentialLoss import TangentialLoss
 from bob.learn.boosting._library import JesorskyLoss
 
 # include trainers
 from bob.learn.boosting.StumpTrainer import StumpTrainer
+from bob.learn.boosting.AlphaSolver import AlphaSolver, AnalyticAlphaSolver, NewtonAlphaSolver, LBFGSAlphaSolver
 from bob.learn.boosting.Boosting import Boosting
+from bob.learn.boosting.CascadeTrainer import CascadeTrainer
+from bob.learn.boosting.ShardedTrainer import ShardedTrainer
 from bob.learn.boosting._library import LUTTrainer
 
 # include machines
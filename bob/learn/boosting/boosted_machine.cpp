@@ -3,6 +3,8 @@
 static auto boostedMachine_doc = bob::extension::ClassDoc(
   "BoostedMachine",
   "A strong machine that holds a weighted combination of weak machines",
+  "The :py:meth:`forward` function releases the GIL, so that one machine can be evaluated by several threads at the same time. "
+  "The machine is not locked, though: the functions that modify it, i.e., :py:meth:`add_weak_machine`, :py:meth:`load`, :py:meth:`load_mapped`, :py:meth:`compile`, :py:meth:`set_cascade`, :py:meth:`__setstate__` and setting :py:attr:`block_size`, must not be called while another thread evaluates the same machine, since they reallocate or change the arrays and parameters that :py:meth:`forward` reads.\n\n"
   ".. todo:: Improve documentation."
 )
 .add_constructor(
@@ -246,40 +248,81 @@ static auto boostedMachine_forward_doc = bob::extension::FunctionDoc(
   "forward",
   "Returns the prediction for the given feature vector(s)",
   ".. note:: The ``__call__`` function is an alias for this function.\n\n"
-  "This function can be called in six different ways:\n\n"
+  "This function can be called in six different ways, where the features can be of type uint16, uint8, float64 or float32:\n\n"
   "1. ``(uint16 <#inputs>)`` will compute and return the uni-variate prediction for a single feature vector.\n"
   "2. ``(uint16 <#samples,#inputs>, float <#samples>)`` will compute the uni-variate prediction for several feature vectors.\n"
   "3. ``(uint16 <#samples,#inputs>, float <#samples>, float<#samples>)`` will compute the uni-variate prediction and the labels for several feature vectors.\n"
   "4. ``(uint16 <#inputs>, float <#outputs>)`` will compute the multi-variate prediction for a single feature vector.\n"
   "5. ``(uint16 <#samples,#inputs>, float <#samples,#outputs>)`` will compute the multi-variate prediction for several feature vectors.\n"
-  "6. ``(uint16 <#samples,#inputs>, float <#samples,#outputs>, float <#samples,#outputs>)`` will compute the multi-variate prediction and the labels for several feature vectors.",
+  "6. ``(uint16 <#samples,#inputs>, float <#samples,#outputs>, float <#samples,#outputs>)`` will compute the multi-variate prediction and the labels for several feature vectors.\n\n"
+  "When the machine is a cascade (see :py:meth:`set_cascade`), the evaluation of a sample stops at the first stage where its partial score is below the stage threshold, and the partial score is returned. "
+  "In this case, samples are labeled +1 when they are accepted by all stages, and -1 otherwise.\n\n"
+  "Floating point features can only be evaluated by machines of :py:class:`StumpMachine`'s, e.g., the features that the :py:class:`bob.learn.boosting.StumpTrainer` was trained on.",
   true
 )
 .add_prototype("features", "prediction")
 .add_prototype("features, predictions")
 .add_prototype("features, predictions, labels")
-.add_parameter("features", "uint16 <#inputs> or uint16 <#samples, #inputs>", "The feature vector(s) the prediction should be computed for.")
+.add_parameter("features", "uint16, uint8, float64 or float32 <#inputs> or <#samples, #inputs>", "The feature vector(s) the prediction should be computed for.")
 .add_parameter("predictions", "float <#samples> or float <#outputs> or float <#samples, #outputs>", "The predicted values -- see below.")
 .add_parameter("labels", "float <#samples> or float <#samples, #outputs>", "The predicted labels:\n\n* for the uni-variate case, -1 or +1 is assigned according to threshold 0\n* for the multi-variate case, +1 is assigned for the highest value, and 0 for all others")
 .add_return("prediction", "float", "The predicted value - in case a single feature is provided and a single output is required")
 ;
 
-template <int N1, int N2> void _forward(BoostedMachineObject* self, PyBlitzArrayObject* features, PyBlitzArrayObject* predictions, PyBlitzArrayObject* labels){
-  const auto f = PyBlitzArrayCxx_AsBlitz<uint16_t,N1>(features);
+template <typename T>
+static double _forward(BoostedMachineObject* self, PyBlitzArrayObject* features){
+  const auto f = PyBlitzArrayCxx_AsBlitz<T,1>(features);
+  GILReleaser releaser;
+  return self->base->forward(*f);
+}
+template <typename T, int N1, int N2> void _forward(BoostedMachineObject* self, PyBlitzArrayObject* features, PyBlitzArrayObject* predictions, PyBlitzArrayObject* labels){
+  const auto f = PyBlitzArrayCxx_AsBlitz<T,N1>(features);
   auto p = PyBlitzArrayCxx_AsBlitz<double,N2>(predictions);
   if (labels){
     auto l = PyBlitzArrayCxx_AsBlitz<double,N2>(labels);
+    GILReleaser releaser;
     self->base->forward(*f, *p, *l);
-  } else
+  } else {
+    GILReleaser releaser;
     self->base->forward(*f, *p);
+  }
 }
+template <typename T>
 void _forward(BoostedMachineObject* self, PyBlitzArrayObject* features, PyBlitzArrayObject* predictions){
-  const auto f = PyBlitzArrayCxx_AsBlitz<uint16_t,1>(features);
+  const auto f = PyBlitzArrayCxx_AsBlitz<T,1>(features);
   auto p = PyBlitzArrayCxx_AsBlitz<double,1>(predictions);
+  GILReleaser releaser;
   self->base->forward(*f, *p);
 }
 
 
+// evaluates the machine for the given features of type T in one of the six ways
+template <typename T>
+static PyObject* _forwardFeatures(BoostedMachineObject* self, PyBlitzArrayObject* features, PyBlitzArrayObject* predictions, PyBlitzArrayObject* labels){
+  if (!predictions){
+    // uni-variate, single feature
+    if (features->ndim != 1){
+      boostedMachine_forward_doc.print_usage();
+      PyErr_SetString(PyExc_TypeError, "When a single parameter is specified, only 1D arrays are supported.");
+      return NULL;
+    }
+    return Py_BuildValue("d", _forward<T>(self, features));
+  }
+
+  if (features->ndim == 1 && predictions->ndim == 1)
+    _forward<T>(self, features, predictions);
+  else if (features->ndim == 2 && predictions->ndim == 1)
+    _forward<T,2,1>(self, features, predictions, labels);
+  else if (features->ndim == 2 && predictions->ndim == 2)
+    _forward<T,2,2>(self, features, predictions, labels);
+  else {
+    boostedMachine_forward_doc.print_usage();
+    PyErr_Format(PyExc_TypeError, "The number of dimensions of features (%d) and predictions (%d) are not supported", (int)features->ndim, (int)predictions->ndim);
+    return NULL;
+  }
+  Py_RETURN_NONE;
+}
+
 static PyObject* boostedMachine_forward(
   BoostedMachineObject* self,
   PyObject* args,
@@ -294,55 +337,37 @@ static PyObject* boostedMachine_forward(
   if (!PyArg_ParseTupleAndKeywords(
           args, kwargs,
           "O&|O&O&", kwlist,
-          &PyBlitzArray_Converter, &p_features,
+          &featuresConverter, &p_features,
           &PyBlitzArray_Converter, &p_predictions,
           &PyBlitzArray_Converter, &p_labels
       )
   )
     return NULL;
 
-  auto _1 = make_safe(p_features), _2 = make_xsafe(p_predictions);
+  auto _1 = make_safe(p_features), _2 = make_xsafe(p_predictions), _3 = make_xsafe(p_labels);
 
   try{
-    if (!p_predictions){
-      // uni-variate, single feature
-      const auto features = PyBlitzArrayCxx_AsBlitz<uint16_t,1>(p_features, kwlist[0]);
-      if (!features){
-        boostedMachine_forward_doc.print_usage();
-        PyErr_SetString(PyExc_TypeError, "When a single parameter is specified, only 1D arrays of type uint16 are supported.");
-        return NULL;
-      }
-      return Py_BuildValue("d", self->base->forward(*features));
-    }
-
-    if (p_features->type_num != NPY_UINT16){
-      boostedMachine_forward_doc.print_usage();
-      PyErr_SetString(PyExc_TypeError, "The parameter 'features' only supports 1D or 2D arrays of type uint16");
-      return NULL;
-    }
-    if (p_predictions->type_num != NPY_FLOAT64){
+    if (p_predictions && p_predictions->type_num != NPY_FLOAT64){
       boostedMachine_forward_doc.print_usage();
       PyErr_SetString(PyExc_TypeError, "The parameter 'predictions' only supports 1D or 2D arrays of type float");
       return NULL;
     }
-    if (p_labels && (p_labels->type_num != NPY_FLOAT64 || p_labels->ndim != p_predictions->ndim)){
+    if (p_labels && (!p_predictions || p_labels->type_num != NPY_FLOAT64 || p_labels->ndim != p_predictions->ndim)){
       boostedMachine_forward_doc.print_usage();
       PyErr_SetString(PyExc_TypeError, "The parameter 'labels' only supports 1D or 2D arrays (same as 'predictions') of type float");
       return NULL;
     }
 
-    if (p_features->ndim == 1 && p_predictions->ndim == 1)
-      _forward(self, p_features, p_predictions);
-    else if (p_features->ndim == 2 && p_predictions->ndim == 1)
-      _forward<2,1>(self, p_features, p_predictions, p_labels);
-    else if (p_features->ndim == 2 && p_predictions->ndim == 2)
-      _forward<2,2>(self, p_features, p_predictions, p_labels);
-    else {
-      boostedMachine_forward_doc.print_usage();
-      PyErr_Format(PyExc_TypeError, "The number of dimensions of %s (%d) and %s (%d) are not supported", kwlist[0], (int)p_features->ndim, kwlist[1], (int)p_predictions->ndim);
-      return NULL;
+    switch (p_features->type_num){
+      case NPY_UINT16: return _forwardFeatures<uint16_t>(self, p_features, p_predictions, p_labels);
+      case NPY_UINT8: return _forwardFeatures<uint8_t>(self, p_features, p_predictions, p_labels);
+      case NPY_FLOAT64: return _forwardFeatures<double>(self, p_features, p_predictions, p_labels);
+      case NPY_FLOAT32: return _forwardFeatures<float>(self, p_features, p_predictions, p_labels);
+      default:
+        boostedMachine_forward_doc.print_usage();
+        PyErr_SetString(PyExc_TypeError, "The parameter 'features' only supports 1D or 2D arrays of type uint16, uint8, float64 or float32");
+        return NULL;
     }
-    Py_RETURN_NONE;
   } catch (std::exception& ex) {
     PyErr_SetString(PyExc_RuntimeError, ex.what());
     return NULL;
@@ -388,7 +413,7 @@ static PyObject* boostedMachine_getIndices(
 static auto boostedMachine_load_doc = bob::extension::FunctionDoc(
   "load",
   "Loads the Strong machine from the given HDF5 file",
-  NULL,
+  "Files of all versions can be read, i.e., the packed layout of version 3 and the layouts of version 1 and 2 with one group per weak machine.",
   true
 )
 .add_prototype("hdf5")
@@ -414,7 +439,12 @@ static PyObject* boostedMachine_load(
   }
 
   auto _1 = make_safe(file);
-  self->base->load(*file->f);
+  try{
+    self->base->load(*file->f);
+  } catch (std::exception& ex) {
+    PyErr_SetString(PyExc_RuntimeError, ex.what());
+    return NULL;
+  }
   Py_RETURN_NONE;
 }
 
@@ -422,7 +452,8 @@ static PyObject* boostedMachine_load(
 static auto boostedMachine_save_doc = bob::extension::FunctionDoc(
   "save",
   "Saves the content of this machine to the given HDF5 file",
-  NULL,
+  "When all weak machines are :py:class:`bob.learn.boosting.LUTMachine` or :py:class:`bob.learn.boosting.StumpMachine`, the packed layout of version 3 is written, which stores the parameters of all weak machines in a few contiguous datasets and can be read with a few I/O calls. "
+  "Otherwise, one group per weak machine is written (version 2).",
   true
 )
 .add_prototype("hdf5")
@@ -448,10 +479,471 @@ static PyObject* boostedMachine_save(
   }
 
   auto _1 = make_safe(file);
-  self->base->save(*file->f);
+  try{
+    self->base->save(*file->f);
+  } catch (std::exception& ex) {
+    PyErr_SetString(PyExc_RuntimeError, ex.what());
+    return NULL;
+  }
   Py_RETURN_NONE;
 }
 
+
+static auto boostedMachine_saveMapped_doc = bob::extension::FunctionDoc(
+  "save_mapped",
+  "Writes the compiled representation of this machine (see :py:meth:`compile`) to a flat binary file, which can be memory-mapped with :py:meth:`load_mapped`",
+  "The file contains the weighted LUTs or stumps and the cascade of this machine in contiguous arrays, in the byte order of this computer. "
+  "It is written under a temporary name and renamed afterwards, so that processes that have mapped an older version of the file can continue to use it.",
+  true
+)
+.add_prototype("filename")
+.add_parameter("filename", "str", "The name of the file to write")
+;
+
+static PyObject* boostedMachine_saveMapped(
+  BoostedMachineObject* self,
+  PyObject* args,
+  PyObject* kwargs
+)
+{
+  char* kwlist[] = {c("filename"), NULL};
+  const char* filename = 0;
+  if (!PyArg_ParseTupleAndKeywords(args, kwargs, "s", kwlist, &filename)){
+    boostedMachine_saveMapped_doc.print_usage();
+    return NULL;
+  }
+
+  try{
+    self->base->saveMapped(filename);
+  } catch (std::exception& ex) {
+    PyErr_SetString(PyExc_RuntimeError, ex.what());
+    return NULL;
+  }
+  Py_RETURN_NONE;
+}
+
+
+static auto boostedMachine_loadMapped_doc = bob::extension::FunctionDoc(
+  "load_mapped",
+  "Memory-maps the given file written by :py:meth:`save_mapped`, and turns this machine into a read-only compiled machine that evaluates the mapped arrays",
+  "The file is mapped read-only and shared, so that all processes that map the same file, e.g., the workers of a pre-forking server, share one copy of the model in the page cache, and loading the machine does not read the model. "
+  "Afterwards, the machine has no :py:attr:`weak_machines`, it cannot be modified with :py:meth:`add_weak_machine` and it cannot be written with :py:meth:`save`; :py:meth:`load` turns it into a regular machine again. "
+  "The file must not be modified while it is mapped. "
+  "The file stores the size of each LUT, and feature values that exceed it raise a :py:class:`RuntimeError` instead of reading behind the LUT.",
+  true
+)
+.add_prototype("filename")
+.add_parameter("filename", "str", "The name of the file to map")
+;
+
+static PyObject* boostedMachine_loadMapped(
+  BoostedMachineObject* self,
+  PyObject* args,
+  PyObject* kwargs
+)
+{
+  char* kwlist[] = {c("filename"), NULL};
+  const char* filename = 0;
+  if (!PyArg_ParseTupleAndKeywords(args, kwargs, "s", kwlist, &filename)){
+    boostedMachine_loadMapped_doc.print_usage();
+    return NULL;
+  }
+
+  try{
+    self->base->loadMapped(filename);
+  } catch (std::exception& ex) {
+    PyErr_SetString(PyExc_RuntimeError, ex.what());
+    return NULL;
+  }
+  Py_RETURN_NONE;
+}
+
+
+static auto boostedMachine_compile_doc = bob::extension::FunctionDoc(
+  "compile",
+  "Flattens the weak machines into contiguous arrays to speed up the prediction",
+  "After compilation, all calls to :py:meth:`forward` evaluate the weak machines in a single pass over the samples, without calling the weak machines. "
+  "The predictions are identical to the ones of the non-compiled machine. "
+  "Compilation is only possible when all weak machines are of type :py:class:`bob.learn.boosting.LUTMachine`, or all are (uni-variate) :py:class:`bob.learn.boosting.StumpMachine`'s. "
+  "Adding a weak machine or loading the machine from file reverts the machine to the non-compiled state.",
+  true
+)
+.add_prototype("")
+;
+
+static PyObject* boostedMachine_compile(
+  BoostedMachineObject* self,
+  PyObject* args,
+  PyObject* kwargs
+)
+{
+  char* kwlist[] = {NULL};
+  if (!PyArg_ParseTupleAndKeywords(args, kwargs, "", kwlist)){
+    boostedMachine_compile_doc.print_usage();
+    return NULL;
+  }
+
+  try{
+    self->base->compile();
+  } catch (std::exception& ex) {
+    PyErr_SetString(PyExc_RuntimeError, ex.what());
+    return NULL;
+  }
+  catch (...) {
+    PyErr_Format(PyExc_RuntimeError, "%s cannot compile machine - unknown exception thrown", Py_TYPE(self)->tp_name);
+    return NULL;
+  }
+  Py_RETURN_NONE;
+}
+
+
+// adds the given array to the pickled state; empty arrays are not stored, like in the HDF5 files
+template <typename T, int N>
+static bool _setState(PyObject* state, const char* key, blitz::Array<T,N> array){
+  if (!array.size()) return true;
+  PyObject* value = PyBlitzArrayCxx_AsNumpy(array);
+  if (!value) return false;
+  auto _ = make_safe(value);
+  return PyDict_SetItemString(state, key, value) == 0;
+}
+
+// reads the given array from the pickled state, if it is stored; the array references the memory of the returned object
+template <typename T, int N>
+static bool _getState(PyObject* state, const char* key, blitz::Array<T,N>& array, std::vector<boost::shared_ptr<PyBlitzArrayObject> >& references){
+  PyObject* value = PyDict_GetItemString(state, key);
+  if (!value) return true;
+  PyBlitzArrayObject* converted = 0;
+  if (!PyBlitzArray_Converter(value, &converted)) return false;
+  references.push_back(make_safe(converted));
+  const auto blitz = PyBlitzArrayCxx_AsBlitz<T,N>(converted, key);
+  if (!blitz) return false;
+  array.reference(*blitz);
+  return true;
+}
+
+// releases the content of the mapped file, when the array returned by _mappedData is deleted
+static void _releaseMappedData(PyObject* capsule){
+  delete static_cast<boost::shared_ptr<const char>*>(PyCapsule_GetPointer(capsule, NULL));
+}
+
+// returns a read-only uint8 array of the given memory, which keeps the memory alive
+static PyObject* _mappedData(const boost::shared_ptr<const char>& data, size_t size){
+  npy_intp shape = size;
+  PyObject* array = PyArray_SimpleNewFromData(1, &shape, NPY_UINT8, const_cast<char*>(data.get()));
+  if (!array) return NULL;
+  auto _ = make_safe(array);
+  PyArray_CLEARFLAGS(reinterpret_cast<PyArrayObject*>(array), NPY_ARRAY_WRITEABLE);
+  boost::shared_ptr<const char>* owner = new boost::shared_ptr<const char>(data);
+  PyObject* capsule = PyCapsule_New(owner, NULL, _releaseMappedData);
+  if (!capsule){
+    delete owner;
+    return NULL;
+  }
+  // steals the reference to the capsule
+  if (PyArray_SetBaseObject(reinterpret_cast<PyArrayObject*>(array), capsule) < 0) return NULL;
+  Py_INCREF(array);
+  return array;
+}
+
+static auto boostedMachine_reduce_doc = bob::extension::FunctionDoc(
+  "__reduce__",
+  "Returns the state of this machine for pickling",
+  "The parameters of all weak machines are stored in a few contiguous arrays, in the same layout as in the HDF5 files written by :py:meth:`save`. "
+  "With pickle protocol 5, these arrays can be transferred as out-of-band buffers, e.g., to the workers of a :py:class:`multiprocessing.Pool`. "
+  "Memory-mapped machines (see :py:meth:`load_mapped`) are pickled with the content of their file, which is checked when unpickling; the unpickled machine holds a copy of the content, and is read-only as well.",
+  true
+)
+.add_prototype("", "constructor, arguments, state")
+;
+
+static PyObject* boostedMachine_reduce(
+  BoostedMachineObject* self,
+  PyObject*
+)
+{
+  try{
+    PyObject* state = PyDict_New();
+    if (!state) return NULL;
+    auto _ = make_safe(state);
+
+    PyObject* block_size = Py_BuildValue("i", self->base->getBlockSize());
+    if (!block_size) return NULL;
+    auto _b = make_safe(block_size);
+    if (PyDict_SetItemString(state, "block_size", block_size) < 0) return NULL;
+
+    if (self->base->isMapped()){
+      size_t size;
+      boost::shared_ptr<const char> content = self->base->getMappedData(size);
+      PyObject* data = _mappedData(content, size);
+      if (!data) return NULL;
+      auto _d = make_safe(data);
+      if (PyDict_SetItemString(state, "mapped_data", data) < 0) return NULL;
+    } else {
+      bob::learn::boosting::PackedWeakMachines packed;
+      self->base->pack(packed);
+      if (
+        !_setState(state, "weights", self->base->getWeights()) ||
+        !_setState(state, "machine_types", packed.types) ||
+        !_setState(state, "stump_thresholds", packed.stumpThresholds) ||
+        !_setState(state, "stump_polarities", packed.stumpPolarities) ||
+        !_setState(state, "stump_indices", packed.stumpIndices) ||
+        !_setState(state, "lut_shapes", packed.lutShapes) ||
+        !_setState(state, "luts", packed.luts) ||
+        !_setState(state, "lut_indices", packed.lutIndices) ||
+        !_setState(state, "cascade_stages", self->base->getCascadeStages()) ||
+        !_setState(state, "cascade_thresholds", self->base->getCascadeThresholds())
+      ) return NULL;
+      if (PyDict_SetItemString(state, "is_compiled", self->base->isCompiled() ? Py_True : Py_False) < 0) return NULL;
+    }
+    return Py_BuildValue("(O()O)", Py_TYPE(self), state);
+  } catch (std::exception& ex) {
+    PyErr_SetString(PyExc_RuntimeError, ex.what());
+    return NULL;
+  }
+  catch (...) {
+    PyErr_Format(PyExc_RuntimeError, "%s cannot be pickled - unknown exception thrown", Py_TYPE(self)->tp_name);
+    return NULL;
+  }
+}
+
+
+static auto boostedMachine_setstate_doc = bob::extension::FunctionDoc(
+  "__setstate__",
+  "Restores the state of this machine when unpickling",
+  NULL,
+  true
+)
+.add_prototype("state")
+.add_parameter("state", "dict", "The state returned by :py:meth:`__reduce__`")
+;
+
+static PyObject* boostedMachine_setstate(
+  BoostedMachineObject* self,
+  PyObject* state
+)
+{
+  if (!PyDict_Check(state)){
+    PyErr_Format(PyExc_TypeError, "%s expects a dict as state, but got %s", Py_TYPE(self)->tp_name, Py_TYPE(state)->tp_name);
+    return NULL;
+  }
+
+  try{
+    PyObject* data = PyDict_GetItemString(state, "mapped_data");
+    if (data){
+      // the content is checked and copied, just like the content of a file
+      Py_buffer view;
+      if (PyObject_GetBuffer(data, &view, PyBUF_SIMPLE) < 0) return NULL;
+      try{
+        self->base->loadMapped(view.buf, view.len);
+      } catch (...) {
+        PyBuffer_Release(&view);
+        throw;
+      }
+      PyBuffer_Release(&view);
+    } else {
+      // the arrays reference the unpickled buffers until the weak machines are created
+      std::vector<boost::shared_ptr<PyBlitzArrayObject> > references;
+      blitz::Array<double,2> weights;
+      blitz::Array<int32_t,1> stages;
+      blitz::Array<double,1> thresholds;
+      bob::learn::boosting::PackedWeakMachines packed;
+      if (
+        !_getState(state, "weights", weights, references) ||
+        !_getState(state, "machine_types", packed.types, references) ||
+        !_getState(state, "stump_thresholds", packed.stumpThresholds, references) ||
+        !_getState(state, "stump_polarities", packed.stumpPolarities, references) ||
+        !_getState(state, "stump_indices", packed.stumpIndices, references) ||
+        !_getState(state, "lut_shapes", packed.lutShapes, references) ||
+        !_getState(state, "luts", packed.luts, references) ||
+        !_getState(state, "lut_indices", packed.lutIndices, references) ||
+        !_getState(state, "cascade_stages", stages, references) ||
+        !_getState(state, "cascade_thresholds", thresholds, references)
+      ) return NULL;
+      self->base->unpack(weights, packed);
+      if (stages.extent(0)) self->base->setCascade(stages, thresholds);
+      PyObject* compiled = PyDict_GetItemString(state, "is_compiled");
+      if (compiled && PyObject_IsTrue(compiled)) self->base->compile();
+    }
+
+    PyObject* block_size = PyDict_GetItemString(state, "block_size");
+    if (block_size){
+      const long value = PyLong_AsLong(block_size);
+      if (PyErr_Occurred()) return NULL;
+      self->base->setBlockSize(value);
+    }
+  } catch (std::exception& ex) {
+    PyErr_SetString(PyExc_RuntimeError, ex.what());
+    return NULL;
+  }
+  catch (...) {
+    PyErr_Format(PyExc_RuntimeError, "%s cannot be unpickled - unknown exception thrown", Py_TYPE(self)->tp_name);
+    return NULL;
+  }
+  Py_RETURN_NONE;
+}
+
+
+static auto boostedMachine_setCascade_doc = bob::extension::FunctionDoc(
+  "set_cascade",
+  "Turns this (uni-variate) machine into a cascade with the given stages and rejection thresholds",
+  "The weak machines are split into consecutive stages, where ``stage_ends`` contains the index after the last weak machine of each stage; the last stage must end at the number of weak machines. "
+  "During :py:meth:`forward`, the weak machines are evaluated stage by stage, and a sample is rejected as soon as its partial score after a stage is below the ``threshold`` of that stage. "
+  "Use :py:class:`bob.learn.boosting.CascadeTrainer` to select the thresholds for a given detection rate. "
+  "Empty arrays remove the cascade; adding a weak machine removes the cascade, too. "
+  "The cascade is stored in and read from HDF5 files with :py:meth:`save` and :py:meth:`load`.",
+  true
+)
+.add_prototype("stage_ends, thresholds")
+.add_parameter("stage_ends", "int <#stages>", "The index after the last weak machine of each stage")
+.add_parameter("thresholds", "float <#stages>", "The rejection threshold for each stage")
+;
+
+static PyObject* boostedMachine_setCascade(
+  BoostedMachineObject* self,
+  PyObject* args,
+  PyObject* kwargs
+)
+{
+  char* kwlist[] = {c("stage_ends"), c("thresholds"), NULL};
+
+  PyBlitzArrayObject* p_stages = 0,* p_thresholds = 0;
+
+  if (!PyArg_ParseTupleAndKeywords(
+          args, kwargs,
+          "O&O&", kwlist,
+          &PyBlitzArray_Converter, &p_stages,
+          &PyBlitzArray_Converter, &p_thresholds)
+  ){
+    boostedMachine_setCascade_doc.print_usage();
+    return NULL;
+  }
+  auto _1 = make_safe(p_stages), _2 = make_safe(p_thresholds);
+
+  const auto stages = PyBlitzArrayCxx_AsBlitz<int32_t,1>(p_stages, kwlist[0]);
+  const auto thresholds = PyBlitzArrayCxx_AsBlitz<double,1>(p_thresholds, kwlist[1]);
+  if (!stages || !thresholds){
+    boostedMachine_setCascade_doc.print_usage();
+    return NULL;
+  }
+
+  try{
+    self->base->setCascade(*stages, *thresholds);
+  } catch (std::exception& ex) {
+    PyErr_SetString(PyExc_RuntimeError, ex.what());
+    return NULL;
+  }
+  catch (...) {
+    PyErr_Format(PyExc_RuntimeError, "%s cannot set cascade - unknown exception thrown", Py_TYPE(self)->tp_name);
+    return NULL;
+  }
+  Py_RETURN_NONE;
+}
+
+
+static auto boostedMachine_cascadeStages_doc = bob::extension::VariableDoc(
+  "cascade_stages",
+  "int <#stages>",
+  "The index after the last weak machine of each stage of the cascade; ``None`` if this machine is no cascade"
+);
+
+static PyObject* boostedMachine_cascadeStages(
+  BoostedMachineObject* self,
+  void*
+)
+{
+  if (!self->base->isCascade()) Py_RETURN_NONE;
+  auto retval = self->base->getCascadeStages();
+  return PyBlitzArrayCxx_AsConstNumpy(retval);
+}
+
+
+static auto boostedMachine_cascadeThresholds_doc = bob::extension::VariableDoc(
+  "cascade_thresholds",
+  "float <#stages>",
+  "The rejection thresholds of the stages of the cascade; ``None`` if this machine is no cascade"
+);
+
+static PyObject* boostedMachine_cascadeThresholds(
+  BoostedMachineObject* self,
+  void*
+)
+{
+  if (!self->base->isCascade()) Py_RETURN_NONE;
+  auto retval = self->base->getCascadeThresholds();
+  return PyBlitzArrayCxx_AsConstNumpy(retval);
+}
+
+
+static auto boostedMachine_blockSize_doc = bob::extension::VariableDoc(
+  "block_size",
+  "int",
+  "The number of samples that are evaluated with all weak machines at a time",
+  "When several samples are forwarded, the samples are split into blocks of this size, and each block is evaluated with all weak machines before the next block is processed. "
+  "This keeps the features of the current block in the CPU cache. "
+  "A value of 0 evaluates each weak machine on all samples at once. "
+  "The block size has no influence on the predictions, nor on :py:meth:`compile`'d machines, which always process one sample at a time."
+);
+
+static PyObject* boostedMachine_get_blockSize(
+  BoostedMachineObject* self,
+  void*
+)
+{
+  return Py_BuildValue("i", self->base->getBlockSize());
+}
+
+static int boostedMachine_set_blockSize(
+  BoostedMachineObject* self,
+  PyObject* value,
+  void*
+)
+{
+  if (!value){
+    PyErr_Format(PyExc_TypeError, "Cannot delete the '%s' attribute", boostedMachine_blockSize_doc.name());
+    return -1;
+  }
+  int block_size = PyLong_AsLong(value);
+  if (PyErr_Occurred()) return -1;
+  if (block_size < 0){
+    PyErr_Format(PyExc_ValueError, "The '%s' must not be negative, but it is %d", boostedMachine_blockSize_doc.name(), block_size);
+    return -1;
+  }
+  self->base->setBlockSize(block_size);
+  return 0;
+}
+
+
+static auto boostedMachine_compiled_doc = bob::extension::VariableDoc(
+  "is_compiled",
+  "bool",
+  "Has this machine been compiled (see :py:meth:`compile`)?"
+);
+
+static PyObject* boostedMachine_compiled(
+  BoostedMachineObject* self,
+  void*
+)
+{
+  if (self->base->isCompiled()) Py_RETURN_TRUE;
+  Py_RETURN_FALSE;
+}
+
+
+static auto boostedMachine_mapped_doc = bob::extension::VariableDoc(
+  "is_mapped",
+  "bool",
+  "Has this machine been memory-mapped from file (see :py:meth:`load_mapped`)?"
+);
+
+static PyObject* boostedMachine_mapped(
+  BoostedMachineObject* self,
+  void*
+)
+{
+  if (self->base->isMapped()) Py_RETURN_TRUE;
+  Py_RETURN_FALSE;
+}
+
 // bind the class
 static PyGetSetDef boostedMachine_Getters[] = {
   {
@@ -489,6 +981,41 @@ static PyGetSetDef boostedMachine_Getters[] = {
     boostedMachine_machines_doc.doc(),
     NULL
   },
+  {
+    boostedMachine_cascadeStages_doc.name(),
+    (getter)boostedMachine_cascadeStages,
+    NULL,
+    boostedMachine_cascadeStages_doc.doc(),
+    NULL
+  },
+  {
+    boostedMachine_cascadeThresholds_doc.name(),
+    (getter)boostedMachine_cascadeThresholds,
+    NULL,
+    boostedMachine_cascadeThresholds_doc.doc(),
+    NULL
+  },
+  {
+    boostedMachine_blockSize_doc.name(),
+    (getter)boostedMachine_get_blockSize,
+    (setter)boostedMachine_set_blockSize,
+    boostedMachine_blockSize_doc.doc(),
+    NULL
+  },
+  {
+    boostedMachine_compiled_doc.name(),
+    (getter)boostedMachine_compiled,
+    NULL,
+    boostedMachine_compiled_doc.doc(),
+    NULL
+  },
+  {
+    boostedMachine_mapped_doc.name(),
+    (getter)boostedMachine_mapped,
+    NULL,
+    boostedMachine_mapped_doc.doc(),
+    NULL
+  },
   {NULL}
 };
 
@@ -523,6 +1050,42 @@ static PyMethodDef boostedMachine_Methods[] = {
     METH_VARARGS | METH_KEYWORDS,
     boostedMachine_save_doc.doc(),
   },
+  {
+    boostedMachine_saveMapped_doc.name(),
+    (PyCFunction)boostedMachine_saveMapped,
+    METH_VARARGS | METH_KEYWORDS,
+    boostedMachine_saveMapped_doc.doc(),
+  },
+  {
+    boostedMachine_loadMapped_doc.name(),
+    (PyCFunction)boostedMachine_loadMapped,
+    METH_VARARGS | METH_KEYWORDS,
+    boostedMachine_loadMapped_doc.doc(),
+  },
+  {
+    boostedMachine_compile_doc.name(),
+    (PyCFunction)boostedMachine_compile,
+    METH_VARARGS | METH_KEYWORDS,
+    boostedMachine_compile_doc.doc(),
+  },
+  {
+    boostedMachine_setCascade_doc.name(),
+    (PyCFunction)boostedMachine_setCascade,
+    METH_VARARGS | METH_KEYWORDS,
+    boostedMachine_setCascade_doc.doc(),
+  },
+  {
+    boostedMachine_reduce_doc.name(),
+    (PyCFunction)boostedMachine_reduce,
+    METH_NOARGS,
+    boostedMachine_reduce_doc.doc(),
+  },
+  {
+    boostedMachine_setstate_doc.name(),
+    (PyCFunction)boostedMachine_setstate,
+    METH_O,
+    boostedMachine_setstate_doc.doc(),
+  },
   {NULL}
 };
 
@@ -536,7 +1099,9 @@ bool init_BoostedMachine(PyObject* module)
 {
 
   // initialize the JesorskyLossType struct
-  BoostedMachineType.tp_name = boostedMachine_doc.name();
+  // the name includes the module, so that the machines can be pickled
+  static const std::string name = std::string(BOB_EXT_MODULE_PREFIX "." BOB_EXT_MODULE_NAME ".") + boostedMachine_doc.name();
+  BoostedMachineType.tp_name = name.c_str();
   BoostedMachineType.tp_basicsize = sizeof(BoostedMachineObject);
   BoostedMachineType.tp_flags = Py_TPFLAGS_DEFAULT;
   BoostedMachineType.tp_doc = boostedMachine_doc.doc();
@@ -1,93 +1,376 @@
 #include <bob.learn.boosting/BoostedMachine.h>
 #include <bob.learn.boosting/Functions.h>
+#include <bob.learn.boosting/LUTMachine.h>
+#include <bob.learn.boosting/StumpMachine.h>
+#include <bob.core/assert.h>
+#include <bob.core/check.h>
+#include <bob.core/array_copy.h>
+#include <boost/format.hpp>
 #include <sstream>
+#include <fstream>
 #include <set>
+#include <limits>
+#include <cerrno>
+#include <cstdio>
+#include <cstring>
+#include <fcntl.h>
+#include <unistd.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+
+// the flattened arrays of the compiled representation, when they are not memory-mapped
+struct bob::learn::boosting::BoostedMachine::CompiledArrays{
+  std::vector<int32_t> indices;
+  std::vector<int64_t> offsets, sizes;
+  std::vector<double> thresholds, values;
+};
 
 bob::learn::boosting::BoostedMachine::BoostedMachine() :
   m_weak_machines(),
-  m_weights()
+  m_weights(),
+  m_blockSize(256),
+  m_cascadeStages(),
+  m_cascadeThresholds(),
+  m_compiled(none),
+  m_compiledIndices(0),
+  m_compiledOffsets(0),
+  m_compiledSizes(0),
+  m_compiledThresholds(0),
+  m_compiledValues(0),
+  m_compiledStorage(),
+  m_mapped(false),
+  m_mappedData(0),
+  m_mappedSize(0)
 {
 }
 
 bob::learn::boosting::BoostedMachine::BoostedMachine(bob::io::base::HDF5File& file) :
   m_weak_machines(),
-  m_weights()
+  m_weights(),
+  m_blockSize(256),
+  m_cascadeStages(),
+  m_cascadeThresholds(),
+  m_compiled(none),
+  m_compiledIndices(0),
+  m_compiledOffsets(0),
+  m_compiledSizes(0),
+  m_compiledThresholds(0),
+  m_compiledValues(0),
+  m_compiledStorage(),
+  m_mapped(false),
+  m_mappedData(0),
+  m_mappedSize(0)
 {
   load(file);
 }
 
 void bob::learn::boosting::BoostedMachine::add_weak_machine(const boost::shared_ptr<WeakMachine> weak_machine, const double weight){
+  if (m_mapped) throw std::runtime_error("Cannot add weak machines to a memory-mapped machine.");
   m_weak_machines.push_back(weak_machine);
   m_weights.resizeAndPreserve(m_weak_machines.size(), 1);
   m_weights(m_weights.extent(0)-1, 0) = weight;
-  _weights.reference(m_weights(blitz::Range::all(), 0));
+  m_compiled = none;
+  m_cascadeStages.resize(0);
+  m_cascadeThresholds.resize(0);
 }
 
 
 void bob::learn::boosting::BoostedMachine::add_weak_machine(const boost::shared_ptr<WeakMachine> weak_machine, const blitz::Array<double,1> weights){
+  if (m_mapped) throw std::runtime_error("Cannot add weak machines to a memory-mapped machine.");
   m_weak_machines.push_back(weak_machine);
   m_weights.resizeAndPreserve(m_weak_machines.size(), weights.extent(0));
   m_weights(m_weights.extent(0)-1, blitz::Range::all()) = weights;
-  _weights.reference(m_weights(blitz::Range::all(), 0));
+  m_compiled = none;
+  m_cascadeStages.resize(0);
+  m_cascadeThresholds.resize(0);
 }
 
 
-double bob::learn::boosting::BoostedMachine::forward(const blitz::Array<uint16_t,1>& features) const{
+void bob::learn::boosting::BoostedMachine::compile(){
+  // memory-mapped machines are compiled already
+  if (m_mapped) return;
+  boost::shared_ptr<CompiledArrays> arrays(new CompiledArrays);
+  const CompiledType type = _compile(*arrays);
+  m_compiledIndices = arrays->indices.data();
+  m_compiledOffsets = arrays->offsets.data();
+  m_compiledSizes = arrays->sizes.data();
+  m_compiledThresholds = arrays->thresholds.data();
+  m_compiledValues = arrays->values.data();
+  m_compiledStorage = arrays;
+  m_compiled = type;
+}
+
+bob::learn::boosting::BoostedMachine::CompiledType bob::learn::boosting::BoostedMachine::_compile(CompiledArrays& arrays) const{
+  if (m_weak_machines.empty()) throw std::runtime_error("Cannot compile a machine without weak machines.");
+  const int numberOfMachines = m_weak_machines.size(), numberOfOutputs = m_weights.extent(1);
+
+  std::vector<int32_t>& indices = arrays.indices;
+  std::vector<int64_t>& offsets = arrays.offsets;
+  std::vector<int64_t>& sizes = arrays.sizes;
+  std::vector<double>& thresholds = arrays.thresholds;
+  std::vector<double>& values = arrays.values;
+
+  if (boost::dynamic_pointer_cast<LUTMachine>(m_weak_machines[0])){
+    // flatten the LUTs; for each weak machine and output, we store the feature index, and the offset and size of the weighted LUT
+    for (int i = 0; i < numberOfMachines; ++i){
+      const boost::shared_ptr<LUTMachine> machine = boost::dynamic_pointer_cast<LUTMachine>(m_weak_machines[i]);
+      if (!machine) throw std::runtime_error("Cannot compile a machine with weak machines of different types.");
+      const blitz::Array<double,2> luts = machine->getLut();
+      const blitz::Array<int32_t,1> lutIndices = machine->getLutIndices();
+      if (lutIndices.extent(0) < numberOfOutputs) throw std::runtime_error((boost::format("The weak machine %d has only %d outputs, but %d are required")%i%lutIndices.extent(0)%numberOfOutputs).str());
+      for (int k = 0; k < numberOfOutputs; ++k){
+        indices.push_back(lutIndices(k));
+        offsets.push_back(values.size());
+        sizes.push_back(luts.extent(0));
+        for (int l = 0; l < luts.extent(0); ++l){
+          values.push_back(m_weights(i,k) * luts(l,k));
+        }
+      }
+    }
+    return lut;
+  } else if (boost::dynamic_pointer_cast<StumpMachine>(m_weak_machines[0])){
+    if (numberOfOutputs != 1) throw std::runtime_error("Only uni-variate machines of StumpMachines can be compiled.");
+    // flatten the stumps; for each weak machine, we store the feature index, the threshold, and the weighted outputs below and above the threshold
+    for (int i = 0; i < numberOfMachines; ++i){
+      const boost::shared_ptr<StumpMachine> machine = boost::dynamic_pointer_cast<StumpMachine>(m_weak_machines[i]);
+      if (!machine) throw std::runtime_error("Cannot compile a machine with weak machines of different types.");
+      indices.push_back(machine->getIndex());
+      thresholds.push_back(machine->getThreshold());
+      values.push_back(m_weights(i,0) * (machine->getPolarity() * -1.));
+      values.push_back(m_weights(i,0) * (machine->getPolarity() * 1.));
+    }
+    return stump;
+  }
+  throw std::runtime_error("Only machines with LUTMachines or StumpMachines can be compiled.");
+}
+
+// returns the given feature value as the index of a LUT entry; values outside of the LUT are rejected, so that no memory behind the LUT is read
+template <typename T>
+static inline int64_t _lutEntry(T feature, int64_t size){
+  const int64_t entry = feature;
+  if (entry < 0 || entry >= size) throw std::runtime_error((boost::format("The feature value %d exceeds the size %d of the LUT") % entry % size).str());
+  return entry;
+}
+
+template <typename T>
+void bob::learn::boosting::BoostedMachine::_forwardCompiled(const T* features, int featureStride, double* predictions, int predictionStride, int numberOfOutputs) const{
+  // the weak machines are evaluated in the same (reverse) order as in the non-compiled version, to get bit-identical results
+  const int numberOfMachines = m_weights.extent(0), machineOutputs = m_weights.extent(1);
+  if (m_compiled == lut){
+    if (!std::numeric_limits<T>::is_integer) throw std::runtime_error("Machines of LUTMachines can only be evaluated on integral features.");
+    for (int k = 0; k < numberOfOutputs; ++k){
+      double sum = 0.;
+      for (int i = numberOfMachines; i--;){
+        const int m = i * machineOutputs + k;
+        sum += m_compiledValues[m_compiledOffsets[m] + _lutEntry(features[m_compiledIndices[m] * featureStride], m_compiledSizes[m])];
+      }
+      predictions[k * predictionStride] = sum;
+    }
+  } else {
+    double sum = 0.;
+    for (int i = numberOfMachines; i--;){
+      sum += m_compiledValues[2*i + (features[m_compiledIndices[i] * featureStride] < m_compiledThresholds[i] ? 0 : 1)];
+    }
+    predictions[0] = sum;
+  }
+}
+
+void bob::learn::boosting::BoostedMachine::setBlockSize(int blockSize){
+  if (blockSize < 0) throw std::runtime_error((boost::format("The block size must not be negative, but it is %d")%blockSize).str());
+  m_blockSize = blockSize;
+}
+
+void bob::learn::boosting::BoostedMachine::setCascade(const blitz::Array<int32_t,1>& stageEnds, const blitz::Array<double,1>& thresholds){
+  bob::core::array::assertSameShape(stageEnds, thresholds);
+  if (stageEnds.extent(0)){
+    if (numberOfOutputs() != 1) throw std::runtime_error("Only uni-variate machines can be turned into a cascade.");
+    for (int i = 0; i < stageEnds.extent(0); ++i){
+      if (stageEnds(i) <= (i ? stageEnds(i-1) : 0)) throw std::runtime_error("The stage ends of the cascade need to be positive and strictly increasing.");
+    }
+    if (stageEnds(stageEnds.extent(0)-1) != m_weights.extent(0)) throw std::runtime_error((boost::format("The last stage of the cascade needs to end at the number of weak machines %d, but it ends at %d")%m_weights.extent(0)%stageEnds(stageEnds.extent(0)-1)).str());
+  }
+  m_cascadeStages.reference(stageEnds.copy());
+  m_cascadeThresholds.reference(thresholds.copy());
+}
+
+template <typename T>
+double bob::learn::boosting::BoostedMachine::_forwardCascade(const blitz::Array<T,1>& features, bool& accepted) const{
+  // the weak machines are evaluated in the order of the stages, and the evaluation stops as soon as the score falls below the stage threshold
+  double sum = 0.;
+  int i = 0;
+  for (int stage = 0; stage < m_cascadeStages.extent(0); ++stage){
+    const int end = m_cascadeStages(stage);
+    if (m_compiled == lut){
+      if (!std::numeric_limits<T>::is_integer) throw std::runtime_error("Machines of LUTMachines can only be evaluated on integral features.");
+      for (; i < end; ++i)
+        sum += m_compiledValues[m_compiledOffsets[i] + _lutEntry(features(m_compiledIndices[i]), m_compiledSizes[i])];
+    } else if (m_compiled == stump){
+      for (; i < end; ++i)
+        sum += m_compiledValues[2*i + (features(m_compiledIndices[i]) < m_compiledThresholds[i] ? 0 : 1)];
+    } else {
+      for (; i < end; ++i)
+        sum += m_weights(i, 0) * m_weak_machines[i]->forward(features);
+    }
+    if (sum < m_cascadeThresholds(stage)){
+      accepted = false;
+      return sum;
+    }
+  }
+  accepted = true;
+  return sum;
+}
+
+template <typename T>
+void bob::learn::boosting::BoostedMachine::_forwardCascade(const blitz::Array<T,2>& features, blitz::Array<double,1> predictions, blitz::Array<double,1>* labels) const{
+  bob::core::array::assertSameDimensionLength(predictions.extent(0), features.extent(0));
+  bool accepted;
+  for (int j = 0; j < features.extent(0); ++j){
+    predictions(j) = _forwardCascade(features(j, blitz::Range::all()), accepted);
+    if (labels) (*labels)(j) = accepted ? 1. : -1.;
+  }
+}
+
+
+// NOTE: the forward functions are reentrant, i.e., they can be called from several threads at the same time.
+// Hence, they use scratch memory that is allocated for each call, and they only access (but never reference) the member arrays.
+template <typename T>
+double bob::learn::boosting::BoostedMachine::_forward(const blitz::Array<T,1>& features) const{
   // univariate, single feature
+  if (isCascade()){
+    bool accepted;
+    return _forwardCascade(features, accepted);
+  }
+  if (m_compiled != none){
+    double prediction;
+    _forwardCompiled(&features(0), features.stride(0), &prediction, 1, 1);
+    return prediction;
+  }
   double sum = 0.;
   //TODO: optimize using STL
   for (int i = m_weak_machines.size(); i--;){
-    sum += _weights(i) * m_weak_machines[i]->forward(features);
+    sum += m_weights(i, 0) * m_weak_machines[i]->forward(features);
   }
   return sum;
 }
 
-void bob::learn::boosting::BoostedMachine::forward(const blitz::Array<uint16_t,1>& features, blitz::Array<double,1> predictions) const{
+template <typename T>
+void bob::learn::boosting::BoostedMachine::_forward(const blitz::Array<T,1>& features, blitz::Array<double,1> predictions) const{
   // multi-variate, single feature
+  if (isCascade()){
+    bob::core::array::assertSameDimensionLength(predictions.extent(0), 1);
+    bool accepted;
+    predictions(0) = _forwardCascade(features, accepted);
+    return;
+  }
+  if (m_compiled != none){
+    bob::core::array::assertSameDimensionLength(predictions.extent(0), m_weights.extent(1));
+    _forwardCompiled(&features(0), features.stride(0), &predictions(0), predictions.stride(0), predictions.extent(0));
+    return;
+  }
+  blitz::Array<double,1> weak_predictions(predictions.shape());
   // initialize the predictions since they will be overwritten
-  _predictions1.resize(predictions.shape());
   predictions = 0.;
   for (int i = m_weak_machines.size(); i--;){
     // predict locally
-    m_weak_machines[i]->forward(features, _predictions1);
-    predictions(blitz::Range::all()) += m_weights(i, blitz::Range::all()) * _predictions1(blitz::Range::all());
+    m_weak_machines[i]->forward(features, weak_predictions);
+    for (int k = predictions.extent(0); k--;)
+      predictions(k) += m_weights(i, k) * weak_predictions(k);
   }
 }
 
-void bob::learn::boosting::BoostedMachine::forward(const blitz::Array<uint16_t,2>& features, blitz::Array<double,1> predictions) const{
+template <typename T>
+void bob::learn::boosting::BoostedMachine::_forward(const blitz::Array<T,2>& features, blitz::Array<double,1> predictions) const{
   // univariate, multiple features
+  if (isCascade()){
+    _forwardCascade(features, predictions, 0);
+    return;
+  }
+  if (m_compiled != none){
+    bob::core::array::assertSameDimensionLength(predictions.extent(0), features.extent(0));
+    for (int j = 0; j < features.extent(0); ++j){
+      _forwardCompiled(&features(j,0), features.stride(1), &predictions(j), 1, 1);
+    }
+    return;
+  }
+  // evaluate blocks of samples with all weak machines, so that the features of the block stay in the cache
+  const int numberOfSamples = features.extent(0);
+  const int blockSize = m_blockSize > 0 ? std::min(m_blockSize, numberOfSamples) : numberOfSamples;
+  blitz::Array<double,1> weak_predictions(blockSize);
   // initialize the predictions since they will be overwritten
-  _predictions1.resize(predictions.shape());
   predictions = 0.;
-  for (int i = m_weak_machines.size(); i--;){
-    // predict locally
-    m_weak_machines[i]->forward(features, _predictions1);
-    predictions(blitz::Range::all()) += _weights(i) * _predictions1(blitz::Range::all());
+  for (int first = 0; first < numberOfSamples; first += blockSize){
+    const blitz::Range samples(first, std::min(first + blockSize, numberOfSamples) - 1);
+    const blitz::Array<T,2> block_features = features(samples, blitz::Range::all());
+    blitz::Array<double,1> block_predictions = predictions(samples);
+    blitz::Array<double,1> block_weak_predictions = weak_predictions(blitz::Range(0, samples.length() - 1));
+    for (int i = m_weak_machines.size(); i--;){
+      // predict locally
+      m_weak_machines[i]->forward(block_features, block_weak_predictions);
+      const double weight = m_weights(i, 0);
+      block_predictions += weight * block_weak_predictions;
+    }
   }
 }
 
-void bob::learn::boosting::BoostedMachine::forward(const blitz::Array<uint16_t,2>& features, blitz::Array<double,2> predictions) const{
+template <typename T>
+void bob::learn::boosting::BoostedMachine::_forward(const blitz::Array<T,2>& features, blitz::Array<double,2> predictions) const{
+  // multi-variate, multiple features
+  if (isCascade()){
+    bob::core::array::assertSameDimensionLength(predictions.extent(1), 1);
+    _forwardCascade(features, predictions(blitz::Range::all(), 0), 0);
+    return;
+  }
+  if (m_compiled != none){
+    bob::core::array::assertSameDimensionLength(predictions.extent(0), features.extent(0));
+    bob::core::array::assertSameDimensionLength(predictions.extent(1), m_weights.extent(1));
+    for (int j = 0; j < features.extent(0); ++j){
+      _forwardCompiled(&features(j,0), features.stride(1), &predictions(j,0), predictions.stride(1), predictions.extent(1));
+    }
+    return;
+  }
+  // evaluate blocks of samples with all weak machines, so that the features of the block stay in the cache
+  const int numberOfSamples = features.extent(0);
+  const int blockSize = m_blockSize > 0 ? std::min(m_blockSize, numberOfSamples) : numberOfSamples;
+  blitz::Array<double,2> weak_predictions(blockSize, predictions.extent(1));
   // initialize the predictions since they will be overwritten
-  _predictions2.resize(predictions.shape());
   predictions = 0.;
-  for (int i = m_weak_machines.size(); i--;){
-    // predict locally
-    m_weak_machines[i]->forward(features, _predictions2);
-    for (int j = predictions.extent(0); j--;)
-      predictions(j, blitz::Range::all()) += m_weights(i, blitz::Range::all()) * _predictions2(j, blitz::Range::all());
+  for (int first = 0; first < numberOfSamples; first += blockSize){
+    const blitz::Range samples(first, std::min(first + blockSize, numberOfSamples) - 1);
+    const blitz::Array<T,2> block_features = features(samples, blitz::Range::all());
+    blitz::Array<double,2> block_weak_predictions = weak_predictions(blitz::Range(0, samples.length() - 1), blitz::Range::all());
+    for (int i = m_weak_machines.size(); i--;){
+      // predict locally
+      m_weak_machines[i]->forward(block_features, block_weak_predictions);
+      for (int j = samples.length(); j--;)
+        for (int k = predictions.extent(1); k--;)
+          predictions(first + j, k) += m_weights(i, k) * block_weak_predictions(j, k);
+    }
   }
 }
 
 
-void bob::learn::boosting::BoostedMachine::forward(const blitz::Array<uint16_t,2>& features, blitz::Array<double,1> predictions, blitz::Array<double,1> labels) const{
-  forward(features, predictions);
+template <typename T>
+void bob::learn::boosting::BoostedMachine::_forward(const blitz::Array<T,2>& features, blitz::Array<double,1> predictions, blitz::Array<double,1> labels) const{
+  if (isCascade()){
+    // samples are labeled positive, when they are accepted by all stages of the cascade
+    _forwardCascade(features, predictions, &labels);
+    return;
+  }
+  _forward(features, predictions);
   // get the labels
   for (int i = predictions.extent(0); i--;)
     labels(i) = (predictions(i) > 0) * 2. - 1;
 }
 
-void bob::learn::boosting::BoostedMachine::forward(const blitz::Array<uint16_t,2>& features, blitz::Array<double,2> predictions, blitz::Array<double,2> labels) const{
-  forward(features, predictions);
+template <typename T>
+void bob::learn::boosting::BoostedMachine::_forward(const blitz::Array<T,2>& features, blitz::Array<double,2> predictions, blitz::Array<double,2> labels) const{
+  if (isCascade()){
+    bob::core::array::assertSameDimensionLength(predictions.extent(1), 1);
+    blitz::Array<double,1> labels1 = labels(blitz::Range::all(), 0);
+    _forwardCascade(features, predictions(blitz::Range::all(), 0), &labels1);
+    return;
+  }
+  _forward(features, predictions);
   // get the labels
   labels = -1;
   for (int i = predictions.extent(0); i--;){
@@ -96,10 +379,114 @@ void bob::learn::boosting::BoostedMachine::forward(const blitz::Array<uint16_t,2
 }
 
 
+// the forward functions for the supported feature types
+double bob::learn::boosting::BoostedMachine::forward(const blitz::Array<uint16_t,1>& features) const{
+  return _forward(features);
+}
+
+void bob::learn::boosting::BoostedMachine::forward(const blitz::Array<uint16_t,1>& features, blitz::Array<double,1> predictions) const{
+  _forward(features, predictions);
+}
+
+void bob::learn::boosting::BoostedMachine::forward(const blitz::Array<uint16_t,2>& features, blitz::Array<double,1> predictions) const{
+  _forward(features, predictions);
+}
+
+void bob::learn::boosting::BoostedMachine::forward(const blitz::Array<uint16_t,2>& features, blitz::Array<double,2> predictions) const{
+  _forward(features, predictions);
+}
+
+void bob::learn::boosting::BoostedMachine::forward(const blitz::Array<uint16_t,2>& features, blitz::Array<double,1> predictions, blitz::Array<double,1> labels) const{
+  _forward(features, predictions, labels);
+}
+
+void bob::learn::boosting::BoostedMachine::forward(const blitz::Array<uint16_t,2>& features, blitz::Array<double,2> predictions, blitz::Array<double,2> labels) const{
+  _forward(features, predictions, labels);
+}
+
+double bob::learn::boosting::BoostedMachine::forward(const blitz::Array<uint8_t,1>& features) const{
+  return _forward(features);
+}
+
+void bob::learn::boosting::BoostedMachine::forward(const blitz::Array<uint8_t,1>& features, blitz::Array<double,1> predictions) const{
+  _forward(features, predictions);
+}
+
+void bob::learn::boosting::BoostedMachine::forward(const blitz::Array<uint8_t,2>& features, blitz::Array<double,1> predictions) const{
+  _forward(features, predictions);
+}
+
+void bob::learn::boosting::BoostedMachine::forward(const blitz::Array<uint8_t,2>& features, blitz::Array<double,2> predictions) const{
+  _forward(features, predictions);
+}
+
+void bob::learn::boosting::BoostedMachine::forward(const blitz::Array<uint8_t,2>& features, blitz::Array<double,1> predictions, blitz::Array<double,1> labels) const{
+  _forward(features, predictions, labels);
+}
+
+void bob::learn::boosting::BoostedMachine::forward(const blitz::Array<uint8_t,2>& features, blitz::Array<double,2> predictions, blitz::Array<double,2> labels) const{
+  _forward(features, predictions, labels);
+}
+
+
+double bob::learn::boosting::BoostedMachine::forward(const blitz::Array<double,1>& features) const{
+  return _forward(features);
+}
+
+void bob::learn::boosting::BoostedMachine::forward(const blitz::Array<double,1>& features, blitz::Array<double,1> predictions) const{
+  _forward(features, predictions);
+}
+
+void bob::learn::boosting::BoostedMachine::forward(const blitz::Array<double,2>& features, blitz::Array<double,1> predictions) const{
+  _forward(features, predictions);
+}
+
+void bob::learn::boosting::BoostedMachine::forward(const blitz::Array<double,2>& features, blitz::Array<double,2> predictions) const{
+  _forward(features, predictions);
+}
+
+void bob::learn::boosting::BoostedMachine::forward(const blitz::Array<double,2>& features, blitz::Array<double,1> predictions, blitz::Array<double,1> labels) const{
+  _forward(features, predictions, labels);
+}
+
+void bob::learn::boosting::BoostedMachine::forward(const blitz::Array<double,2>& features, blitz::Array<double,2> predictions, blitz::Array<double,2> labels) const{
+  _forward(features, predictions, labels);
+}
+
+double bob::learn::boosting::BoostedMachine::forward(const blitz::Array<float,1>& features) const{
+  return _forward(features);
+}
+
+void bob::learn::boosting::BoostedMachine::forward(const blitz::Array<float,1>& features, blitz::Array<double,1> predictions) const{
+  _forward(features, predictions);
+}
+
+void bob::learn::boosting::BoostedMachine::forward(const blitz::Array<float,2>& features, blitz::Array<double,1> predictions) const{
+  _forward(features, predictions);
+}
+
+void bob::learn::boosting::BoostedMachine::forward(const blitz::Array<float,2>& features, blitz::Array<double,2> predictions) const{
+  _forward(features, predictions);
+}
+
+void bob::learn::boosting::BoostedMachine::forward(const blitz::Array<float,2>& features, blitz::Array<double,1> predictions, blitz::Array<double,1> labels) const{
+  _forward(features, predictions, labels);
+}
+
+void bob::learn::boosting::BoostedMachine::forward(const blitz::Array<float,2>& features, blitz::Array<double,2> predictions, blitz::Array<double,2> labels) const{
+  _forward(features, predictions, labels);
+}
+
+
 blitz::Array<int,1> bob::learn::boosting::BoostedMachine::getIndices(int start, int end) const{
   std::set<int32_t> indices;
-  if (end < 0) end = m_weak_machines.size();
-  for (int i = start; i < end; ++i){
+  if (end < 0) end = m_weights.extent(0);
+  if (m_mapped){
+    // memory-mapped machines have no weak machines, so the indices are taken from the compiled representation
+    const int machineOutputs = m_compiled == lut ? m_weights.extent(1) : 1;
+    indices.insert(m_compiledIndices + start * machineOutputs, m_compiledIndices + end * machineOutputs);
+  }
+  for (int i = start; i < end && !m_mapped; ++i){
     const blitz::Array<int32_t,1>& ind = m_weak_machines[i]->getIndices();
     indices.insert(ind.begin(), ind.end());
   }
@@ -109,8 +496,96 @@ blitz::Array<int,1> bob::learn::boosting::BoostedMachine::getIndices(int start,
   return ret;
 }
 
+// the codes of the weak machine types in the packed file layout
+static const int32_t STUMP_MACHINE = 0, LUT_MACHINE = 1;
+
 // writes the machine to file
 void bob::learn::boosting::BoostedMachine::save(bob::io::base::HDF5File& file) const{
+  if (m_mapped) throw std::runtime_error("A memory-mapped machine has no weak machines and cannot be written to HDF5.");
+  if (isPackable()) savePacked(file);
+  else saveGroups(file);
+
+  if (isCascade()){
+    file.setArray("CascadeStages", m_cascadeStages);
+    file.setArray("CascadeThresholds", m_cascadeThresholds);
+  }
+}
+
+bool bob::learn::boosting::BoostedMachine::isPackable() const{
+  bool packable = !m_weak_machines.empty();
+  for (auto it = m_weak_machines.begin(); packable && it != m_weak_machines.end(); ++it){
+    packable = boost::dynamic_pointer_cast<StumpMachine>(*it) || boost::dynamic_pointer_cast<LUTMachine>(*it);
+  }
+  return packable;
+}
+
+template <typename T>
+static blitz::Array<T,1> _toArray(const std::vector<T>& values){
+  blitz::Array<T,1> array(values.size());
+  std::copy(values.begin(), values.end(), array.begin());
+  return array;
+}
+
+void bob::learn::boosting::BoostedMachine::pack(PackedWeakMachines& packed) const{
+  // the parameters of all weak machines of one type are concatenated, in the order of the weak machines
+  const int numberOfMachines = m_weak_machines.size();
+  blitz::Array<int32_t,1> types(numberOfMachines);
+  std::vector<double> thresholds, polarities, luts;
+  std::vector<int32_t> stumpIndices, lutIndices, lutShapes;
+  for (int i = 0; i < numberOfMachines; ++i){
+    const boost::shared_ptr<StumpMachine> stump = boost::dynamic_pointer_cast<StumpMachine>(m_weak_machines[i]);
+    if (stump){
+      types(i) = STUMP_MACHINE;
+      thresholds.push_back(stump->getThreshold());
+      polarities.push_back(stump->getPolarity());
+      stumpIndices.push_back(stump->getIndex());
+    } else {
+      const boost::shared_ptr<LUTMachine> machine = boost::dynamic_pointer_cast<LUTMachine>(m_weak_machines[i]);
+      if (!machine) throw std::runtime_error((boost::format("The weak machine %d is neither a LUTMachine nor a StumpMachine") % i).str());
+      const blitz::Array<double,2> lut = machine->getLut();
+      const blitz::Array<int32_t,1> indices = machine->getLutIndices();
+      types(i) = LUT_MACHINE;
+      lutShapes.push_back(lut.extent(0));
+      lutShapes.push_back(lut.extent(1));
+      for (int l = 0; l < lut.extent(0); ++l){
+        for (int k = 0; k < lut.extent(1); ++k){
+          luts.push_back(lut(l,k));
+        }
+      }
+      lutIndices.insert(lutIndices.end(), indices.begin(), indices.end());
+    }
+  }
+
+  packed.types.reference(types);
+  packed.stumpThresholds.reference(_toArray(thresholds));
+  packed.stumpPolarities.reference(_toArray(polarities));
+  packed.stumpIndices.reference(_toArray(stumpIndices));
+  packed.lutShapes.resize(lutShapes.size() / 2, 2);
+  std::copy(lutShapes.begin(), lutShapes.end(), packed.lutShapes.begin());
+  packed.luts.reference(_toArray(luts));
+  packed.lutIndices.reference(_toArray(lutIndices));
+}
+
+void bob::learn::boosting::BoostedMachine::savePacked(bob::io::base::HDF5File& file) const{
+  PackedWeakMachines packed;
+  pack(packed);
+
+  file.setAttribute(".", "version", 3);
+  file.setArray("Weights", m_weights);
+  file.setArray("MachineTypes", packed.types);
+  if (packed.stumpIndices.extent(0)){
+    file.setArray("StumpThresholds", packed.stumpThresholds);
+    file.setArray("StumpPolarities", packed.stumpPolarities);
+    file.setArray("StumpIndices", packed.stumpIndices);
+  }
+  if (packed.lutShapes.extent(0)){
+    file.setArray("LUTShapes", packed.lutShapes);
+    file.setArray("LUTs", packed.luts);
+    file.setArray("LUTIndices", packed.lutIndices);
+  }
+}
+
+void bob::learn::boosting::BoostedMachine::saveGroups(bob::io::base::HDF5File& file) const{
   file.setAttribute(".", "version", 2);
   file.setArray("Weights", m_weights);
   for (int i = 0; i < m_weights.extent(0); ++i){
@@ -125,12 +600,138 @@ void bob::learn::boosting::BoostedMachine::save(bob::io::base::HDF5File& file) c
 
 // loads the machine from file
 void bob::learn::boosting::BoostedMachine::load(bob::io::base::HDF5File& file){
-  m_weak_machines.clear();
+  _clear();
 
   // the weights
   m_weights.reference(file.readArray<double,2>("Weights"));
-  _weights.reference(m_weights(blitz::Range::all(), 0));
 
+  // files of version 1 and 2 have one group per weak machine
+  int64_t version = 1;
+  if (file.hasAttribute(".", "version")){
+    // the version is written as int32 by C++, but might be int64 when written from python
+    try{
+      int32_t v;
+      file.getAttribute(".", "version", v);
+      version = v;
+    } catch (std::exception&){
+      file.getAttribute(".", "version", version);
+    }
+  }
+  if (version >= 3) loadPacked(file);
+  else loadGroups(file);
+
+  if (m_weak_machines.empty()){
+    throw std::runtime_error("Could not read weak machines.");
+  }
+  if ((int)m_weak_machines.size() != m_weights.extent(0)){
+    throw std::runtime_error((boost::format("The file contains %d weak machines, but %d weights") % m_weak_machines.size() % m_weights.extent(0)).str());
+  }
+
+  // the cascade, if any
+  if (file.contains("CascadeStages")){
+    setCascade(file.readArray<int32_t,1>("CascadeStages"), file.readArray<double,1>("CascadeThresholds"));
+  } else {
+    m_cascadeStages.resize(0);
+    m_cascadeThresholds.resize(0);
+  }
+}
+
+void bob::learn::boosting::BoostedMachine::loadPacked(bob::io::base::HDF5File& file){
+  // read all datasets at once, and split them into the weak machines
+  PackedWeakMachines packed;
+  packed.types.reference(file.readArray<int32_t,1>("MachineTypes"));
+  if (file.contains("StumpIndices")){
+    packed.stumpThresholds.reference(file.readArray<double,1>("StumpThresholds"));
+    packed.stumpPolarities.reference(file.readArray<double,1>("StumpPolarities"));
+    packed.stumpIndices.reference(file.readArray<int32_t,1>("StumpIndices"));
+  }
+  if (file.contains("LUTShapes")){
+    packed.lutShapes.reference(file.readArray<int32_t,2>("LUTShapes"));
+    packed.luts.reference(file.readArray<double,1>("LUTs"));
+    packed.lutIndices.reference(file.readArray<int32_t,1>("LUTIndices"));
+  }
+  _unpack(packed);
+}
+
+template <typename T, int N>
+static const blitz::Array<T,N> _contiguous(const blitz::Array<T,N>& array){
+  return bob::core::array::isCZeroBaseContiguous(array) ? array : bob::core::array::ccopy(array);
+}
+
+void bob::learn::boosting::BoostedMachine::unpack(const blitz::Array<double,2>& weights, const PackedWeakMachines& packed){
+  // the LUTs are split without copying them first, which requires contiguous arrays
+  PackedWeakMachines contiguous;
+  contiguous.types.reference(_contiguous(packed.types));
+  contiguous.stumpThresholds.reference(_contiguous(packed.stumpThresholds));
+  contiguous.stumpPolarities.reference(_contiguous(packed.stumpPolarities));
+  contiguous.stumpIndices.reference(_contiguous(packed.stumpIndices));
+  contiguous.lutShapes.reference(_contiguous(packed.lutShapes));
+  contiguous.luts.reference(_contiguous(packed.luts));
+  contiguous.lutIndices.reference(_contiguous(packed.lutIndices));
+
+  _clear();
+  m_cascadeStages.resize(0);
+  m_cascadeThresholds.resize(0);
+  m_weights.reference(bob::core::array::ccopy(weights));
+  try{
+    _unpack(contiguous);
+    if ((int)m_weak_machines.size() != m_weights.extent(0)){
+      throw std::runtime_error((boost::format("There are %d weak machines, but %d weights") % m_weak_machines.size() % m_weights.extent(0)).str());
+    }
+  } catch (...){
+    // leave an empty machine behind
+    _clear();
+    m_weights.resize(0, 0);
+    throw;
+  }
+}
+
+void bob::learn::boosting::BoostedMachine::_unpack(const PackedWeakMachines& packed){
+  const blitz::Array<int32_t,1>& types = packed.types;
+  int stump = 0, lut = 0;
+  int64_t lutOffset = 0, indexOffset = 0;
+  m_weak_machines.reserve(types.extent(0));
+  for (int i = 0; i < types.extent(0); ++i){
+    switch (types(i)){
+      case STUMP_MACHINE:
+        if (stump >= packed.stumpIndices.extent(0) || stump >= packed.stumpThresholds.extent(0) || stump >= packed.stumpPolarities.extent(0)) throw std::runtime_error("There are less stumps than required");
+        m_weak_machines.push_back(boost::shared_ptr<WeakMachine>(new StumpMachine(packed.stumpThresholds(stump), packed.stumpPolarities(stump), packed.stumpIndices(stump))));
+        ++stump;
+        break;
+      case LUT_MACHINE:{
+        if (lut >= packed.lutShapes.extent(0)) throw std::runtime_error("There are less LUTs than required");
+        const int entries = packed.lutShapes(lut, 0), outputs = packed.lutShapes(lut, 1);
+        if (entries < 0 || outputs < 0 || lutOffset + (int64_t)entries * outputs > packed.luts.extent(0) || indexOffset + outputs > packed.lutIndices.extent(0)) throw std::runtime_error("There are less LUT entries than required");
+        // the LUTMachine copies the given arrays
+        const blitz::Array<double,2> table(const_cast<double*>(packed.luts.data()) + lutOffset, blitz::shape(entries, outputs), blitz::neverDeleteData);
+        const blitz::Array<int32_t,1> indices(const_cast<int32_t*>(packed.lutIndices.data()) + indexOffset, blitz::shape(outputs), blitz::neverDeleteData);
+        m_weak_machines.push_back(boost::shared_ptr<WeakMachine>(new LUTMachine(table, indices)));
+        lutOffset += (int64_t)entries * outputs;
+        indexOffset += outputs;
+        ++lut;
+        break;
+      }
+      default:
+        throw std::runtime_error((boost::format("Unknown weak machine type %d") % types(i)).str());
+    }
+  }
+}
+
+void bob::learn::boosting::BoostedMachine::_clear(){
+  m_weak_machines.clear();
+  m_compiled = none;
+  m_compiledIndices = 0;
+  m_compiledOffsets = 0;
+  m_compiledSizes = 0;
+  m_compiledThresholds = 0;
+  m_compiledValues = 0;
+  m_compiledStorage.reset();
+  m_mapped = false;
+  m_mappedData = 0;
+  m_mappedSize = 0;
+}
+
+void bob::learn::boosting::BoostedMachine::loadGroups(bob::io::base::HDF5File& file){
   // name of the first machine
   std::string machine_name("WeakMachine_0");
   while (file.hasGroup(machine_name)){
@@ -143,10 +744,157 @@ void bob::learn::boosting::BoostedMachine::load(bob::io::base::HDF5File& file){
     fns << "WeakMachine_" << m_weak_machines.size();
     machine_name = fns.str();
   }
+}
 
-  if (m_weak_machines.empty()){
-    throw std::runtime_error("Could not read weak machines.");
+
+
+
+// the header of the flat binary files written by saveMapped, which is followed by:
+// weights <#machines,#outputs>, values, thresholds and cascade thresholds (double); offsets and sizes of the LUTs (int64, #offsets each); indices and cascade stages (int32)
+// the sections are ordered by the size of their elements, so that all of them are aligned in the mapped memory
+struct MappedHeader{
+  char magic[8];
+  uint32_t version;
+  uint32_t type;
+  uint32_t byteOrder;
+  uint32_t reserved;
+  int64_t machines, outputs, indices, offsets, thresholds, values, stages;
+};
+static const char MAPPED_MAGIC[8] = {'B','O','B','B','O','O','S','T'};
+static const uint32_t MAPPED_VERSION = 2, MAPPED_BYTE_ORDER = 0x01020304;
+
+template <typename T>
+static void _writeMapped(std::ofstream& f, const T* data, int64_t size){
+  f.write(reinterpret_cast<const char*>(data), size * sizeof(T));
+}
+
+// releases the memory mapping when the last machine that uses it is destroyed
+struct Unmap{
+  size_t size;
+  void operator()(void* address) const {munmap(address, size);}
+};
+
+void bob::learn::boosting::BoostedMachine::saveMapped(const std::string& filename) const{
+  if (m_mapped) throw std::runtime_error("The machine is memory-mapped from file already; copy the file instead.");
+  CompiledArrays arrays;
+  const CompiledType type = _compile(arrays);
+
+  const blitz::Array<double,2> weights = m_weights.copy();
+  MappedHeader header;
+  std::memcpy(header.magic, MAPPED_MAGIC, sizeof(MAPPED_MAGIC));
+  header.version = MAPPED_VERSION;
+  header.type = type;
+  header.byteOrder = MAPPED_BYTE_ORDER;
+  header.reserved = 0;
+  header.machines = m_weights.extent(0);
+  header.outputs = m_weights.extent(1);
+  header.indices = arrays.indices.size();
+  header.offsets = arrays.offsets.size();
+  header.thresholds = arrays.thresholds.size();
+  header.values = arrays.values.size();
+  header.stages = m_cascadeStages.extent(0);
+  const blitz::Array<double,1> cascadeThresholds = m_cascadeThresholds.copy();
+  const blitz::Array<int32_t,1> cascadeStages = m_cascadeStages.copy();
+
+  // the file is written under a temporary name and renamed afterwards, so that processes that have mapped the previous file are not affected
+  const std::string temporary = filename + ".tmp";
+  std::ofstream f(temporary.c_str(), std::ios::binary);
+  if (!f) throw std::runtime_error((boost::format("Cannot open file '%s' for writing") % temporary).str());
+  f.write(reinterpret_cast<const char*>(&header), sizeof(header));
+  _writeMapped(f, weights.data(), header.machines * header.outputs);
+  _writeMapped(f, arrays.values.data(), header.values);
+  _writeMapped(f, arrays.thresholds.data(), header.thresholds);
+  _writeMapped(f, cascadeThresholds.data(), header.stages);
+  _writeMapped(f, arrays.offsets.data(), header.offsets);
+  _writeMapped(f, arrays.sizes.data(), header.offsets);
+  _writeMapped(f, arrays.indices.data(), header.indices);
+  _writeMapped(f, cascadeStages.data(), header.stages);
+  f.close();
+  if (!f || std::rename(temporary.c_str(), filename.c_str())){
+    std::remove(temporary.c_str());
+    throw std::runtime_error((boost::format("Cannot write file '%s'") % filename).str());
+  }
+}
+
+void bob::learn::boosting::BoostedMachine::loadMapped(const std::string& filename){
+  const int fd = open(filename.c_str(), O_RDONLY);
+  if (fd < 0) throw std::runtime_error((boost::format("Cannot open file '%s' for reading: %s") % filename % std::strerror(errno)).str());
+  struct stat status;
+  if (fstat(fd, &status) || status.st_size < (off_t)sizeof(MappedHeader)){
+    close(fd);
+    throw std::runtime_error((boost::format("The file '%s' is no memory-mappable machine file") % filename).str());
   }
+  const size_t size = status.st_size;
+  void* address = mmap(0, size, PROT_READ, MAP_SHARED, fd, 0);
+  // the mapping stays valid after the file is closed
+  close(fd);
+  if (address == MAP_FAILED) throw std::runtime_error((boost::format("Cannot memory-map file '%s': %s") % filename % std::strerror(errno)).str());
+  _loadMapped(boost::shared_ptr<void>(address, Unmap{size}), size, (boost::format("The file '%s'") % filename).str());
+}
+
+void bob::learn::boosting::BoostedMachine::loadMapped(const void* data, size_t size){
+  // the copy is stored in doubles, so that all sections are aligned
+  boost::shared_ptr<std::vector<double> > copy(new std::vector<double>((size + sizeof(double) - 1) / sizeof(double)));
+  if (size) std::memcpy(copy->data(), data, size);
+  _loadMapped(boost::shared_ptr<void>(copy, copy->data()), size, "The buffer");
 }
 
+boost::shared_ptr<const char> bob::learn::boosting::BoostedMachine::getMappedData(size_t& size) const{
+  if (!m_mapped) throw std::runtime_error("The machine has not been loaded with loadMapped.");
+  size = m_mappedSize;
+  return boost::shared_ptr<const char>(m_compiledStorage, m_mappedData);
+}
+
+void bob::learn::boosting::BoostedMachine::_loadMapped(const boost::shared_ptr<void>& storage, size_t size, const std::string& source){
+  const void* address = storage.get();
+  if (size < sizeof(MappedHeader)) throw std::runtime_error((boost::format("%s is no memory-mappable machine file") % source).str());
 
+  // check the header
+  const MappedHeader& header = *static_cast<const MappedHeader*>(address);
+  if (std::memcmp(header.magic, MAPPED_MAGIC, sizeof(MAPPED_MAGIC))) throw std::runtime_error((boost::format("%s is no memory-mappable machine file") % source).str());
+  if (header.byteOrder != MAPPED_BYTE_ORDER) throw std::runtime_error((boost::format("%s was written on a machine with a different byte order") % source).str());
+  if (header.version != MAPPED_VERSION) throw std::runtime_error((boost::format("%s has the unsupported version %d") % source % header.version).str());
+  const int64_t machines = header.machines, outputs = header.outputs, count = machines * outputs;
+  bool valid = machines > 0 && outputs > 0 && header.stages >= 0 && header.values >= 0;
+  if (header.type == lut) valid = valid && header.indices == count && header.offsets == count && header.thresholds == 0;
+  else if (header.type == stump) valid = valid && outputs == 1 && header.indices == machines && header.offsets == 0 && header.thresholds == machines && header.values == 2 * machines;
+  else valid = false;
+  if (!valid || size != sizeof(MappedHeader) + sizeof(double) * (count + header.values + header.thresholds + header.stages) + sizeof(int64_t) * 2 * header.offsets + sizeof(int32_t) * (header.indices + header.stages)){
+    throw std::runtime_error((boost::format("%s is corrupt") % source).str());
+  }
+
+  // the arrays follow the header
+  const char* data = static_cast<const char*>(address) + sizeof(MappedHeader);
+  const double* weights = reinterpret_cast<const double*>(data); data += sizeof(double) * count;
+  const double* values = reinterpret_cast<const double*>(data); data += sizeof(double) * header.values;
+  const double* thresholds = reinterpret_cast<const double*>(data); data += sizeof(double) * header.thresholds;
+  const double* cascadeThresholds = reinterpret_cast<const double*>(data); data += sizeof(double) * header.stages;
+  const int64_t* offsets = reinterpret_cast<const int64_t*>(data); data += sizeof(int64_t) * header.offsets;
+  const int64_t* sizes = reinterpret_cast<const int64_t*>(data); data += sizeof(int64_t) * header.offsets;
+  const int32_t* indices = reinterpret_cast<const int32_t*>(data); data += sizeof(int32_t) * header.indices;
+  const int32_t* cascadeStages = reinterpret_cast<const int32_t*>(data);
+  for (int64_t m = 0; m < header.offsets; ++m){
+    // each LUT must lie within the values
+    if (offsets[m] < 0 || sizes[m] < 0 || sizes[m] > header.values - offsets[m]) throw std::runtime_error((boost::format("%s is corrupt") % source).str());
+  }
+
+  // the (small) weights and cascade are copied, while the compiled representation stays in the mapped memory
+  _clear();
+  m_weights.reference(blitz::Array<double,2>(const_cast<double*>(weights), blitz::shape(machines, outputs), blitz::neverDeleteData).copy());
+  m_compiledIndices = indices;
+  m_compiledOffsets = offsets;
+  m_compiledSizes = sizes;
+  m_compiledThresholds = thresholds;
+  m_compiledValues = values;
+  m_compiledStorage = storage;
+  m_compiled = static_cast<CompiledType>(header.type);
+  m_mapped = true;
+  m_mappedData = static_cast<const char*>(address);
+  m_mappedSize = size;
+  m_cascadeStages.resize(0);
+  m_cascadeThresholds.resize(0);
+  if (header.stages){
+    const blitz::TinyVector<int,1> shape(header.stages);
+    setCascade(blitz::Array<int32_t,1>(const_cast<int32_t*>(cascadeStages), shape, blitz::neverDeleteData), blitz::Array<double,1>(const_cast<double*>(cascadeThresholds), shape, blitz::neverDeleteData));
+  }
+}
@@ -41,7 +41,8 @@ bob::learn::boosting::LUTMachine::LUTMachine(bob::io::base::HDF5File& file):
   load(file);
 }
 
-double bob::learn::boosting::LUTMachine::forward(const blitz::Array<uint16_t,1>& features) const{
+template <typename T>
+double bob::learn::boosting::LUTMachine::_forward(const blitz::Array<T,1>& features) const{
   // univariate, single feature
 #ifdef BOB_DEBUG
   if ( features.extent(0) <= _index ) throw std::runtime_error((boost::format("The index %d of this machine is out of range %d")%_index%features.extent(0)).str());
@@ -51,7 +52,8 @@ double bob::learn::boosting::LUTMachine::forward(const blitz::Array<uint16_t,1>&
 }
 
 
-void bob::learn::boosting::LUTMachine::forward(const blitz::Array<uint16_t,1>& features, blitz::Array<double,1> predictions) const{
+template <typename T>
+void bob::learn::boosting::LUTMachine::_forward(const blitz::Array<T,1>& features, blitz::Array<double,1> predictions) const{
   // multi-variate, single feature
 #ifdef BOB_DEBUG
   bob::core::array::assertSameShape(m_indices, predictions);
@@ -66,7 +68,8 @@ void bob::learn::boosting::LUTMachine::forward(const blitz::Array<uint16_t,1>& f
   }
 }
 
-void bob::learn::boosting::LUTMachine::forward(const blitz::Array<uint16_t,2>& features, blitz::Array<double,1> predictions) const{
+template <typename T>
+void bob::learn::boosting::LUTMachine::_forward(const blitz::Array<T,2>& features, blitz::Array<double,1> predictions) const{
   // univariate, several features
 #ifdef BOB_DEBUG
   if ( predictions.extent(0) != features.extent(0) ) throw std::runtime_error((boost::format("The number of predictions must match the number of features, but they don't: %d != %d")%predictions.extent(0)%features.extent(0)).str());
@@ -82,7 +85,8 @@ void bob::learn::boosting::LUTMachine::forward(const blitz::Array<uint16_t,2>& f
   }
 }
 
-void bob::learn::boosting::LUTMachine::forward(const blitz::Array<uint16_t,2>& features, blitz::Array<double,2> predictions) const{
+template <typename T>
+void bob::learn::boosting::LUTMachine::_forward(const blitz::Array<T,2>& features, blitz::Array<double,2> predictions) const{
   // multi-variate, several features
 #ifdef BOB_DEBUG
   if ( predictions.extent(0) != features.extent(0) ) throw std::runtime_error((boost::format("The number of predictions must match the number of features, but they don't: %d != %d")%predictions.extent(0)%features.extent(0)).str());
@@ -99,6 +103,39 @@ void bob::learn::boosting::LUTMachine::forward(const blitz::Array<uint16_t,2>& f
   }
 }
 
+// the forward functions for the supported feature types
+double bob::learn::boosting::LUTMachine::forward(const blitz::Array<uint16_t,1>& features) const{
+  return _forward(features);
+}
+
+void bob::learn::boosting::LUTMachine::forward(const blitz::Array<uint16_t,1>& features, blitz::Array<double,1> predictions) const{
+  _forward(features, predictions);
+}
+
+void bob::learn::boosting::LUTMachine::forward(const blitz::Array<uint16_t,2>& features, blitz::Array<double,1> predictions) const{
+  _forward(features, predictions);
+}
+
+void bob::learn::boosting::LUTMachine::forward(const blitz::Array<uint16_t,2>& features, blitz::Array<double,2> predictions) const{
+  _forward(features, predictions);
+}
+
+double bob::learn::boosting::LUTMachine::forward(const blitz::Array<uint8_t,1>& features) const{
+  return _forward(features);
+}
+
+void bob::learn::boosting::LUTMachine::forward(const blitz::Array<uint8_t,1>& features, blitz::Array<double,1> predictions) const{
+  _forward(features, predictions);
+}
+
+void bob::learn::boosting::LUTMachine::forward(const blitz::Array<uint8_t,2>& features, blitz::Array<double,1> predictions) const{
+  _forward(features, predictions);
+}
+
+void bob::learn::boosting::LUTMachine::forward(const blitz::Array<uint8_t,2>& features, blitz::Array<double,2> predictions) const{
+  _forward(features, predictions);
+}
+
 blitz::Array<int32_t,1> bob::learn::boosting::LUTMachine::getIndices() const{
   std::set<int32_t> indices;
   for (int i = 0; i < m_indices.extent(0); ++i){
@@ -1,15 +1,45 @@
 #include <bob.learn.boosting/LUTTrainer.h>
 #include <bob.learn.boosting/Functions.h>
+#include <bob.core/assert.h>
 #include <limits>
+#include <thread>
+#include <cmath>
+#include <cstddef>
+#include <numeric>
+#include <algorithm>
+#include <stdexcept>
 
-bob::learn::boosting::LUTTrainer::LUTTrainer(uint16_t maximumFeatureValue, int numberOfOutputs, SelectionStyle selectionType) :
+bob::learn::boosting::LUTTrainer::LUTTrainer(uint16_t maximumFeatureValue, int numberOfOutputs, SelectionStyle selectionType, int numberOfThreads, double featureFraction, double sampleFraction, uint32_t seed, OutputStyle outputType) :
   m_maximumFeatureValue(maximumFeatureValue),
   m_numberOfOutputs(numberOfOutputs),
   m_selectionType(selectionType),
-  _luts(maximumFeatureValue, numberOfOutputs),
-  _selectedIndices(numberOfOutputs),
-  _gradientHistogram(maximumFeatureValue)
+  m_numberOfThreads(numberOfThreads > 0 ? numberOfThreads : std::max(1u, std::thread::hardware_concurrency())),
+  m_featureFraction(featureFraction),
+  m_sampleFraction(sampleFraction),
+  m_seed(seed),
+  m_outputType(outputType),
+  m_round(0)
 {
+  if (!(featureFraction > 0. && featureFraction <= 1.) || !(sampleFraction > 0. && sampleFraction <= 1.)){
+    throw std::runtime_error("LUTTrainer: the fractions of features and samples must be in range (0,1]");
+  }
+}
+
+uint32_t bob::learn::boosting::LUTTrainer::nextSeed(){
+  // the seed of each round depends only on the seed of the trainer and the round, so that the sequence of rounds can be continued after restoring the round counter
+  std::seed_seq sequence{m_seed, static_cast<uint32_t>(m_round), static_cast<uint32_t>(m_round >> 32)};
+  uint32_t seed;
+  sequence.generate(&seed, &seed + 1);
+  ++m_round;
+  return seed;
+}
+
+void bob::learn::boosting::LUTTrainer::saveState(bob::io::base::HDF5File& file) const{
+  file.set("Round", static_cast<int64_t>(m_round));
+}
+
+void bob::learn::boosting::LUTTrainer::loadState(bob::io::base::HDF5File& file){
+  m_round = file.read<int64_t>("Round");
 }
 
 int32_t bob::learn::boosting::LUTTrainer::bestIndex(const blitz::Array<double,1>& array) const{
@@ -24,53 +54,230 @@ int32_t bob::learn::boosting::LUTTrainer::bestIndex(const blitz::Array<double,1>
   return minIndex;
 }
 
-void bob::learn::boosting::LUTTrainer::weightedHistogram(const blitz::Array<uint16_t,1>& features, const blitz::Array<double,1>& weights) const{
-  bob::core::array::assertSameShape(features, weights);
-  _gradientHistogram = 0.;
-  for (int i = features.extent(0); i--;){
-    _gradientHistogram((int)features(i)) += weights(i);
+std::vector<int32_t> bob::learn::boosting::LUTTrainer::selectFeatures(int featureLength, std::mt19937& generator) const{
+  std::vector<int32_t> featureIndices(featureLength);
+  std::iota(featureIndices.begin(), featureIndices.end(), 0);
+  const int numberOfFeatures = std::max(1, (int)std::lround(m_featureFraction * featureLength));
+  if (numberOfFeatures < featureLength){
+    // partial Fisher-Yates shuffle; the selected features are sorted to keep the memory access in order
+    for (int i = 0; i < numberOfFeatures; ++i){
+      std::swap(featureIndices[i], featureIndices[std::uniform_int_distribution<int>(i, featureLength-1)(generator)]);
+    }
+    featureIndices.resize(numberOfFeatures);
+    std::sort(featureIndices.begin(), featureIndices.end());
   }
+  return featureIndices;
 }
 
-boost::shared_ptr<bob::learn::boosting::LUTMachine> bob::learn::boosting::LUTTrainer::train(const blitz::Array<uint16_t,2>& trainingFeatures, const blitz::Array<double,2>& lossGradient) const{
+void bob::learn::boosting::LUTTrainer::selectSamples(const blitz::Array<double,2>& lossGradient, std::mt19937& generator, std::vector<int32_t>& samples, blitz::Array<double,2>& weights) const{
+  const int numberOfSamples = lossGradient.extent(0);
+  const int numberOfDraws = std::max(1, (int)std::lround(m_sampleFraction * numberOfSamples));
+  samples.clear();
+  if (numberOfDraws >= numberOfSamples){
+    weights.reference(lossGradient);
+    return;
+  }
+
+  // the probability of each sample is proportional to the sum of its absolute gradients
+  std::vector<double> probabilities(numberOfSamples, 0.);
+  for (int i = 0; i < numberOfSamples; ++i){
+    for (int outputIndex = 0; outputIndex < m_numberOfOutputs; ++outputIndex){
+      probabilities[i] += std::abs(lossGradient(i, outputIndex));
+    }
+  }
+  const double total = std::accumulate(probabilities.begin(), probabilities.end(), 0.);
+  if (total <= 0.){
+    // all gradients are zero, so all features are equally bad
+    weights.reference(lossGradient);
+    return;
+  }
+
+  std::vector<int32_t> counts(numberOfSamples, 0);
+  std::discrete_distribution<int32_t> distribution(probabilities.begin(), probabilities.end());
+  for (int d = numberOfDraws; d--;){
+    ++counts[distribution(generator)];
+  }
+
+  // each draw of sample i has the weight gradient(i) / (#draws * probability(i)), so that the expected histograms are identical to the ones of all samples
+  for (int i = 0; i < numberOfSamples; ++i){
+    if (counts[i]) samples.push_back(i);
+  }
+  weights.resize(samples.size(), m_numberOfOutputs);
+  for (int k = 0; k < (int)samples.size(); ++k){
+    const int i = samples[k];
+    const double scale = counts[i] * total / (numberOfDraws * probabilities[i]);
+    for (int outputIndex = 0; outputIndex < m_numberOfOutputs; ++outputIndex){
+      weights(k, outputIndex) = lossGradient(i, outputIndex) * scale;
+    }
+  }
+}
+
+template <typename T>
+void bob::learn::boosting::LUTTrainer::weightedHistogram(const blitz::Array<T,2>& features, int featureIndex, const std::vector<int32_t>& samples, const blitz::Array<double,2>& weights, std::vector<double>& histogram) const{
+  // NOTE: this function is called from several threads, so we must not create any blitz array (slice) here
+  // the histograms of all outputs are computed in a single pass over the feature column; histogram[value * #outputs + output]
+  std::fill(histogram.begin(), histogram.end(), 0.);
+  const bool allSamples = samples.empty();
+  for (int i = weights.extent(0); i--;){
+    double* bin = &histogram[features(allSamples ? i : samples[i], featureIndex) * m_numberOfOutputs];
+    for (int outputIndex = 0; outputIndex < m_numberOfOutputs; ++outputIndex){
+      bin[outputIndex] += weights(i, outputIndex);
+    }
+  }
+}
+
+void bob::learn::boosting::LUTTrainer::lossSumOfHistogram(const double* histogram, int featureIndex, blitz::Array<double,2>& lossSum) const{
+  for (int outputIndex = m_numberOfOutputs; outputIndex--;){
+    double sum = 0.;
+    for (int value = 0; value < m_maximumFeatureValue; ++value){
+      sum += std::abs(histogram[value * m_numberOfOutputs + outputIndex]);
+    }
+    lossSum(featureIndex, outputIndex) = - sum;
+  }
+}
+
+template <typename T>
+void bob::learn::boosting::LUTTrainer::lossSums(const blitz::Array<T,2>& trainingFeatures, const std::vector<int32_t>& featureIndices, const std::vector<int32_t>& samples, const blitz::Array<double,2>& weights, int firstFeature, int lastFeature, blitz::Array<double,2>& lossSum) const{
+  // NOTE: this function is called from several threads, so we must not create any blitz array (slice) here
+  const T* data = trainingFeatures.data();
+  const ptrdiff_t sampleStride = trainingFeatures.stride(0), featureStride = trainingFeatures.stride(1);
+  const bool allSamples = samples.empty();
+
+  if (sampleStride == 1 && featureStride != 1){
+    // The features are stored in feature-major order, so that each feature column is contiguous and can be streamed on its own
+    std::vector<double> histogram(m_maximumFeatureValue * m_numberOfOutputs);
+    for (int f = firstFeature; f < lastFeature; ++f){
+      weightedHistogram(trainingFeatures, featureIndices[f], samples, weights, histogram);
+      lossSumOfHistogram(&histogram[0], featureIndices[f], lossSum);
+    }
+    return;
+  }
+
+  // The features are processed in chunks of columns: for each chunk, a single pass over the samples reads the contiguous part of each row.
+  // Hence, the features are read directly from the given (possibly memory-mapped) array, without copying columns into a contiguous buffer.
+  // The chunk size limits the memory of the histograms of each thread to about 2^20 values.
+  const int binsPerFeature = m_maximumFeatureValue * m_numberOfOutputs;
+  const int chunkSize = std::max(1, (1 << 20) / std::max(binsPerFeature, 1));
+
+  std::vector<double> histograms(std::min(chunkSize, std::max(lastFeature - firstFeature, 0)) * binsPerFeature);
+  std::vector<double> sampleWeights(m_numberOfOutputs);
+  for (int firstInChunk = firstFeature; firstInChunk < lastFeature; firstInChunk += chunkSize){
+    const int lastInChunk = std::min(firstInChunk + chunkSize, lastFeature);
+    std::fill(histograms.begin(), histograms.end(), 0.);
+
+    // compute the weighted histograms of all features of the chunk; histograms[(feature * #values + value) * #outputs + output]
+    // the samples are processed in the same order as in weightedHistogram
+    for (int i = weights.extent(0); i--;){
+      const T* row = data + (allSamples ? i : samples[i]) * sampleStride;
+      for (int outputIndex = 0; outputIndex < m_numberOfOutputs; ++outputIndex){
+        sampleWeights[outputIndex] = weights(i, outputIndex);
+      }
+      double* featureHistogram = &histograms[0];
+      for (int f = firstInChunk; f < lastInChunk; ++f, featureHistogram += binsPerFeature){
+        double* bin = featureHistogram + row[featureIndices[f] * featureStride] * m_numberOfOutputs;
+        for (int outputIndex = 0; outputIndex < m_numberOfOutputs; ++outputIndex){
+          bin[outputIndex] += sampleWeights[outputIndex];
+        }
+      }
+    }
+
+    // compute the loss sums of the features
+    for (int f = firstInChunk; f < lastInChunk; ++f){
+      lossSumOfHistogram(&histograms[(f - firstInChunk) * binsPerFeature], featureIndices[f], lossSum);
+    }
+  }
+}
+
+template <typename T>
+boost::shared_ptr<bob::learn::boosting::LUTMachine> bob::learn::boosting::LUTTrainer::_train(const blitz::Array<T,2>& trainingFeatures, const blitz::Array<double,2>& lossGradient, uint32_t roundSeed) const{
+  // check the shapes here, as exceptions cannot be thrown inside the threads
+  bob::core::array::assertSameDimensionLength(trainingFeatures.extent(0), lossGradient.extent(0));
+  bob::core::array::assertSameDimensionLength(lossGradient.extent(1), m_numberOfOutputs);
+
   int featureLength = trainingFeatures.extent(1);
-  _lossSum.resize(featureLength, m_numberOfOutputs);
+  // features that are not scanned in this round have the largest possible loss, so that they are never selected
+  blitz::Array<double,2> lossSum(featureLength, m_numberOfOutputs);
+  lossSum = std::numeric_limits<double>::max();
+
+  // select the features and samples that are scanned in this round
+  std::mt19937 generator(roundSeed);
+  const std::vector<int32_t> featureIndices = selectFeatures(featureLength, generator);
+  std::vector<int32_t> samples;
+  blitz::Array<double,2> weights;
+  selectSamples(lossGradient, generator, samples, weights);
+
   // Compute the sum of the gradient based on the feature values or the loss associated with each feature index
-  // Compute the loss for each feature
-  for (int featureIndex = featureLength; featureIndex--;){
-    for (int outputIndex = m_numberOfOutputs; outputIndex--;){
-      weightedHistogram(trainingFeatures(blitz::Range::all(),featureIndex), lossGradient(blitz::Range::all(), outputIndex));
-      _lossSum(featureIndex,outputIndex) = - blitz::sum(blitz::abs(_gradientHistogram));
+  // Compute the loss for each feature; the feature range is split between the threads
+  const int numberOfFeatures = featureIndices.size();
+  int numberOfThreads = std::min(m_numberOfThreads, numberOfFeatures);
+  if (numberOfThreads <= 1){
+    lossSums(trainingFeatures, featureIndices, samples, weights, 0, numberOfFeatures, lossSum);
+  } else {
+    std::vector<std::thread> threads;
+    for (int t = 0; t < numberOfThreads; ++t){
+      int first = (int)((int64_t)numberOfFeatures * t / numberOfThreads), last = (int)((int64_t)numberOfFeatures * (t+1) / numberOfThreads);
+      threads.push_back(std::thread(&LUTTrainer::lossSums<T>, this, std::cref(trainingFeatures), std::cref(featureIndices), std::cref(samples), std::cref(weights), first, last, std::ref(lossSum)));
+    }
+    for (auto it = threads.begin(); it != threads.end(); ++it){
+      it->join();
     }
   }
 
   // Select the most discriminative index (or indices) for classification which minimizes the loss
   //  and compute the sum of gradient for that index
+  blitz::Array<int32_t,1> selectedIndices(m_numberOfOutputs);
   if (m_selectionType == independent){
     // independent feature selection is used if all the dimension of output use different feature
     // each of the selected feature minimize a dimension of the loss function
     for (int outputIndex = m_numberOfOutputs; outputIndex--;){
-      _selectedIndices(outputIndex) = bestIndex(_lossSum(blitz::Range::all(),outputIndex));
+      selectedIndices(outputIndex) = bestIndex(lossSum(blitz::Range::all(),outputIndex));
     }
   } else {
     // for 'shared' feature selection the loss function is summed over multiple dimensions and
     // the feature that minimized this cumulative loss is used for all the outputs
     blitz::secondIndex j;
-    const blitz::Array<double,1> sum(blitz::sum(_lossSum, j));
-    _selectedIndices = bestIndex(sum);
+    const blitz::Array<double,1> sum(blitz::sum(lossSum, j));
+    selectedIndices = bestIndex(sum);
   }
 
-  // compute the look-up-tables for the best index
+  // compute the look-up-tables for the best index, using all samples
+  blitz::Array<double,2> luts(m_maximumFeatureValue, m_numberOfOutputs);
+  std::vector<double> histogram(m_maximumFeatureValue * m_numberOfOutputs);
+  const std::vector<int32_t> allSamples;
+  // the histograms of all outputs are computed only when the selected feature changes, e.g., only once for 'shared' selection
+  int32_t histogramIndex = -1;
   for (int outputIndex = m_numberOfOutputs; outputIndex--;){
-    int selectedIndex = _selectedIndices(outputIndex);
-    weightedHistogram(trainingFeatures(blitz::Range::all(), selectedIndex), lossGradient(blitz::Range::all(), outputIndex));
+    if (selectedIndices(outputIndex) != histogramIndex){
+      histogramIndex = selectedIndices(outputIndex);
+      weightedHistogram(trainingFeatures, histogramIndex, allSamples, lossGradient, histogram);
+    }
 
-    for (int lutIndex = m_maximumFeatureValue; lutIndex--;){
-      _luts(lutIndex, outputIndex) = (_gradientHistogram(lutIndex) > 0) * 2. - 1.;
+    if (m_outputType == discrete){
+      for (int lutIndex = m_maximumFeatureValue; lutIndex--;){
+        luts(lutIndex, outputIndex) = (histogram[lutIndex * m_numberOfOutputs + outputIndex] > 0) * 2. - 1.;
+      }
+    } else {
+      // confidence-rated outputs: the gradient sum of each feature value, scaled such that the largest absolute entry is 1
+      // the weight of the machine, which is computed by the boosting, scales the outputs to the optimal step size
+      double maximum = 0.;
+      for (int lutIndex = m_maximumFeatureValue; lutIndex--;){
+        maximum = std::max(maximum, std::abs(histogram[lutIndex * m_numberOfOutputs + outputIndex]));
+      }
+      for (int lutIndex = m_maximumFeatureValue; lutIndex--;){
+        luts(lutIndex, outputIndex) = maximum > 0. ? histogram[lutIndex * m_numberOfOutputs + outputIndex] / maximum : 0.;
+      }
     }
   }
 
   // create new weak machine
-  return boost::shared_ptr<LUTMachine>(new LUTMachine(_luts.copy(), _selectedIndices.copy()));
+  return boost::shared_ptr<LUTMachine>(new LUTMachine(luts, selectedIndices));
+
+}
+
+boost::shared_ptr<bob::learn::boosting::LUTMachine> bob::learn::boosting::LUTTrainer::train(const blitz::Array<uint16_t,2>& trainingFeatures, const blitz::Array<double,2>& lossGradient, uint32_t roundSeed) const{
+  return _train(trainingFeatures, lossGradient, roundSeed);
+}
 
+boost::shared_ptr<bob::learn::boosting::LUTMachine> bob::learn::boosting::LUTTrainer::train(const blitz::Array<uint8_t,2>& trainingFeatures, const blitz::Array<double,2>& lossGradient, uint32_t roundSeed) const{
+  return _train(trainingFeatures, lossGradient, roundSeed);
 }
@@ -1,16 +1,20 @@
 #include <bob.learn.boosting/LossFunction.h>
 #include <math.h>
 
-void bob::learn::boosting::LossFunction::lossSum(const blitz::Array<double,1>& alpha, const blitz::Array<double,2>& targets, const blitz::Array<double,2>& previous_scores, const blitz::Array<double,2>& current_scores, blitz::Array<double,1>& loss_sum) const{
-  // compute the scores and loss for the current alpha
-  scores.resize(targets.shape());
-  // TODO: is there any faster way for this?
+static void combineScores(const blitz::Array<double,1>& alpha, const blitz::Array<double,2>& previous_scores, const blitz::Array<double,2>& current_scores, blitz::Array<double,2>& scores){
   for (int i = scores.extent(0); i--;){
     for (int j = scores.extent(1); j--;){
       scores(i,j) = previous_scores(i,j) + alpha(j) * current_scores(i,j);
     }
   }
-  errors.resize(targets.extent(0), 1);
+}
+
+void bob::learn::boosting::LossFunction::lossSum(const blitz::Array<double,1>& alpha, const blitz::Array<double,2>& targets, const blitz::Array<double,2>& previous_scores, const blitz::Array<double,2>& current_scores, blitz::Array<double,1>& loss_sum) const{
+  // compute the scores and loss for the current alpha
+  // (the temporaries are local, so that the loss function can be used by several threads at the same time)
+  blitz::Array<double,2> scores(targets.shape());
+  combineScores(alpha, previous_scores, current_scores, scores);
+  blitz::Array<double,2> errors(targets.extent(0), numberOfLossOutputs(targets.extent(1)));
   loss(targets, scores, errors);
 
   // compute the sum of the loss
@@ -22,16 +26,9 @@ void bob::learn::boosting::LossFunction::lossSum(const blitz::Array<double,1>& a
 
 void bob::learn::boosting::LossFunction::gradientSum(const blitz::Array<double,1>& alpha, const blitz::Array<double,2>& targets, const blitz::Array<double,2>& previous_scores, const blitz::Array<double,2>& current_scores, blitz::Array<double,1>& gradient_sum) const{
   // compute the scores and gradient for the current alpha
-  scores.resize(targets.shape());
-  // TODO: is there any faster way for this?
-  for (int i = scores.extent(0); i--;){
-    for (int j = scores.extent(1); j--;){
-      scores(i,j) = previous_scores(i,j) + alpha(j) * current_scores(i,j);
-    }
-  }
-//  scores = previous_scores + alpha * current_scores;
-
-  gradients.resize(targets.shape());
+  blitz::Array<double,2> scores(targets.shape());
+  combineScores(alpha, previous_scores, current_scores, scores);
+  blitz::Array<double,2> gradients(targets.shape());
   lossGradient(targets, scores, gradients);
 
   // take the sum of the loss gradient values
@@ -42,3 +39,21 @@ void bob::learn::boosting::LossFunction::gradientSum(const blitz::Array<double,1
 }
 
 
+double bob::learn::boosting::LossFunction::lossAndGradientSum(const blitz::Array<double,1>& alpha, const blitz::Array<double,2>& targets, const blitz::Array<double,2>& previous_scores, const blitz::Array<double,2>& current_scores, blitz::Array<double,1>& gradient_sum) const{
+  // compute the scores for the current alpha only once
+  blitz::Array<double,2> scores(targets.shape());
+  combineScores(alpha, previous_scores, current_scores, scores);
+
+  // compute the loss and the gradient
+  blitz::Array<double,2> errors(targets.extent(0), numberOfLossOutputs(targets.extent(1)));
+  loss(targets, scores, errors);
+  blitz::Array<double,2> gradients(targets.shape());
+  lossGradient(targets, scores, gradients);
+
+  // take the sums
+  const blitz::Array<double, 2> grad(gradients * current_scores);
+  blitz::firstIndex i;
+  blitz::secondIndex j;
+  gradient_sum = blitz::sum(grad(j,i), j);
+  return blitz::sum(errors);
+}
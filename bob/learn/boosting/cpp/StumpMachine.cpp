@@ -21,37 +21,67 @@ double bob::learn::boosting::StumpMachine::_predict(double f) const{
   return m_polarity * ((-2. * (f < m_threshold)) + 1.);
 }
 
-double bob::learn::boosting::StumpMachine::forward(const blitz::Array<double, 1>& features) const{
-  return _predict(features((int)m_index));
-}
-
-void bob::learn::boosting::StumpMachine::forward(const blitz::Array<double, 2>& features, blitz::Array<double,1> predictions) const{
+template <typename T>
+void bob::learn::boosting::StumpMachine::_forward(const blitz::Array<T, 2>& features, blitz::Array<double,1> predictions) const{
   for (int i = features.extent(0); i--;){
     predictions(i) = _predict(features(i, (int)m_index));
   }
 }
 
-void bob::learn::boosting::StumpMachine::forward(const blitz::Array<double, 2>& features, blitz::Array<double,2> predictions) const{
+template <typename T>
+void bob::learn::boosting::StumpMachine::_forward(const blitz::Array<T, 2>& features, blitz::Array<double,2> predictions) const{
   for (int i = features.extent(0); i--;){
     predictions(i,0) = _predict(features(i, (int)m_index));
   }
 }
 
-
+// the forward functions for the supported feature types
 double bob::learn::boosting::StumpMachine::forward(const blitz::Array<uint16_t, 1>& features) const{
   return _predict(features((int)m_index));
 }
 
 void bob::learn::boosting::StumpMachine::forward(const blitz::Array<uint16_t, 2>& features, blitz::Array<double,1> predictions) const{
-  for (int i = features.extent(0); i--;){
-    predictions(i) = _predict(features(i, (int)m_index));
-  }
+  _forward(features, predictions);
 }
 
 void bob::learn::boosting::StumpMachine::forward(const blitz::Array<uint16_t, 2>& features, blitz::Array<double,2> predictions) const{
-  for (int i = features.extent(0); i--;){
-    predictions(i,0) = _predict(features(i, (int)m_index));
-  }
+  _forward(features, predictions);
+}
+
+double bob::learn::boosting::StumpMachine::forward(const blitz::Array<uint8_t, 1>& features) const{
+  return _predict(features((int)m_index));
+}
+
+void bob::learn::boosting::StumpMachine::forward(const blitz::Array<uint8_t, 2>& features, blitz::Array<double,1> predictions) const{
+  _forward(features, predictions);
+}
+
+void bob::learn::boosting::StumpMachine::forward(const blitz::Array<uint8_t, 2>& features, blitz::Array<double,2> predictions) const{
+  _forward(features, predictions);
+}
+
+double bob::learn::boosting::StumpMachine::forward(const blitz::Array<double, 1>& features) const{
+  return _predict(features((int)m_index));
+}
+
+void bob::learn::boosting::StumpMachine::forward(const blitz::Array<double, 2>& features, blitz::Array<double,1> predictions) const{
+  _forward(features, predictions);
+}
+
+void bob::learn::boosting::StumpMachine::forward(const blitz::Array<double, 2>& features, blitz::Array<double,2> predictions) const{
+  _forward(features, predictions);
+}
+
+double bob::learn::boosting::StumpMachine::forward(const blitz::Array<float, 1>& features) const{
+  return _predict(features((int)m_index));
+}
+
+void bob::learn::boosting::StumpMachine::forward(const blitz::Array<float, 2>& features, blitz::Array<double,1> predictions) const{
+  _forward(features, predictions);
+}
+
+void bob::learn::boosting::StumpMachine::forward(const blitz::Array<float, 2>& features, blitz::Array<double,2> predictions) const{
+  _forward(features, predictions);
 }
 
 
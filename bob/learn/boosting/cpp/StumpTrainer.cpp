@@ -0,0 +1,86 @@
+#include <bob.learn.boosting/StumpTrainer.h>
+#include <bob.core/assert.h>
+#include <algorithm>
+#include <vector>
+#include <cmath>
+
+bob::learn::boosting::StumpTrainer::StumpTrainer()
+{
+}
+
+template <typename T>
+boost::shared_ptr<bob::learn::boosting::StumpMachine> bob::learn::boosting::StumpTrainer::_train(const blitz::Array<T,2>& trainingFeatures, const blitz::Array<double,1>& lossGradient) const{
+  const int numberOfSamples = trainingFeatures.extent(0), numberOfFeatures = trainingFeatures.extent(1);
+  bob::core::array::assertSameDimensionLength(numberOfSamples, lossGradient.extent(0));
+
+  // scratch memory, allocated once for all features
+  std::vector<T> values(numberOfSamples);
+  std::vector<int32_t> order(numberOfSamples);
+  std::vector<double> cumulative(numberOfSamples);
+
+  double bestGain = -1., bestThreshold = 0., bestPolarity = 1.;
+  int32_t bestIndex = 0;
+
+  for (int featureIndex = 0; featureIndex < numberOfFeatures; ++featureIndex){
+    double gain = 0., threshold = 0., polarity = 1.;
+
+    // with less than two samples, we gain nothing
+    if (numberOfSamples >= 2){
+      // sort the feature values; the sort needs to be stable to get the same results as in Python
+      for (int i = 0; i < numberOfSamples; ++i){
+        values[i] = trainingFeatures(i, featureIndex);
+        order[i] = i;
+      }
+      std::stable_sort(order.begin(), order.end(), [&values](int32_t a, int32_t b){return values[a] < values[b];});
+
+      // compute the cumulative sum of the (negative) gradients in the order of the sorted feature values
+      double sum = 0.;
+      for (int i = 0; i < numberOfSamples; ++i){
+        sum += -lossGradient(order[i]);
+        cumulative[i] = sum;
+      }
+
+      // find the threshold that maximizes the gain; thresholds can only be placed between two different feature values
+      double bestAbsolute = -1.;
+      int best = -1;
+      for (int i = 0; i < numberOfSamples - 1; ++i){
+        if (values[order[i]] != values[order[i+1]]){
+          double absolute = std::abs(sum - cumulative[i]);
+          if (absolute > bestAbsolute){
+            bestAbsolute = absolute;
+            best = i;
+          }
+        }
+      }
+
+      // if all feature values are identical, we gain nothing
+      if (best >= 0){
+        threshold = (static_cast<double>(values[order[best]]) + static_cast<double>(values[order[best+1]])) * 0.5;
+        polarity = sum - cumulative[best] > 0 ? -1. : 1.;
+        gain = bestAbsolute;
+      }
+    }
+
+    if (gain > bestGain){
+      bestGain = gain;
+      bestIndex = featureIndex;
+      bestThreshold = threshold;
+      bestPolarity = polarity;
+    }
+  }
+
+  // create new weak machine
+  return boost::shared_ptr<StumpMachine>(new StumpMachine(bestThreshold, bestPolarity, bestIndex));
+}
+
+boost::shared_ptr<bob::learn::boosting::StumpMachine> bob::learn::boosting::StumpTrainer::train(const blitz::Array<double,2>& trainingFeatures, const blitz::Array<double,1>& lossGradient) const{
+  return _train(trainingFeatures, lossGradient);
+}
+
+boost::shared_ptr<bob::learn::boosting::StumpMachine> bob::learn::boosting::StumpTrainer::train(const blitz::Array<uint16_t,2>& trainingFeatures, const blitz::Array<double,1>& lossGradient) const{
+  return _train(trainingFeatures, lossGradient);
+}
+
+boost::shared_ptr<bob::learn::boosting::StumpMachine> bob::learn::boosting::StumpTrainer::train(const blitz::Array<uint8_t,2>& trainingFeatures, const blitz::Array<double,1>& lossGradient) const{
+  return _train(trainingFeatures, lossGradient);
+}
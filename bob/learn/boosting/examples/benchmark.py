@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+
+"""Benchmarks the evaluation of a strong classifier with different loop orders.
+
+A strong classifier with random weak machines is evaluated on random features of the given sizes.
+The machine-major loop order (block size 0), which evaluates each weak machine on all samples, is compared to the sample-major, blocked loop order with different block sizes, and to the compiled machine.
+"""
+from __future__ import print_function
+
+import numpy
+import argparse
+import timeit
+
+import bob.learn.boosting
+
+import bob.core
+logger = bob.core.log.setup('bob.learn.boosting')
+
+
+def command_line_arguments(command_line_options):
+  """Defines the command line options."""
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+  parser.add_argument('-t', '--weak-machine-type', default = 'lut', choices = ('lut', 'stump'), help = "The type of the (random) weak machines.")
+  parser.add_argument('-w', '--number-of-weak-machines', type = int, default = 500, help = "The number of weak machines in the strong classifier.")
+  parser.add_argument('-o', '--number-of-outputs', type = int, default = 1, help = "The number of outputs of the strong classifier (LUT machines only).")
+  parser.add_argument('-s', '--sizes', nargs = '+', default = ['60000x784', '1000000x64'], help = "The sizes '#samples x #features' of the feature matrices; the default is MNIST-sized data and one million samples.")
+  parser.add_argument('-b', '--block-sizes', type = int, nargs = '+', default = [0, 64, 256, 1024, 4096], help = "The block sizes to test; 0 is the machine-major loop order.")
+  parser.add_argument('-r', '--repeats', type = int, default = 3, help = "The number of times each evaluation is repeated; the fastest time is reported.")
+
+  bob.core.log.add_command_line_option(parser)
+  args = parser.parse_args(command_line_options)
+  bob.core.log.set_verbosity_level(logger, args.verbose)
+
+  if args.weak_machine_type == 'stump' and args.number_of_outputs != 1:
+    raise ValueError("Stump machines can only be used with a single output.")
+
+  return args
+
+
+def random_machine(weak_machine_type, number_of_weak_machines, number_of_features, number_of_outputs):
+  """Creates a strong classifier with random weak machines."""
+  machine = bob.learn.boosting.BoostedMachine()
+  for i in range(number_of_weak_machines):
+    if weak_machine_type == 'lut':
+      weak_machine = bob.learn.boosting.LUTMachine(numpy.random.choice([-1., 1.], (256, number_of_outputs)), numpy.random.randint(0, number_of_features, number_of_outputs).astype(numpy.int32))
+    else:
+      weak_machine = bob.learn.boosting.StumpMachine(numpy.random.rand() * 256., numpy.random.choice([-1., 1.]), int(numpy.random.randint(number_of_features)))
+    machine.add_weak_machine(weak_machine, numpy.random.randn(number_of_outputs))
+  return machine
+
+
+def main(command_line_options = None):
+
+  args = command_line_arguments(command_line_options)
+
+  for size in args.sizes:
+    number_of_samples, number_of_features = [int(s) for s in size.split('x')]
+    logger.info("Creating %d random features of length %d", number_of_samples, number_of_features)
+    features = numpy.random.randint(0, 256, (number_of_samples, number_of_features)).astype(numpy.uint16)
+    machine = random_machine(args.weak_machine_type, args.number_of_weak_machines, number_of_features, args.number_of_outputs)
+    scores = numpy.ndarray((number_of_samples, args.number_of_outputs))
+
+    print ("Evaluating %d %s machines on %d samples with %d features:" % (args.number_of_weak_machines, args.weak_machine_type, number_of_samples, number_of_features))
+    reference = None
+    for block_size in args.block_sizes:
+      machine.block_size = block_size
+      seconds = min(timeit.repeat(lambda: machine(features, scores), number = 1, repeat = args.repeats))
+      print ("  block size %7d: %8.3f s" % (block_size, seconds))
+      if reference is None:
+        reference = scores.copy()
+      assert (scores == reference).all()
+
+    machine.compile()
+    seconds = min(timeit.repeat(lambda: machine(features, scores), number = 1, repeat = args.repeats))
+    print ("  compiled          : %8.3f s" % seconds)
+    assert (scores == reference).all()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+
+"""Benchmarks the weak trainers with training features in sample-major and in feature-major order.
+
+Random features of the given sizes are stored in sample-major (C) order, i.e., each sample is contiguous, and in feature-major (Fortran) order, i.e., each feature column is contiguous.
+For both layouts, a single round of each weak trainer is timed, and the time to convert the features into feature-major order is reported, which is spent only once in :py:meth:`bob.learn.boosting.Boosting.train`.
+"""
+from __future__ import print_function
+
+import numpy
+import argparse
+import timeit
+
+import bob.learn.boosting
+import bob.learn.boosting._library
+
+import bob.core
+logger = bob.core.log.setup('bob.learn.boosting')
+
+
+def command_line_arguments(command_line_options):
+  """Defines the command line options."""
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+  parser.add_argument('-t', '--trainers', nargs = '+', default = ['lut', 'stump', 'native-stump'], choices = ('lut', 'stump', 'native-stump'), help = "The weak trainers to test.")
+  parser.add_argument('-s', '--sizes', nargs = '+', default = ['60000x784', '10000x4096', '1000000x64'], help = "The sizes '#samples x #features' of the feature matrices.")
+  parser.add_argument('-m', '--maximum-feature-value', type = int, default = 256, help = "The number of different feature values.")
+  parser.add_argument('-o', '--number-of-outputs', type = int, default = 1, help = "The number of outputs of the LUT trainer.")
+  parser.add_argument('-T', '--number-of-threads', type = int, default = 1, help = "The number of threads of the LUT trainer.")
+  parser.add_argument('-r', '--repeats', type = int, default = 3, help = "The number of times each training is repeated; the fastest time is reported.")
+
+  bob.core.log.add_command_line_option(parser)
+  args = parser.parse_args(command_line_options)
+  bob.core.log.set_verbosity_level(logger, args.verbose)
+
+  return args
+
+
+def weak_trainer(name, args):
+  """Creates the weak trainer with the given name, and returns it together with the number of outputs that it supports."""
+  if name == 'lut':
+    return bob.learn.boosting.LUTTrainer(args.maximum_feature_value, args.number_of_outputs, number_of_threads = args.number_of_threads), args.number_of_outputs
+  if name == 'stump':
+    return bob.learn.boosting.StumpTrainer(), 1
+  return bob.learn.boosting._library.StumpTrainer(), 1
+
+
+def main(command_line_options = None):
+
+  args = command_line_arguments(command_line_options)
+
+  for size in args.sizes:
+    number_of_samples, number_of_features = [int(s) for s in size.split('x')]
+    logger.info("Creating %d random features of length %d", number_of_samples, number_of_features)
+    sample_major = numpy.random.randint(0, args.maximum_feature_value, (number_of_samples, number_of_features)).astype(numpy.uint16)
+
+    seconds = min(timeit.repeat(lambda: numpy.asfortranarray(sample_major), number = 1, repeat = args.repeats))
+    feature_major = numpy.asfortranarray(sample_major)
+    print ("Training with %d samples and %d features; conversion into feature-major order: %8.3f s" % (number_of_samples, number_of_features, seconds))
+
+    for name in args.trainers:
+      trainer, number_of_outputs = weak_trainer(name, args)
+      loss_gradient = numpy.random.randn(number_of_samples, number_of_outputs)
+      reference = None
+      for layout, features in (('sample-major', sample_major), ('feature-major', feature_major)):
+        # the sorting of the python stump trainer is done only once for all rounds, so it is not timed here
+        if hasattr(trainer, 'prepare'):
+          trainer.prepare(features)
+        seconds = min(timeit.repeat(lambda: trainer.train(features, loss_gradient), number = 1, repeat = args.repeats))
+        print ("  %-12s %-13s: %8.3f s" % (name, layout, seconds))
+        # both layouts select the same weak machine
+        machine = trainer.train(features, loss_gradient)
+        if reference is None:
+          reference = machine
+        assert (machine.feature_indices() == reference.feature_indices()).all()
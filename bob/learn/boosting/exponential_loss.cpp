@@ -0,0 +1,77 @@
+#include "main.h"
+
+static auto exponentialLoss_doc = bob::extension::ClassDoc(
+  "ExponentialLoss",
+  "Computes the exponential loss and its derivative.",
+  "The exponential loss between target :math:`t` and score :math:`s` is used in classification tasks, e.g., in AdaBoost:\n\n"
+  ".. math:: l(t, s) = e^{-ts}\n\n"
+  "and its derivative is:\n\n"
+  ".. math:: \\frac{\\partial l}{\\partial s}(t, s) = -t e^{-ts}\n\n"
+  "The loss and the derivative are computed independently for each sample and each output, i.e., :py:meth:`loss` returns one value per sample and output.\n\n"
+  "This class is a C++ implementation of the python class :py:class:`bob.learn.boosting.ExponentialLoss`, which computes the same values. "
+  "The :py:meth:`loss_sum` and :py:meth:`loss_gradient_sum` functions compute the sums in a single pass over the data, without creating temporary arrays, and release the global interpreter lock."
+)
+.add_constructor(
+  bob::extension::FunctionDoc(
+    "__init__",
+    "Initializes a ExponentialLoss object.",
+    "The constructor comes with no parameters.",
+    true
+  ).add_prototype("", "")
+);
+
+
+static int exponentialLoss_init(
+  ExponentialLossObject* self,
+  PyObject* args,
+  PyObject* kwargs
+)
+{
+  // get list of arguments
+  char* kwlist[] = {NULL};
+  if (!PyArg_ParseTupleAndKeywords(args, kwargs, "", kwlist)) return -1;
+
+  self->base.reset(new bob::learn::boosting::ExponentialLoss());
+  self->parent.base = self->base;
+  return 0;
+}
+
+static void exponentialLoss_exit(
+  ExponentialLossObject* self
+)
+{
+  self->base.reset();
+  self->parent.base.reset();
+  Py_TYPE(self)->tp_free(reinterpret_cast<PyObject*>(self));
+}
+
+
+// Define ExponentialLoss Type object; will be filled later
+PyTypeObject ExponentialLossType = {
+  PyVarObject_HEAD_INIT(0,0)
+  0
+};
+
+bool init_ExponentialLoss(PyObject* module)
+{
+
+  // initialize the ExponentialLossType struct
+  ExponentialLossType.tp_name = exponentialLoss_doc.name();
+  ExponentialLossType.tp_basicsize = sizeof(ExponentialLossObject);
+  ExponentialLossType.tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE;
+  ExponentialLossType.tp_doc = exponentialLoss_doc.doc();
+  ExponentialLossType.tp_base = &LossFunctionType;
+
+  // set the functions
+  ExponentialLossType.tp_new = PyType_GenericNew;
+  ExponentialLossType.tp_init = reinterpret_cast<initproc>(exponentialLoss_init);
+  ExponentialLossType.tp_dealloc = reinterpret_cast<destructor>(exponentialLoss_exit);
+
+  // check that everyting is fine
+  if (PyType_Ready(&ExponentialLossType) < 0)
+    return false;
+
+  // add the type to the module
+  Py_INCREF(&ExponentialLossType);
+  return PyModule_AddObject(module, exponentialLoss_doc.name(), (PyObject*)&ExponentialLossType) >= 0;
+}
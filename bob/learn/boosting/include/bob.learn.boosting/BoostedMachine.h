@@ -4,9 +4,36 @@
 #include <bob.io.base/HDF5File.h>
 
 #include <bob.learn.boosting/WeakMachine.h>
+#include <boost/shared_ptr.hpp>
+#include <vector>
 
 namespace bob { namespace learn { namespace boosting {
 
+  /**
+   * The parameters of all LUTMachines and StumpMachines of a BoostedMachine, concatenated in the order of the weak machines.
+   * This is the layout of the packed HDF5 files (version 3), which is used for pickling as well.
+   */
+  struct PackedWeakMachines{
+    // the type of each weak machine (0: StumpMachine, 1: LUTMachine)
+    blitz::Array<int32_t,1> types;
+    // the threshold, polarity and feature index of each StumpMachine
+    blitz::Array<double,1> stumpThresholds;
+    blitz::Array<double,1> stumpPolarities;
+    blitz::Array<int32_t,1> stumpIndices;
+    // the shape (#entries, #outputs) of each LUTMachine, the concatenated LUTs in row-major order and the concatenated feature indices of all outputs
+    blitz::Array<int32_t,2> lutShapes;
+    blitz::Array<double,1> luts;
+    blitz::Array<int32_t,1> lutIndices;
+  };
+
+  /**
+   * The strong machine, which is a weighted combination of weak machines.
+   *
+   * All forward functions are reentrant, so that one machine can be evaluated by several threads at the same time.
+   * The machine is not locked: modifying it (addWeakMachine, load, loadMapped, compile, setCascade, setBlockSize) while it is being evaluated is not supported, since these functions reallocate or change the arrays and parameters that the forward functions read.
+   *
+   * A machine that is loaded with loadMapped is read-only: it has no weak machines, and its compiled representation points into the memory-mapped file.
+   */
   class BoostedMachine{
     public:
       BoostedMachine();
@@ -19,21 +46,39 @@ namespace bob { namespace learn { namespace boosting {
 
       // predicts the output for the given single feature
       double forward(const blitz::Array<uint16_t, 1>& features) const;
+      double forward(const blitz::Array<uint8_t, 1>& features) const;
+      double forward(const blitz::Array<double, 1>& features) const;
+      double forward(const blitz::Array<float, 1>& features) const;
 
       // predicts the output for the given single feature (multi-variate case)
       void forward(const blitz::Array<uint16_t, 1>& features, blitz::Array<double,1> predictions) const;
+      void forward(const blitz::Array<uint8_t, 1>& features, blitz::Array<double,1> predictions) const;
+      void forward(const blitz::Array<double, 1>& features, blitz::Array<double,1> predictions) const;
+      void forward(const blitz::Array<float, 1>& features, blitz::Array<double,1> predictions) const;
 
       // predicts the output for multiple features (uni-variate case)
       void forward(const blitz::Array<uint16_t, 2>& features, blitz::Array<double,1> predictions) const;
+      void forward(const blitz::Array<uint8_t, 2>& features, blitz::Array<double,1> predictions) const;
+      void forward(const blitz::Array<double, 2>& features, blitz::Array<double,1> predictions) const;
+      void forward(const blitz::Array<float, 2>& features, blitz::Array<double,1> predictions) const;
 
       // predicts the output for multiple features (multi-variate case)
       void forward(const blitz::Array<uint16_t, 2>& features, blitz::Array<double,2> predictions) const;
+      void forward(const blitz::Array<uint8_t, 2>& features, blitz::Array<double,2> predictions) const;
+      void forward(const blitz::Array<double, 2>& features, blitz::Array<double,2> predictions) const;
+      void forward(const blitz::Array<float, 2>& features, blitz::Array<double,2> predictions) const;
 
       // predicts the output and the labels for the given features (uni-variate case)
       void forward(const blitz::Array<uint16_t, 2>& features, blitz::Array<double,1> predictions, blitz::Array<double,1> labels) const;
+      void forward(const blitz::Array<uint8_t, 2>& features, blitz::Array<double,1> predictions, blitz::Array<double,1> labels) const;
+      void forward(const blitz::Array<double, 2>& features, blitz::Array<double,1> predictions, blitz::Array<double,1> labels) const;
+      void forward(const blitz::Array<float, 2>& features, blitz::Array<double,1> predictions, blitz::Array<double,1> labels) const;
 
       // predicts the output and the labels for the given features (multi-variate case)
       void forward(const blitz::Array<uint16_t, 2>& features, blitz::Array<double,2> predictions, blitz::Array<double,2> labels) const;
+      void forward(const blitz::Array<uint8_t, 2>& features, blitz::Array<double,2> predictions, blitz::Array<double,2> labels) const;
+      void forward(const blitz::Array<double, 2>& features, blitz::Array<double,2> predictions, blitz::Array<double,2> labels) const;
+      void forward(const blitz::Array<float, 2>& features, blitz::Array<double,2> predictions, blitz::Array<double,2> labels) const;
 
       // the number of outputs of the machine (multi-variate); 1 for the uni-variate case
       int numberOfOutputs() const {return m_weights.extent(1);}
@@ -48,23 +93,130 @@ namespace bob { namespace learn { namespace boosting {
       const std::vector<boost::shared_ptr<WeakMachine> >& getWeakMachines() const {return m_weak_machines;}
 
       // writes the machine to file
+      // machines that consist of LUTMachines and StumpMachines are written in the packed layout of version 3, which stores all weak machines in a few contiguous datasets
+      // other machines are written with one group per weak machine (version 2)
       void save(bob::io::base::HDF5File& file) const;
 
-      // loads the machine from file
+      // loads the machine from file; all versions (1, 2 and 3) can be read
       void load(bob::io::base::HDF5File& file);
 
+      // returns true if all weak machines are LUTMachines or StumpMachines, so that they can be packed
+      bool isPackable() const;
+      // concatenates the parameters of all weak machines, which need to be LUTMachines or StumpMachines
+      void pack(PackedWeakMachines& packed) const;
+      // replaces the weak machines and weights of this machine by the given ones; the cascade is removed
+      void unpack(const blitz::Array<double,2>& weights, const PackedWeakMachines& packed);
+
+      // the number of samples that are evaluated with all weak machines at a time (0 = all samples at once)
+      int getBlockSize() const {return m_blockSize;}
+      void setBlockSize(int blockSize);
+
+      // turns the machine into a cascade; stageEnds contains the (increasing) index after the last weak machine of each stage, the last one must be the number of weak machines
+      // a sample is rejected as soon as its partial score after one stage is below the threshold of that stage
+      // empty arrays remove the cascade
+      void setCascade(const blitz::Array<int32_t,1>& stageEnds, const blitz::Array<double,1>& thresholds);
+      // the stage ends and thresholds of the cascade; empty when the machine is no cascade
+      const blitz::Array<int32_t,1> getCascadeStages() const {return m_cascadeStages;}
+      const blitz::Array<double,1> getCascadeThresholds() const {return m_cascadeThresholds;}
+      // returns true if the cascade evaluation is enabled
+      bool isCascade() const {return m_cascadeStages.extent(0) > 0;}
+
+      // flattens the weak machines into contiguous arrays, which are used by all following calls to forward
+      // this is only possible if all weak machines are LUTMachines, or all are (uni-variate) StumpMachines
+      void compile();
+
+      // returns true if the machine has been compiled, and no weak machine has been added since
+      bool isCompiled() const {return m_compiled != none;}
+
+      // writes the compiled representation of the machine (see compile) to a flat binary file, which can be memory-mapped by loadMapped
+      void saveMapped(const std::string& filename) const;
+
+      // memory-maps the given file written by saveMapped; the machine is read-only afterwards, until load is called
+      // the file is mapped read-only and shared, so that all processes that load the same file share one copy of it in the page cache
+      void loadMapped(const std::string& filename);
+
+      // reads the content of a file written by saveMapped from the given memory, e.g., when unpickling; the content is copied, and the machine is read-only afterwards, as after loading the file
+      void loadMapped(const void* data, size_t size);
+
+      // returns true if the machine has been loaded with loadMapped
+      bool isMapped() const {return m_mapped;}
+      // returns the content of the file (or memory) that the machine has been loaded from with loadMapped; the memory stays valid as long as the returned pointer exists
+      boost::shared_ptr<const char> getMappedData(size_t& size) const;
+
 
     private:
+      // the packed (version 3) and the group-wise (version 1 and 2) file layouts
+      void savePacked(bob::io::base::HDF5File& file) const;
+      void saveGroups(bob::io::base::HDF5File& file) const;
+      void loadPacked(bob::io::base::HDF5File& file);
+      void loadGroups(bob::io::base::HDF5File& file);
+      // creates the weak machines from the packed parameters
+      void _unpack(const PackedWeakMachines& packed);
+      // removes all weak machines and the compiled representation
+      void _clear();
+      // checks the content of a file written by saveMapped, and points the compiled representation into the given memory
+      void _loadMapped(const boost::shared_ptr<void>& storage, size_t size, const std::string& source);
+
       // The weak machines
       std::vector<boost::shared_ptr<WeakMachine> > m_weak_machines;
       // the (multi-variate) weights of the machines
       blitz::Array<double,2> m_weights;
-      // a shortcut to speed up uni-variate access
-      blitz::Array<double,1> _weights;
-
-      // shortcut to avoid allocating memory for each call of 'forward'
-      mutable blitz::Array<double,1> _predictions1;
-      mutable blitz::Array<double,2> _predictions2;
+      // the number of samples that are evaluated together
+      int m_blockSize;
+      // the stages and the rejection thresholds of the cascade
+      blitz::Array<int32_t,1> m_cascadeStages;
+      blitz::Array<double,1> m_cascadeThresholds;
+
+      // the implementations of the forward functions, which are specialized for uint16, uint8, double and float features
+      // the latter two are only supported by StumpMachines
+      template <typename T>
+        double _forward(const blitz::Array<T, 1>& features) const;
+      template <typename T>
+        void _forward(const blitz::Array<T, 1>& features, blitz::Array<double,1> predictions) const;
+      template <typename T>
+        void _forward(const blitz::Array<T, 2>& features, blitz::Array<double,1> predictions) const;
+      template <typename T>
+        void _forward(const blitz::Array<T, 2>& features, blitz::Array<double,2> predictions) const;
+      template <typename T>
+        void _forward(const blitz::Array<T, 2>& features, blitz::Array<double,1> predictions, blitz::Array<double,1> labels) const;
+      template <typename T>
+        void _forward(const blitz::Array<T, 2>& features, blitz::Array<double,2> predictions, blitz::Array<double,2> labels) const;
+
+      // evaluates the cascade for a single feature vector; returns the (partial) score and whether the sample was accepted by all stages
+      template <typename T>
+        double _forwardCascade(const blitz::Array<T,1>& features, bool& accepted) const;
+      // evaluates the cascade for several feature vectors; the labels are only computed when given
+      template <typename T>
+        void _forwardCascade(const blitz::Array<T,2>& features, blitz::Array<double,1> predictions, blitz::Array<double,1>* labels) const;
+
+      // computes the first numberOfOutputs predictions of a single feature vector using the compiled representation
+      template <typename T>
+        void _forwardCompiled(const T* features, int featureStride, double* predictions, int predictionStride, int numberOfOutputs) const;
+
+      // the compiled representation of the weak machines
+      enum CompiledType {none, lut, stump} m_compiled;
+      // the feature index for each weak machine (stumps), or for each weak machine and output (LUTs)
+      const int32_t* m_compiledIndices;
+      // the offset of the LUT in m_compiledValues for each weak machine and output (LUTs only)
+      const int64_t* m_compiledOffsets;
+      // the number of entries of the LUT for each weak machine and output (LUTs only); larger feature values are rejected
+      const int64_t* m_compiledSizes;
+      // the thresholds of the weak machines (stumps only)
+      const double* m_compiledThresholds;
+      // the LUT entries (LUTs), or the outputs below and above the threshold (stumps); all multiplied with the weights
+      const double* m_compiledValues;
+      // the memory that the compiled arrays point into, i.e., the CompiledArrays or the memory-mapped file
+      boost::shared_ptr<void> m_compiledStorage;
+      // is the compiled representation memory-mapped from file?
+      bool m_mapped;
+      // the content of the file that the machine has been loaded from with loadMapped, which is owned by m_compiledStorage
+      const char* m_mappedData;
+      size_t m_mappedSize;
+
+      // the flattened arrays of the compiled representation
+      struct CompiledArrays;
+      // flattens the weak machines into the given arrays, and returns their type
+      CompiledType _compile(CompiledArrays& arrays) const;
   };
 
 } } } // namespaces
@@ -0,0 +1,79 @@
+#ifndef BOB_LEARN_BOOSTING_ELEMENTWISE_LOSS_H
+#define BOB_LEARN_BOOSTING_ELEMENTWISE_LOSS_H
+
+#include <blitz/array.h>
+#include <bob.learn.boosting/LossFunction.h>
+
+namespace bob { namespace learn { namespace boosting {
+
+  /**
+   * Base class for loss functions that are computed independently for each sample and each output, e.g., for classification.
+   *
+   * The derived class needs to provide three static functions, which are inlined in the loops:
+   *   static double value(const double target, const double score);
+   *   static double derivative(const double target, const double score);
+   *   static double valueAndDerivative(const double target, const double score, double& gradient);
+   *
+   * The loss and gradient sums are computed in a single pass over the data, without any temporary arrays.
+   */
+  template <class Loss>
+  class ElementwiseLoss : public LossFunction{
+    public:
+      virtual ~ElementwiseLoss(){}
+
+      void lossSum(const blitz::Array<double,1>& alpha, const blitz::Array<double,2>& targets, const blitz::Array<double,2>& previous_scores, const blitz::Array<double,2>& current_scores, blitz::Array<double,1>& loss_sum) const{
+        loss_sum = 0.;
+        for (int i = 0; i < targets.extent(0); ++i){
+          for (int j = 0; j < targets.extent(1); ++j){
+            loss_sum(j) += Loss::value(targets(i,j), previous_scores(i,j) + alpha(j) * current_scores(i,j));
+          }
+        }
+      }
+
+      void gradientSum(const blitz::Array<double,1>& alpha, const blitz::Array<double,2>& targets, const blitz::Array<double,2>& previous_scores, const blitz::Array<double,2>& current_scores, blitz::Array<double,1>& gradient_sum) const{
+        gradient_sum = 0.;
+        for (int i = 0; i < targets.extent(0); ++i){
+          for (int j = 0; j < targets.extent(1); ++j){
+            gradient_sum(j) += Loss::derivative(targets(i,j), previous_scores(i,j) + alpha(j) * current_scores(i,j)) * current_scores(i,j);
+          }
+        }
+      }
+
+      double lossAndGradientSum(const blitz::Array<double,1>& alpha, const blitz::Array<double,2>& targets, const blitz::Array<double,2>& previous_scores, const blitz::Array<double,2>& current_scores, blitz::Array<double,1>& gradient_sum) const{
+        double loss_sum = 0., gradient;
+        gradient_sum = 0.;
+        for (int i = 0; i < targets.extent(0); ++i){
+          for (int j = 0; j < targets.extent(1); ++j){
+            loss_sum += Loss::valueAndDerivative(targets(i,j), previous_scores(i,j) + alpha(j) * current_scores(i,j), gradient);
+            gradient_sum(j) += gradient * current_scores(i,j);
+          }
+        }
+        return loss_sum;
+      }
+
+      void loss(const blitz::Array<double, 2>& targets, const blitz::Array<double, 2>& scores, blitz::Array<double, 2>& errors) const{
+        for (int i = targets.extent(0); i--;){
+          for (int j = targets.extent(1); j--;){
+            errors(i,j) = Loss::value(targets(i,j), scores(i,j));
+          }
+        }
+      }
+
+      void lossGradient(const blitz::Array<double, 2>& targets, const blitz::Array<double, 2>& scores, blitz::Array<double, 2>& gradient) const{
+        for (int i = targets.extent(0); i--;){
+          for (int j = targets.extent(1); j--;){
+            gradient(i,j) = Loss::derivative(targets(i,j), scores(i,j));
+          }
+        }
+      }
+
+      // one loss value is computed for each output
+      int numberOfLossOutputs(const int numberOfOutputs) const {return numberOfOutputs;}
+
+    protected:
+      ElementwiseLoss(){}
+  };
+
+} } } // namespaces
+
+#endif // BOB_LEARN_BOOSTING_ELEMENTWISE_LOSS_H
@@ -0,0 +1,34 @@
+#ifndef BOB_LEARN_BOOSTING_EXPONENTIAL_LOSS_H
+#define BOB_LEARN_BOOSTING_EXPONENTIAL_LOSS_H
+
+#include <math.h>
+#include <bob.learn.boosting/ElementwiseLoss.h>
+
+namespace bob { namespace learn { namespace boosting {
+
+  /**
+   * The exponential loss exp(-t*s) for classification tasks.
+   */
+  class ExponentialLoss : public ElementwiseLoss<ExponentialLoss>{
+    public:
+      ExponentialLoss(){}
+      virtual ~ExponentialLoss(){}
+
+      static double value(const double target, const double score){
+        return exp(-(target * score));
+      }
+
+      static double derivative(const double target, const double score){
+        return -target * exp(-(target * score));
+      }
+
+      static double valueAndDerivative(const double target, const double score, double& gradient){
+        const double e = exp(-(target * score));
+        gradient = -target * e;
+        return e;
+      }
+  };
+
+} } } // namespaces
+
+#endif // BOB_LEARN_BOOSTING_EXPONENTIAL_LOSS_H
@@ -6,8 +6,9 @@
 
 namespace bob { namespace learn { namespace boosting {
 
-  // This is a fast implementation of the weighted histogram
-  inline void weighted_histogram(const blitz::Array<uint16_t,1>& features, const blitz::Array<double,1>& weights, blitz::Array<double,1>& histogram){
+  // This is a fast implementation of the weighted histogram, for uint16 or uint8 features
+  template <typename T>
+  inline void weighted_histogram(const blitz::Array<T,1>& features, const blitz::Array<double,1>& weights, blitz::Array<double,1>& histogram){
     assert(features.extent(0) == weights.extent(0));
     histogram = 0.;
     for (int i = features.extent(0); i--;){
@@ -15,6 +16,22 @@ namespace bob { namespace learn { namespace boosting {
     }
   }
 
+  // This is a fast implementation of the weighted histogram for several outputs at once
+  // The histogram of shape (maximum_feature_value, number_of_outputs) is computed in a single pass over the features
+  template <typename T>
+  inline void weighted_histogram(const blitz::Array<T,1>& features, const blitz::Array<double,2>& weights, blitz::Array<double,2>& histogram){
+    assert(features.extent(0) == weights.extent(0));
+    assert(weights.extent(1) == histogram.extent(1));
+    const int outputs = weights.extent(1);
+    histogram = 0.;
+    for (int i = features.extent(0); i--;){
+      const int f = features(i);
+      for (int k = 0; k < outputs; ++k){
+        histogram(f, k) += weights(i, k);
+      }
+    }
+  }
+
   inline boost::shared_ptr<WeakMachine> loadWeakMachine(bob::io::base::HDF5File& file){
     std::string machine_type;
     file.getAttribute(".", "MachineType", machine_type);
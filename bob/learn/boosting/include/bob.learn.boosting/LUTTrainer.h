@@ -2,6 +2,8 @@
 #define BOB_LEARN_BOOSTING_LUT_TRAINER_H
 
 #include <bob.learn.boosting/LUTMachine.h>
+#include <vector>
+#include <random>
 
 
 namespace bob { namespace learn { namespace boosting {
@@ -19,29 +21,76 @@ namespace bob { namespace learn { namespace boosting {
         shared = 1
       } SelectionStyle;
 
-      // Create an LUT machine using the given LUT and the given index
-      LUTTrainer(uint16_t maximumFeatureValue, int numberOfOutputs = 1, SelectionStyle selectionType = independent);
+      typedef enum {
+        discrete = 0,
+        real = 1
+      } OutputStyle;
+
+      // Create an LUT trainer; the features are scanned using the given number of threads (0 = one thread per CPU core)
+      // In each round, only a random subset of the features and an importance-sampled subset of the samples are scanned, when the fractions are smaller than 1
+      // The LUT entries are either +1 and -1 (discrete), or the gradient sums of the feature values, normalized to the range [-1,1] (real)
+      LUTTrainer(uint16_t maximumFeatureValue, int numberOfOutputs = 1, SelectionStyle selectionType = independent, int numberOfThreads = 1, double featureFraction = 1., double sampleFraction = 1., uint32_t seed = 0, OutputStyle outputType = discrete);
+
+      // trains an LUT machine for uint16 or uint8 features; the features and samples of this round are selected with the given seed
+      // this function does not modify the trainer, so that several threads can train with the same trainer at the same time
+      boost::shared_ptr<LUTMachine> train(const blitz::Array<uint16_t, 2>& training_features, const blitz::Array<double,2>& loss_gradient, uint32_t roundSeed) const;
+      boost::shared_ptr<LUTMachine> train(const blitz::Array<uint8_t, 2>& training_features, const blitz::Array<double,2>& loss_gradient, uint32_t roundSeed) const;
+      // trains an LUT machine with the next seed of the trainer (see nextSeed)
+      boost::shared_ptr<LUTMachine> train(const blitz::Array<uint16_t, 2>& training_features, const blitz::Array<double,2>& loss_gradient) {return train(training_features, loss_gradient, nextSeed());}
+      boost::shared_ptr<LUTMachine> train(const blitz::Array<uint8_t, 2>& training_features, const blitz::Array<double,2>& loss_gradient) {return train(training_features, loss_gradient, nextSeed());}
+
+      // returns the seed of the next round, which is derived from the seed of the constructor and the round counter, and increments the round counter
+      // this function modifies the trainer, so calls from several threads need to be synchronized (e.g., by the GIL)
+      uint32_t nextSeed();
 
-      boost::shared_ptr<LUTMachine> train(const blitz::Array<uint16_t, 2>& training_features, const blitz::Array<double,2>& loss_gradient) const;
+      // the number of seeds that have been drawn with nextSeed, i.e., the number of rounds that have been trained
+      uint64_t round() const {return m_round;}
+      void setRound(uint64_t round) {m_round = round;}
+
+      // writes and reads the round counter, e.g., for a checkpoint of the boosting
+      void saveState(bob::io::base::HDF5File& file) const;
+      void loadState(bob::io::base::HDF5File& file);
 
       uint16_t maximumFeatureValue() const {return m_maximumFeatureValue;}
       int numberOfOutputs() const {return m_numberOfOutputs;}
       SelectionStyle selectionType() const {return m_selectionType;}
+      int numberOfThreads() const {return m_numberOfThreads;}
+      double featureFraction() const {return m_featureFraction;}
+      double sampleFraction() const {return m_sampleFraction;}
+      uint32_t seed() const {return m_seed;}
+      OutputStyle outputType() const {return m_outputType;}
 
     private:
       int32_t bestIndex(const blitz::Array<double,1>& array) const;
-      void weightedHistogram(const blitz::Array<uint16_t,1>& features, const blitz::Array<double,1>& weights) const;
+      // the implementation of the training, which is specialized for uint16 and uint8 features
+      template <typename T>
+        boost::shared_ptr<LUTMachine> _train(const blitz::Array<T, 2>& training_features, const blitz::Array<double,2>& loss_gradient, uint32_t roundSeed) const;
+      // selects the indices of the features that are scanned in the current round
+      std::vector<int32_t> selectFeatures(int featureLength, std::mt19937& generator) const;
+      // draws samples with probabilities proportional to their absolute loss gradients, and computes their weights such that the weighted histograms are unbiased
+      // if all samples are used, samples stays empty
+      void selectSamples(const blitz::Array<double,2>& lossGradient, std::mt19937& generator, std::vector<int32_t>& samples, blitz::Array<double,2>& weights) const;
+      // computes the weighted histograms of one feature for all outputs in a single pass
+      // the i'th row of the weights belongs to the i'th of the given samples, or to the i'th sample, if no samples are given
+      template <typename T>
+        void weightedHistogram(const blitz::Array<T,2>& features, int featureIndex, const std::vector<int32_t>& samples, const blitz::Array<double,2>& weights, std::vector<double>& histogram) const;
+      // computes the loss sum of one feature from its weighted histograms
+      void lossSumOfHistogram(const double* histogram, int featureIndex, blitz::Array<double,2>& lossSum) const;
+      // computes the loss sums for the features in range [firstFeature, lastFeature) of the given feature indices; this function is executed in parallel
+      // features in sample-major order are processed in chunks of columns, features in feature-major order one column at a time
+      template <typename T>
+        void lossSums(const blitz::Array<T,2>& features, const std::vector<int32_t>& featureIndices, const std::vector<int32_t>& samples, const blitz::Array<double,2>& weights, int firstFeature, int lastFeature, blitz::Array<double,2>& lossSum) const;
 
       uint16_t m_maximumFeatureValue;
       int m_numberOfOutputs;
       SelectionStyle m_selectionType;
-
-      // pre-allocated arrays for faster access
-      mutable blitz::Array<double,2> _luts;
-      mutable blitz::Array<int32_t,1> _selectedIndices;
-      mutable blitz::Array<double,1> _gradientHistogram;
-      mutable blitz::Array<double,2> _lossSum;
-
+      int m_numberOfThreads;
+      double m_featureFraction;
+      double m_sampleFraction;
+      uint32_t m_seed;
+      OutputStyle m_outputType;
+      // the round counter, from which the seed of each round is derived
+      uint64_t m_round;
   };
 
 } } } // namespaces
@@ -0,0 +1,35 @@
+#ifndef BOB_LEARN_BOOSTING_LOGIT_LOSS_H
+#define BOB_LEARN_BOOSTING_LOGIT_LOSS_H
+
+#include <math.h>
+#include <bob.learn.boosting/ElementwiseLoss.h>
+
+namespace bob { namespace learn { namespace boosting {
+
+  /**
+   * The logit loss log(1+exp(-t*s)) for classification tasks.
+   */
+  class LogitLoss : public ElementwiseLoss<LogitLoss>{
+    public:
+      LogitLoss(){}
+      virtual ~LogitLoss(){}
+
+      static double value(const double target, const double score){
+        return log(1. + exp(-(target * score)));
+      }
+
+      static double derivative(const double target, const double score){
+        const double e = exp(-(target * score));
+        return -target * e * (1. / (1. + e));
+      }
+
+      static double valueAndDerivative(const double target, const double score, double& gradient){
+        const double e = exp(-(target * score));
+        gradient = -target * e * (1. / (1. + e));
+        return log(1. + e);
+      }
+  };
+
+} } } // namespaces
+
+#endif // BOB_LEARN_BOOSTING_LOGIT_LOSS_H
@@ -7,20 +7,23 @@ namespace bob { namespace learn { namespace boosting {
 
   class LossFunction{
     public:
-      void lossSum(const blitz::Array<double,1>& alpha, const blitz::Array<double,2>& targets, const blitz::Array<double,2>& previous_scores, const blitz::Array<double,2>& current_scores, blitz::Array<double,1>& loss_sum) const;
-      void gradientSum(const blitz::Array<double,1>& alpha, const blitz::Array<double,2>& targets, const blitz::Array<double,2>& previous_scores, const blitz::Array<double,2>& current_scores, blitz::Array<double,1>& gradient_sum) const;
+      virtual ~LossFunction(){}
+
+      // The default implementations compute the combined scores and call loss() or lossGradient(); derived classes might implement faster versions
+      virtual void lossSum(const blitz::Array<double,1>& alpha, const blitz::Array<double,2>& targets, const blitz::Array<double,2>& previous_scores, const blitz::Array<double,2>& current_scores, blitz::Array<double,1>& loss_sum) const;
+      virtual void gradientSum(const blitz::Array<double,1>& alpha, const blitz::Array<double,2>& targets, const blitz::Array<double,2>& previous_scores, const blitz::Array<double,2>& current_scores, blitz::Array<double,1>& gradient_sum) const;
+      // Computes the total sum of the loss and the sum of the gradient at once, e.g., for L-BFGS; returns the loss sum
+      virtual double lossAndGradientSum(const blitz::Array<double,1>& alpha, const blitz::Array<double,2>& targets, const blitz::Array<double,2>& previous_scores, const blitz::Array<double,2>& current_scores, blitz::Array<double,1>& gradient_sum) const;
 
       virtual void loss(const blitz::Array<double, 2>& targets, const blitz::Array<double, 2>& scores, blitz::Array<double, 2>& errors) const = 0;
       virtual void lossGradient(const blitz::Array<double, 2>& targets, const blitz::Array<double, 2>& scores, blitz::Array<double, 2>& gradient) const = 0;
 
+      // The number of loss values per sample, given the number of outputs; by default, one loss value is computed for all outputs (regression)
+      virtual int numberOfLossOutputs(const int numberOfOutputs) const {return 1;}
+
     protected:
       // This class is not instanceable
       LossFunction(){}
-
-    private:
-      mutable blitz::Array<double,2> scores;
-      mutable blitz::Array<double,2> errors;
-      mutable blitz::Array<double,2> gradients;
   };
 
 } } } // namespaces
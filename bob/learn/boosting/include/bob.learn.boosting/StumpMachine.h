@@ -21,15 +21,21 @@ namespace bob { namespace learn { namespace boosting {
 
       // forwarding of a single feature
       virtual double forward(const blitz::Array<uint16_t, 1>& features) const;
+      virtual double forward(const blitz::Array<uint8_t, 1>& features) const;
       virtual double forward(const blitz::Array<double, 1>& features) const;
+      virtual double forward(const blitz::Array<float, 1>& features) const;
 
       // forwarding of multiple features
-      virtual void forward(const blitz::Array<double, 2>& features, blitz::Array<double,1> predictions) const;
       virtual void forward(const blitz::Array<uint16_t, 2>& features, blitz::Array<double,1> predictions) const;
+      virtual void forward(const blitz::Array<uint8_t, 2>& features, blitz::Array<double,1> predictions) const;
+      virtual void forward(const blitz::Array<double, 2>& features, blitz::Array<double,1> predictions) const;
+      virtual void forward(const blitz::Array<float, 2>& features, blitz::Array<double,1> predictions) const;
 
       // forwarding of multiple features
-      virtual void forward(const blitz::Array<double, 2>& features, blitz::Array<double,2> predictions) const;
       virtual void forward(const blitz::Array<uint16_t, 2>& features, blitz::Array<double,2> predictions) const;
+      virtual void forward(const blitz::Array<uint8_t, 2>& features, blitz::Array<double,2> predictions) const;
+      virtual void forward(const blitz::Array<double, 2>& features, blitz::Array<double,2> predictions) const;
+      virtual void forward(const blitz::Array<float, 2>& features, blitz::Array<double,2> predictions) const;
 
       // the index used by this machine
       virtual blitz::Array<int32_t,1> getIndices() const;
@@ -38,6 +44,8 @@ namespace bob { namespace learn { namespace boosting {
       double getThreshold() const {return m_threshold;}
       // the polarity (i.e., does a lower or higher value correspond to the positive class?)
       double getPolarity() const {return m_polarity;}
+      // the index into the feature vector
+      int32_t getIndex() const {return m_index;}
 
       // Machine IO
       virtual void save(bob::io::base::HDF5File& file) const;
@@ -47,6 +55,12 @@ namespace bob { namespace learn { namespace boosting {
       // helper function to compute the prediction for a single feature value
       double _predict(double f) const;
 
+      // the implementations of the forward functions, which are specialized for all supported feature types
+      template <typename T>
+        void _forward(const blitz::Array<T, 2>& features, blitz::Array<double,1> predictions) const;
+      template <typename T>
+        void _forward(const blitz::Array<T, 2>& features, blitz::Array<double,2> predictions) const;
+
       // the data used by this class:
       double m_threshold;
       double m_polarity;
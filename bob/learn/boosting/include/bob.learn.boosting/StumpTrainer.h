@@ -0,0 +1,32 @@
+#ifndef BOB_LEARN_BOOSTING_STUMP_TRAINER_H
+#define BOB_LEARN_BOOSTING_STUMP_TRAINER_H
+
+#include <bob.learn.boosting/StumpMachine.h>
+
+
+namespace bob { namespace learn { namespace boosting {
+
+  /**
+   * This trainer computes decision stumps (see StumpMachine) on *continuous* or *discrete* features.
+   *
+   * For each feature, the threshold and the polarity that maximize the gain (i.e., the dot product of the stump outputs and the negative loss gradient) are computed.
+   * The results are identical to the ones of the Python StumpTrainer with default parameters, which uses a stable sort and a sequential cumulative sum as well.
+   * They are not guaranteed to be identical to models of older versions of the Python StumpTrainer, whose summation order could select a different one of two (almost) equal gains.
+   */
+  class StumpTrainer{
+    public:
+      // Create a stump trainer
+      StumpTrainer();
+
+      boost::shared_ptr<StumpMachine> train(const blitz::Array<double, 2>& training_features, const blitz::Array<double,1>& loss_gradient) const;
+      boost::shared_ptr<StumpMachine> train(const blitz::Array<uint16_t, 2>& training_features, const blitz::Array<double,1>& loss_gradient) const;
+      boost::shared_ptr<StumpMachine> train(const blitz::Array<uint8_t, 2>& training_features, const blitz::Array<double,1>& loss_gradient) const;
+
+    private:
+      template <typename T>
+        boost::shared_ptr<StumpMachine> _train(const blitz::Array<T, 2>& training_features, const blitz::Array<double,1>& loss_gradient) const;
+  };
+
+} } } // namespaces
+
+#endif // BOB_LEARN_BOOSTING_STUMP_TRAINER_H
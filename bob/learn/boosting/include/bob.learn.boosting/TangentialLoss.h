@@ -0,0 +1,39 @@
+#ifndef BOB_LEARN_BOOSTING_TANGENTIAL_LOSS_H
+#define BOB_LEARN_BOOSTING_TANGENTIAL_LOSS_H
+
+#include <math.h>
+#include <bob.learn.boosting/ElementwiseLoss.h>
+
+namespace bob { namespace learn { namespace boosting {
+
+  /**
+   * The tangential loss (2*atan(t*s)-1)^2 for classification tasks.
+   *
+   * The derivative is computed exactly as in the python implementation bob.learn.boosting.TangentialLoss.
+   */
+  class TangentialLoss : public ElementwiseLoss<TangentialLoss>{
+    public:
+      TangentialLoss(){}
+      virtual ~TangentialLoss(){}
+
+      static double value(const double target, const double score){
+        const double d = 2. * atan(target * score) - 1.;
+        return d * d;
+      }
+
+      static double derivative(const double target, const double score){
+        const double m = target * score;
+        return 4. * (2. * atan(m) - 1.) / (1. + m * m);
+      }
+
+      static double valueAndDerivative(const double target, const double score, double& gradient){
+        const double m = target * score;
+        const double d = 2. * atan(m) - 1.;
+        gradient = 4. * d / (1. + m * m);
+        return d * d;
+      }
+  };
+
+} } } // namespaces
+
+#endif // BOB_LEARN_BOOSTING_TANGENTIAL_LOSS_H
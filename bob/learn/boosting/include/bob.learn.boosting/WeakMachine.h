@@ -13,19 +13,27 @@ namespace bob { namespace learn { namespace boosting {
     public:
       // uni-variate forwarding of a single feature
       virtual double forward(const blitz::Array<uint16_t, 1>& features) const {throw std::runtime_error("This function is not implemented for the given data type in the current class.");}
+      virtual double forward(const blitz::Array<uint8_t, 1>& features) const {throw std::runtime_error("This function is not implemented for the given data type in the current class.");}
       virtual double forward(const blitz::Array<double, 1>& features) const {throw std::runtime_error("This function is not implemented for the given data type in the current class.");}
+      virtual double forward(const blitz::Array<float, 1>& features) const {throw std::runtime_error("This function is not implemented for the given data type in the current class.");}
 
       // multi-variate forwarding of a single feature
       virtual void forward(const blitz::Array<uint16_t, 1>& features, blitz::Array<double,1> predictions) const {throw std::runtime_error("This function is not implemented for the given data type in the current class.");}
+      virtual void forward(const blitz::Array<uint8_t, 1>& features, blitz::Array<double,1> predictions) const {throw std::runtime_error("This function is not implemented for the given data type in the current class.");}
       virtual void forward(const blitz::Array<double, 1>& features, blitz::Array<double,1> predictions) const {throw std::runtime_error("This function is not implemented for the given data type in the current class.");}
+      virtual void forward(const blitz::Array<float, 1>& features, blitz::Array<double,1> predictions) const {throw std::runtime_error("This function is not implemented for the given data type in the current class.");}
 
       // uni-variate forwarding of a set of features
       virtual void forward(const blitz::Array<uint16_t, 2>& features, blitz::Array<double,1> predictions) const {throw std::runtime_error("This function is not implemented for the given data type in the current class.");}
+      virtual void forward(const blitz::Array<uint8_t, 2>& features, blitz::Array<double,1> predictions) const {throw std::runtime_error("This function is not implemented for the given data type in the current class.");}
       virtual void forward(const blitz::Array<double, 2>& features, blitz::Array<double,1> predictions) const {throw std::runtime_error("This function is not implemented for the given data type in the current class.");}
+      virtual void forward(const blitz::Array<float, 2>& features, blitz::Array<double,1> predictions) const {throw std::runtime_error("This function is not implemented for the given data type in the current class.");}
 
       // multi-variate forwarding of a set of features
       virtual void forward(const blitz::Array<uint16_t, 2>& features, blitz::Array<double,2> predictions) const {throw std::runtime_error("This function is not implemented for the given data type in the current class.");}
+      virtual void forward(const blitz::Array<uint8_t, 2>& features, blitz::Array<double,2> predictions) const {throw std::runtime_error("This function is not implemented for the given data type in the current class.");}
       virtual void forward(const blitz::Array<double, 2>& features, blitz::Array<double,2> predictions) const {throw std::runtime_error("This function is not implemented for the given data type in the current class.");}
+      virtual void forward(const blitz::Array<float, 2>& features, blitz::Array<double,2> predictions) const {throw std::runtime_error("This function is not implemented for the given data type in the current class.");}
 
       // the feature indices required by this weak machine
       virtual blitz::Array<int32_t,1> getIndices() const = 0;
@@ -0,0 +1,77 @@
+#include "main.h"
+
+static auto logitLoss_doc = bob::extension::ClassDoc(
+  "LogitLoss",
+  "Computes the logit loss and its derivative.",
+  "The logit loss between target :math:`t` and score :math:`s` is used in classification tasks, e.g., in LogitBoost:\n\n"
+  ".. math:: l(t, s) = \\log\\left(1 + e^{-ts}\\right)\n\n"
+  "and its derivative is:\n\n"
+  ".. math:: \\frac{\\partial l}{\\partial s}(t, s) = \\frac{-t e^{-ts}}{1 + e^{-ts}}\n\n"
+  "The loss and the derivative are computed independently for each sample and each output, i.e., :py:meth:`loss` returns one value per sample and output.\n\n"
+  "This class is a C++ implementation of the python class :py:class:`bob.learn.boosting.LogitLoss`, which computes the same values. "
+  "The :py:meth:`loss_sum` and :py:meth:`loss_gradient_sum` functions compute the sums in a single pass over the data, without creating temporary arrays, and release the global interpreter lock."
+)
+.add_constructor(
+  bob::extension::FunctionDoc(
+    "__init__",
+    "Initializes a LogitLoss object.",
+    "The constructor comes with no parameters.",
+    true
+  ).add_prototype("", "")
+);
+
+
+static int logitLoss_init(
+  LogitLossObject* self,
+  PyObject* args,
+  PyObject* kwargs
+)
+{
+  // get list of arguments
+  char* kwlist[] = {NULL};
+  if (!PyArg_ParseTupleAndKeywords(args, kwargs, "", kwlist)) return -1;
+
+  self->base.reset(new bob::learn::boosting::LogitLoss());
+  self->parent.base = self->base;
+  return 0;
+}
+
+static void logitLoss_exit(
+  LogitLossObject* self
+)
+{
+  self->base.reset();
+  self->parent.base.reset();
+  Py_TYPE(self)->tp_free(reinterpret_cast<PyObject*>(self));
+}
+
+
+// Define LogitLoss Type object; will be filled later
+PyTypeObject LogitLossType = {
+  PyVarObject_HEAD_INIT(0,0)
+  0
+};
+
+bool init_LogitLoss(PyObject* module)
+{
+
+  // initialize the LogitLossType struct
+  LogitLossType.tp_name = logitLoss_doc.name();
+  LogitLossType.tp_basicsize = sizeof(LogitLossObject);
+  LogitLossType.tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE;
+  LogitLossType.tp_doc = logitLoss_doc.doc();
+  LogitLossType.tp_base = &LossFunctionType;
+
+  // set the functions
+  LogitLossType.tp_new = PyType_GenericNew;
+  LogitLossType.tp_init = reinterpret_cast<initproc>(logitLoss_init);
+  LogitLossType.tp_dealloc = reinterpret_cast<destructor>(logitLoss_exit);
+
+  // check that everyting is fine
+  if (PyType_Ready(&LogitLossType) < 0)
+    return false;
+
+  // add the type to the module
+  Py_INCREF(&LogitLossType);
+  return PyModule_AddObject(module, logitLoss_doc.name(), (PyObject*)&LogitLossType) >= 0;
+}
@@ -4,15 +4,14 @@
 static auto lossFunction_doc = bob::extension::ClassDoc(
   "LossFunction",
   "Implements default Loss function behaviour.",
-  "This pure virtual base class implements two functions that are required by all derived classes."
+  "This pure virtual base class implements the functions that are required by all derived classes."
   "This class cannot be instantiated.\n\n"
   "Objects of this class are designed to be used in combination with the ``scipy.optimize.fmin_l_bfgs_b`` function."
-  "Use the :py:func:`loss_sum` function as the ``func`` flag, and :py:func:`loss_gradient_sum` as ``fprime``, e.g.:\n\n"
+  "Use the :py:func:`loss_and_gradient_sum` function as the ``func`` flag, which computes the loss and its gradient at once, e.g.:\n\n"
   ".. code-block:: py\n\n"
   "   loss = bob.boosting.loss.JesorskyLoss()\n"
   "   res = scipy.optimize.fmin_l_bfgs_b(\n"
-  "       func   = loss.loss_sum,\n"
-  "       fprime = loss.loss_gradient_sum,\n"
+  "       func   = loss.loss_and_gradient_sum,\n"
   "       args   = (targets, current_strong_scores, current_weak_scores),\n"
   "       ...\n"
   "    )\n\n"
@@ -21,6 +20,15 @@ static auto lossFunction_doc = bob::extension::ClassDoc(
 );
 
 
+// checks that the arrays given to loss_sum and loss_gradient_sum have consistent shapes
+static bool checkShapes(const blitz::Array<double,1>& alpha, const blitz::Array<double,2>& targets, const blitz::Array<double,2>& prev_scores, const blitz::Array<double,2>& curr_scores){
+  if (alpha.extent(0) != targets.extent(1) || prev_scores.extent(0) != targets.extent(0) || prev_scores.extent(1) != targets.extent(1) || curr_scores.extent(0) != targets.extent(0) || curr_scores.extent(1) != targets.extent(1)){
+    PyErr_Format(PyExc_RuntimeError, "The shapes of alpha (%d), targets (%d, %d), previous_scores (%d, %d) and current_scores (%d, %d) are inconsistent", alpha.extent(0), targets.extent(0), targets.extent(1), prev_scores.extent(0), prev_scores.extent(1), curr_scores.extent(0), curr_scores.extent(1));
+    return false;
+  }
+  return true;
+}
+
 static auto lossFunction_lossSum_doc = bob::extension::FunctionDoc(
   "loss_sum",
   "Computes the sum of the losses computed between the targets and the scores.",
@@ -33,7 +41,7 @@ static auto lossFunction_lossSum_doc = bob::extension::FunctionDoc(
 .add_parameter("targets", "float <#samples, #outputs>", "The target values that should be achieved during boosting")
 .add_parameter("previous_scores", "float <#samples, #outputs>", "The score values that are achieved by the boosted machine after the previous boosting iteration")
 .add_parameter("current_scores", "float <#samples, #outputs>", "The score values that are achieved with the weak machine added in this boosting round")
-.add_return("loss_sum", "float <1>", "The sum over the loss values for the newly combined strong classifier")
+.add_return("loss_sum", "float <#outputs> or float <1>", "The sum over the loss values for the newly combined strong classifier; for regression losses such as the :py:class:`JesorskyLoss`, a single value is returned")
 ;
 
 static PyObject* lossFunction_lossSum(
@@ -67,20 +75,23 @@ static PyObject* lossFunction_lossSum(
   const auto prev_scores = PyBlitzArrayCxx_AsBlitz<double,2>(p_prev_scores, "previous_scores");
   const auto curr_scores = PyBlitzArrayCxx_AsBlitz<double,2>(p_curr_scores, "current_scores");
 
-  if (!alpha || !targets || !prev_scores || !curr_scores){
+  if (!alpha || !targets || !prev_scores || !curr_scores || !checkShapes(*alpha, *targets, *prev_scores, *curr_scores)){
     return NULL;
   }
 
-  blitz::Array<double,1> loss_sum(1);
+  blitz::Array<double,1> loss_sum(self->base->numberOfLossOutputs(targets->extent(1)));
 
   // actually call the function
-  self->base->lossSum(
-    *alpha,
-    *targets,
-    *prev_scores,
-    *curr_scores,
-    loss_sum
-  );
+  {
+    GILReleaser releaser;
+    self->base->lossSum(
+      *alpha,
+      *targets,
+      *prev_scores,
+      *curr_scores,
+      loss_sum
+    );
+  }
 
   return PyBlitzArrayCxx_AsNumpy(loss_sum);
 }
@@ -132,26 +143,235 @@ static PyObject* lossFunction_gradientSum(
   const auto prev_scores = PyBlitzArrayCxx_AsBlitz<double,2>(p_prev_scores, "previous_scores");
   const auto curr_scores = PyBlitzArrayCxx_AsBlitz<double,2>(p_curr_scores, "current_scores");
 
-  if (!alpha || !targets || !prev_scores || !curr_scores){
+  if (!alpha || !targets || !prev_scores || !curr_scores || !checkShapes(*alpha, *targets, *prev_scores, *curr_scores)){
     return NULL;
   }
 
   blitz::Array<double,1> gradient_sum(targets->extent(1));
 
   // actually call the function
-  self->base->gradientSum(
-    *alpha,
-    *targets,
-    *prev_scores,
-    *curr_scores,
-    gradient_sum
-  );
+  {
+    GILReleaser releaser;
+    self->base->gradientSum(
+      *alpha,
+      *targets,
+      *prev_scores,
+      *curr_scores,
+      gradient_sum
+    );
+  }
 
   return PyBlitzArrayCxx_AsNumpy(gradient_sum);
 }
 
+static auto lossFunction_lossAndGradientSum_doc = bob::extension::FunctionDoc(
+  "loss_and_gradient_sum",
+  "Computes the sum of the losses and the sum of the loss gradients at once.",
+  "This function is designed to be used as the ``func`` of the L-BFGS method, without ``fprime``."
+  "The combined scores are computed only once, and the loss and its gradient are computed in the same pass over the data.",
+  true
+)
+.add_prototype("alpha, targets, previous_scores, current_scores", "loss_sum, gradient_sum")
+.add_parameter("alpha", "float <#outputs>", "The weight for the current_scores that will be optimized in L-BFGS")
+.add_parameter("targets", "float <#samples, #outputs>", "The target values that should be achieved during boosting")
+.add_parameter("previous_scores", "float <#samples, #outputs>", "The score values that are achieved by the boosted machine after the previous boosting iteration")
+.add_parameter("current_scores", "float <#samples, #outputs>", "The score values that are achieved with the weak machine added in this boosting round")
+.add_return("loss_sum", "float", "The total sum over the loss values for the newly combined strong classifier")
+.add_return("gradient_sum", "float <#outputs>", "The sum over the loss gradients for the newly combined strong classifier")
+;
+
+static PyObject* lossFunction_lossAndGradientSum(
+  LossFunctionObject* self,
+  PyObject* args,
+  PyObject* kwargs
+)
+{
+  // get list of arguments
+  char* kwlist[] = {const_cast<char*>("alpha"), const_cast<char*>("targets"), const_cast<char*>("previous_scores"), const_cast<char*>("current_scores"), NULL};
+
+  PyBlitzArrayObject* p_alpha = 0,* p_targets = 0,* p_prev_scores = 0,* p_curr_scores = 0;
+
+  if (!PyArg_ParseTupleAndKeywords(
+          args, kwargs,
+          "O&O&O&O&", kwlist,
+          &PyBlitzArray_Converter, &p_alpha,
+          &PyBlitzArray_Converter, &p_targets,
+          &PyBlitzArray_Converter, &p_prev_scores,
+          &PyBlitzArray_Converter, &p_curr_scores)
+  ){
+    lossFunction_lossAndGradientSum_doc.print_usage();
+    return NULL;
+  }
+
+  auto _1 = make_safe(p_alpha), _2 = make_safe(p_targets), _3 = make_safe(p_prev_scores), _4 = make_safe(p_curr_scores);
+
+  // prepare C++ data
+  const auto alpha = PyBlitzArrayCxx_AsBlitz<double,1>(p_alpha, "alpha");
+  const auto targets = PyBlitzArrayCxx_AsBlitz<double,2>(p_targets, "targets");
+  const auto prev_scores = PyBlitzArrayCxx_AsBlitz<double,2>(p_prev_scores, "previous_scores");
+  const auto curr_scores = PyBlitzArrayCxx_AsBlitz<double,2>(p_curr_scores, "current_scores");
+
+  if (!alpha || !targets || !prev_scores || !curr_scores || !checkShapes(*alpha, *targets, *prev_scores, *curr_scores)){
+    return NULL;
+  }
+
+  blitz::Array<double,1> gradient_sum(targets->extent(1));
+  double loss_sum;
+
+  // actually call the function
+  {
+    GILReleaser releaser;
+    loss_sum = self->base->lossAndGradientSum(
+      *alpha,
+      *targets,
+      *prev_scores,
+      *curr_scores,
+      gradient_sum
+    );
+  }
+
+  return Py_BuildValue("dN", loss_sum, PyBlitzArrayCxx_AsNumpy(gradient_sum));
+}
+
+static auto lossFunction_loss_doc = bob::extension::FunctionDoc(
+  "loss",
+  "Computes the loss between the targets and the scores.",
+  "This function computes the loss between all given targets and scores, using the loss formula of the derived class",
+  true
+)
+.add_prototype("targets, scores", "errors")
+.add_parameter("targets", "float <#samples, #outputs>", "The target values that should be achieved during boosting")
+.add_parameter("scores", "float <#samples, #outputs>", "The score values that are currently achieved")
+.add_return("errors", "float <#samples, #outputs> or float <#samples, 1>", "The resulting loss values for each target; regression losses compute a single value per sample")
+;
+
+static PyObject* lossFunction_loss(
+  LossFunctionObject* self,
+  PyObject* args,
+  PyObject* kwargs
+)
+{
+  // get list of arguments
+  char* kwlist[] = {const_cast<char*>("targets"), const_cast<char*>("scores"), NULL};
+
+  PyBlitzArrayObject* p_targets = 0,* p_scores = 0;
+
+  if (!PyArg_ParseTupleAndKeywords(
+          args, kwargs,
+          "O&O&", kwlist,
+          &PyBlitzArray_Converter, &p_targets,
+          &PyBlitzArray_Converter, &p_scores)
+  ){
+    lossFunction_loss_doc.print_usage();
+    return NULL;
+  }
+
+  auto _1 = make_safe(p_targets), _2 = make_safe(p_scores);
+
+  // prepare C++ data
+  const auto targets = PyBlitzArrayCxx_AsBlitz<double,2>(p_targets, "targets");
+  const auto scores = PyBlitzArrayCxx_AsBlitz<double,2>(p_scores, "scores");
+
+  if (!targets || !scores){
+    return NULL;
+  }
+  if (targets->extent(0) != scores->extent(0) || targets->extent(1) != scores->extent(1)){
+    PyErr_Format(PyExc_RuntimeError, "The shapes of targets (%d, %d) and scores (%d, %d) differ", targets->extent(0), targets->extent(1), scores->extent(0), scores->extent(1));
+    return NULL;
+  }
+
+  blitz::Array<double,2> errors(targets->extent(0), self->base->numberOfLossOutputs(targets->extent(1)));
+
+  // actually call the function
+  {
+    GILReleaser releaser;
+    self->base->loss(
+      *targets,
+      *scores,
+      errors
+    );
+  }
+
+  return PyBlitzArrayCxx_AsNumpy(errors);
+}
+
+
+static auto lossFunction_lossGradient_doc = bob::extension::FunctionDoc(
+  "loss_gradient",
+  "Computes the gradient of the loss between the targets and the scores.",
+  "This function computes the derivative of the loss between all given targets and scores, using the loss formula of the derived class",
+  true
+)
+.add_prototype("targets, scores", "gradient")
+.add_parameter("targets", "float <#samples, #outputs>", "The target values that should be achieved during boosting")
+.add_parameter("scores", "float <#samples, #outputs>", "The score values that are currently achieved")
+.add_return("gradient", "float <#samples, #outputs>", "The derivative of the loss for each sample and each output")
+;
+
+static PyObject* lossFunction_lossGradient(
+  LossFunctionObject* self,
+  PyObject* args,
+  PyObject* kwargs
+)
+{
+  // get list of arguments
+  char* kwlist[] = {const_cast<char*>("targets"), const_cast<char*>("scores"), NULL};
+
+  PyBlitzArrayObject* p_targets = 0,* p_scores = 0;
+
+  if (!PyArg_ParseTupleAndKeywords(
+          args, kwargs,
+          "O&O&", kwlist,
+          &PyBlitzArray_Converter, &p_targets,
+          &PyBlitzArray_Converter, &p_scores)
+  ){
+    lossFunction_lossGradient_doc.print_usage();
+    return NULL;
+  }
+
+  auto _1 = make_safe(p_targets), _2 = make_safe(p_scores);
+
+  // prepare C++ data
+  const auto targets = PyBlitzArrayCxx_AsBlitz<double,2>(p_targets, "targets");
+  const auto scores = PyBlitzArrayCxx_AsBlitz<double,2>(p_scores, "scores");
+
+  if (!targets || !scores){
+    return NULL;
+  }
+  if (targets->extent(0) != scores->extent(0) || targets->extent(1) != scores->extent(1)){
+    PyErr_Format(PyExc_RuntimeError, "The shapes of targets (%d, %d) and scores (%d, %d) differ", targets->extent(0), targets->extent(1), scores->extent(0), scores->extent(1));
+    return NULL;
+  }
+
+  blitz::Array<double,2> gradient(targets->shape());
+
+  // actually call the function
+  {
+    GILReleaser releaser;
+    self->base->lossGradient(
+      *targets,
+      *scores,
+      gradient
+    );
+  }
+
+  return PyBlitzArrayCxx_AsNumpy(gradient);
+}
+
 // bind the class
 static PyMethodDef lossFunction_Methods[] = {
+  {
+    lossFunction_loss_doc.name(),
+    (PyCFunction)lossFunction_loss,
+    METH_VARARGS | METH_KEYWORDS,
+    lossFunction_loss_doc.doc(),
+  },
+  {
+    lossFunction_lossGradient_doc.name(),
+    (PyCFunction)lossFunction_lossGradient,
+    METH_VARARGS | METH_KEYWORDS,
+    lossFunction_lossGradient_doc.doc(),
+  },
   {
     lossFunction_lossSum_doc.name(),
     (PyCFunction)lossFunction_lossSum,
@@ -164,6 +384,12 @@ static PyMethodDef lossFunction_Methods[] = {
     METH_VARARGS | METH_KEYWORDS,
     lossFunction_gradientSum_doc.doc(),
   },
+  {
+    lossFunction_lossAndGradientSum_doc.name(),
+    (PyCFunction)lossFunction_lossAndGradientSum,
+    METH_VARARGS | METH_KEYWORDS,
+    lossFunction_lossAndGradientSum_doc.doc(),
+  },
   {NULL}
 };
 
@@ -155,12 +155,27 @@ static PyObject* lutMachine_lut(
   return PyBlitzArrayCxx_AsConstNumpy(retval);
 }
 
+static auto lutMachine_lut_indices_doc = bob::extension::VariableDoc(
+  "lut_indices",
+  "int32 <#outputs>",
+  "The feature index that is used for each output, in contrast to :py:meth:`feature_indices`, which returns the sorted unique indices"
+);
+
+static PyObject* lutMachine_lut_indices(
+  LUTMachineObject* self,
+  void*
+)
+{
+  auto retval = self->base->getLutIndices();
+  return PyBlitzArrayCxx_AsConstNumpy(retval);
+}
+
 
 static auto lutMachine_forward_doc = bob::extension::FunctionDoc(
   "forward",
   "Returns the prediction for the given feature vector(s)",
   ".. note:: The ``__call__`` function is an alias for this function.\n\n"
-  "This function can be called in four different ways:\n\n"
+  "This function can be called in four different ways, where the features can be of type uint16 or uint8:\n\n"
   "1. ``(uint16 <#inputs>)`` will compute and return the uni-variate prediction for a single feature vector.\n"
   "2. ``(uint16 <#samples,#inputs>, float <#samples>)`` will compute the uni-variate prediction for several feature vectors.\n"
   "3. ``(uint16 <#inputs>, float <#outputs>)`` will compute the multi-variate prediction for a single feature vector.\n"
@@ -169,14 +184,21 @@ static auto lutMachine_forward_doc = bob::extension::FunctionDoc(
 )
 .add_prototype("features", "prediction")
 .add_prototype("features, predictions")
-.add_parameter("features", "uint16 <#inputs> or uint16 <#samples, #inputs>", "The feature vector(s) the prediction should be computed for.")
+.add_parameter("features", "uint16 or uint8 <#inputs> or <#samples, #inputs>", "The feature vector(s) the prediction should be computed for.")
 .add_parameter("predictions", "float <#samples> or float <#outputs> or float <#samples, #outputs>", "The predicted values -- see below.")
 .add_return("prediction", "float", "The predicted value -- in case a single feature is provided and a single output is required")
 ;
 
-template <int N1, int N2> void _forward(LUTMachineObject* self, PyBlitzArrayObject* features, PyBlitzArrayObject* predictions){
-  const auto f = PyBlitzArrayCxx_AsBlitz<uint16_t,N1>(features);
+template <typename T>
+static double _forward(LUTMachineObject* self, PyBlitzArrayObject* features){
+  const auto f = PyBlitzArrayCxx_AsBlitz<T,1>(features);
+  return self->base->forward(*f);
+}
+
+template <typename T, int N1, int N2> void _forward(LUTMachineObject* self, PyBlitzArrayObject* features, PyBlitzArrayObject* predictions){
+  const auto f = PyBlitzArrayCxx_AsBlitz<T,N1>(features);
   auto p = PyBlitzArrayCxx_AsBlitz<double,N2>(predictions);
+  GILReleaser releaser;
   self->base->forward(*f, *p);
 }
 
@@ -194,7 +216,7 @@ static PyObject* lutMachine_forward(
   if (!PyArg_ParseTupleAndKeywords(
           args, kwargs,
           "O&|O&", kwlist,
-          &PyBlitzArray_Converter, &p_features,
+          &featuresConverter, &p_features,
           &PyBlitzArray_Converter, &p_predictions)
   )
     return NULL;
@@ -202,28 +224,29 @@ static PyObject* lutMachine_forward(
   auto _1 = make_safe(p_features), _2 = make_xsafe(p_predictions);
 
   try{
+    if (p_features->type_num != NPY_UINT16 && p_features->type_num != NPY_UINT8){
+      lutMachine_forward_doc.print_usage();
+      PyErr_SetString(PyExc_TypeError, "The parameter 'features' only supports 1D or 2D arrays of type uint16 or uint8");
+      return NULL;
+    }
+    const bool uint8 = p_features->type_num == NPY_UINT8;
+
     if (!p_predictions){
       // uni-variate, single feature
-      const auto features = PyBlitzArrayCxx_AsBlitz<uint16_t,1>(p_features, kwlist[0]);
-      if (!features){
+      if (p_features->ndim != 1){
         lutMachine_forward_doc.print_usage();
-        PyErr_SetString(PyExc_TypeError, "When a single parameter is specified, only 1D arrays of type uint16 are supported.");
+        PyErr_SetString(PyExc_TypeError, "When a single parameter is specified, only 1D arrays of type uint16 or uint8 are supported.");
         return NULL;
       }
-      return Py_BuildValue("d", self->base->forward(*features));
-    }
-
-    if (p_features->type_num != NPY_UINT16){
-      PyErr_SetString(PyExc_TypeError, "The parameter 'features' only supports 1D or 2D arrays of type uint16");
-      return NULL;
+      return Py_BuildValue("d", uint8 ? _forward<uint8_t>(self, p_features) : _forward<uint16_t>(self, p_features));
     }
 
     if (p_features->ndim == 2 && p_predictions->ndim == 1)
-      _forward<2,1>(self, p_features, p_predictions);
+      uint8 ? _forward<uint8_t,2,1>(self, p_features, p_predictions) : _forward<uint16_t,2,1>(self, p_features, p_predictions);
     else if (p_features->ndim == 1 && p_predictions->ndim == 1)
-      _forward<1,1>(self, p_features, p_predictions);
+      uint8 ? _forward<uint8_t,1,1>(self, p_features, p_predictions) : _forward<uint16_t,1,1>(self, p_features, p_predictions);
     else if (p_features->ndim == 2 && p_predictions->ndim == 2)
-      _forward<2,2>(self, p_features, p_predictions);
+      uint8 ? _forward<uint8_t,2,2>(self, p_features, p_predictions) : _forward<uint16_t,2,2>(self, p_features, p_predictions);
     else{
       lutMachine_forward_doc.print_usage();
       PyErr_Format(PyExc_TypeError, "The number of dimensions of %s (%d) and %s (%d) are not supported", kwlist[0], (int)p_features->ndim, kwlist[1], (int)p_predictions->ndim);
@@ -335,6 +358,31 @@ static PyObject* lutMachine_save(
   Py_RETURN_NONE;
 }
 
+static auto lutMachine_reduce_doc = bob::extension::FunctionDoc(
+  "__reduce__",
+  "Returns the constructor and its arguments for pickling",
+  "The look-up-tables and feature indices are passed to the constructor; with pickle protocol 5, the look-up-tables can be transferred as out-of-band buffers.",
+  true
+)
+.add_prototype("", "constructor, arguments")
+;
+
+static PyObject* lutMachine_reduce(
+  LUTMachineObject* self,
+  PyObject*
+)
+{
+  auto lut = self->base->getLut();
+  auto indices = self->base->getLutIndices();
+  PyObject* p_lut = PyBlitzArrayCxx_AsNumpy(lut);
+  if (!p_lut) return NULL;
+  auto _1 = make_safe(p_lut);
+  PyObject* p_indices = PyBlitzArrayCxx_AsNumpy(indices);
+  if (!p_indices) return NULL;
+  auto _2 = make_safe(p_indices);
+  return Py_BuildValue("(O(OO))", Py_TYPE(self), p_lut, p_indices);
+}
+
 // bind the class
 static PyGetSetDef lutMachine_Getters[] = {
   {
@@ -344,6 +392,13 @@ static PyGetSetDef lutMachine_Getters[] = {
     lutMachine_lut_doc.doc(),
     NULL
   },
+  {
+    lutMachine_lut_indices_doc.name(),
+    (getter)lutMachine_lut_indices,
+    NULL,
+    lutMachine_lut_indices_doc.doc(),
+    NULL
+  },
   {NULL}
 };
 
@@ -372,6 +427,12 @@ static PyMethodDef lutMachine_Methods[] = {
     METH_VARARGS | METH_KEYWORDS,
     lutMachine_save_doc.doc(),
   },
+  {
+    lutMachine_reduce_doc.name(),
+    (PyCFunction)lutMachine_reduce,
+    METH_NOARGS,
+    lutMachine_reduce_doc.doc(),
+  },
   {NULL}
 };
 
@@ -395,7 +456,9 @@ bool init_LUTMachine(PyObject* module)
 {
 
   // initialize the JesorskyLossType struct
-  LUTMachineType.tp_name = lutMachine_doc.name();
+  // the name includes the module, so that the machines can be pickled
+  static const std::string name = std::string(BOB_EXT_MODULE_PREFIX "." BOB_EXT_MODULE_NAME ".") + lutMachine_doc.name();
+  LUTMachineType.tp_name = name.c_str();
   LUTMachineType.tp_basicsize = sizeof(LUTMachineObject);
   LUTMachineType.tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE;
   LUTMachineType.tp_doc = lutMachine_doc.doc();
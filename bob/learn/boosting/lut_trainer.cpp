@@ -13,10 +13,15 @@ static auto lutTrainer_doc = bob::extension::ClassDoc(
     "",
     true
   )
-  .add_prototype("maximum_feature_value, [number_of_outputs, selection_style]", "")
+  .add_prototype("maximum_feature_value, [number_of_outputs, selection_style, number_of_threads, feature_fraction, sample_fraction, seed, output_style]", "")
   .add_parameter("maximum_feature_value", "int", "The number of entries in the Look-Up-Tables")
   .add_parameter("number_of_outputs", "int", "The dimensionality of the output vector; defaults to 1 for the uni-variate case")
   .add_parameter("selection_style", "str", "The way, features are selected; possible values: 'shared', 'independent'; only useful for the multi-variate case; defaults to 'independent'")
+  .add_parameter("number_of_threads", "int", "The number of threads that are used to scan the features during training; ``0`` uses one thread per CPU core; defaults to 1")
+  .add_parameter("feature_fraction", "float", "The fraction of features that are scanned in each round; the features are selected randomly in each round; defaults to 1")
+  .add_parameter("sample_fraction", "float", "The fraction of samples that are used to scan the features in each round; the samples are drawn with probabilities proportional to their absolute loss gradients, and the look-up-table of the selected feature is computed from all samples; defaults to 1")
+  .add_parameter("seed", "int", "The seed of the random number generator that selects the features and samples; defaults to 0")
+  .add_parameter("output_style", "str", "The entries of the Look-Up-Tables; possible values: 'discrete' (+1 or -1), 'real' (the gradient sums of the feature values, normalized to [-1,1], so that fewer weak machines are needed); defaults to 'discrete'")
 );
 
 
@@ -28,12 +33,16 @@ static int lutTrainer_init(
 )
 {
   try{
-    char*  kwlist[] = {c("maximum_feature_value"), c("number_of_outputs"), c("selection_style"), NULL};
+    char*  kwlist[] = {c("maximum_feature_value"), c("number_of_outputs"), c("selection_style"), c("number_of_threads"), c("feature_fraction"), c("sample_fraction"), c("seed"), c("output_style"), NULL};
     uint16_t max_feat = 0;
     int num_out = 1;
     const char* style = "independent";
+    int num_threads = 1;
+    double feature_fraction = 1., sample_fraction = 1.;
+    unsigned int seed = 0;
+    const char* output_style = "discrete";
     if (!PyArg_ParseTupleAndKeywords(args, kwargs,
-          "H|is", kwlist, &max_feat, &num_out, &style)
+          "H|isiddIs", kwlist, &max_feat, &num_out, &style, &num_threads, &feature_fraction, &sample_fraction, &seed, &output_style)
     ){
       lutTrainer_doc.print_usage();
       return -1;
@@ -48,7 +57,28 @@ static int lutTrainer_init(
       return -1;
     }
 
-    self->base.reset(new bob::learn::boosting::LUTTrainer(max_feat, num_out, s));
+    bob::learn::boosting::LUTTrainer::OutputStyle o;
+    if (output_style == std::string("discrete")) o = bob::learn::boosting::LUTTrainer::discrete;
+    else if (output_style == std::string("real")) o = bob::learn::boosting::LUTTrainer::real;
+    else {
+      lutTrainer_doc.print_usage();
+      PyErr_Format(PyExc_ValueError, "The 'output_style' parameter accepts only 'discrete' or 'real', but you used '%s'", output_style);
+      return -1;
+    }
+
+    if (num_threads < 0){
+      lutTrainer_doc.print_usage();
+      PyErr_Format(PyExc_ValueError, "The 'number_of_threads' parameter must not be negative, but you used %d", num_threads);
+      return -1;
+    }
+
+    if (!(feature_fraction > 0. && feature_fraction <= 1.) || !(sample_fraction > 0. && sample_fraction <= 1.)){
+      lutTrainer_doc.print_usage();
+      PyErr_Format(PyExc_ValueError, "The 'feature_fraction' and 'sample_fraction' parameters must be in range (0,1], but you used %g and %g", feature_fraction, sample_fraction);
+      return -1;
+    }
+
+    self->base.reset(new bob::learn::boosting::LUTTrainer(max_feat, num_out, s, num_threads, feature_fraction, sample_fraction, seed, o));
   } catch (std::exception& ex) {
     PyErr_SetString(PyExc_RuntimeError, ex.what());
     return -1;
@@ -119,6 +149,113 @@ static PyObject* lutTrainer_selection(
   return NULL;
 }
 
+static auto lutTrainer_output_doc = bob::extension::VariableDoc(
+  "output_style",
+  "str",
+  "The style of the entries of the Look-Up-Tables, either 'discrete' or 'real'"
+);
+
+static PyObject* lutTrainer_output(
+  LUTTrainerObject* self,
+  void*
+)
+{
+  switch (self->base->outputType()) {
+    case bob::learn::boosting::LUTTrainer::discrete: return Py_BuildValue("s", "discrete");
+    case bob::learn::boosting::LUTTrainer::real:     return Py_BuildValue("s", "real");
+  }
+
+  // impossible
+  return NULL;
+}
+
+static auto lutTrainer_threads_doc = bob::extension::VariableDoc(
+  "number_of_threads",
+  "int",
+  "The number of threads that are used to scan the features during training"
+);
+
+static PyObject* lutTrainer_threads(
+  LUTTrainerObject* self,
+  void*
+)
+{
+  return Py_BuildValue("i", self->base->numberOfThreads());
+}
+
+static auto lutTrainer_feature_fraction_doc = bob::extension::VariableDoc(
+  "feature_fraction",
+  "float",
+  "The fraction of features that are scanned in each round"
+);
+
+static PyObject* lutTrainer_feature_fraction(
+  LUTTrainerObject* self,
+  void*
+)
+{
+  return Py_BuildValue("d", self->base->featureFraction());
+}
+
+static auto lutTrainer_sample_fraction_doc = bob::extension::VariableDoc(
+  "sample_fraction",
+  "float",
+  "The fraction of samples that are used to scan the features in each round"
+);
+
+static PyObject* lutTrainer_sample_fraction(
+  LUTTrainerObject* self,
+  void*
+)
+{
+  return Py_BuildValue("d", self->base->sampleFraction());
+}
+
+static auto lutTrainer_seed_doc = bob::extension::VariableDoc(
+  "seed",
+  "int",
+  "The seed of the random number generator that selects the features and samples"
+);
+
+static PyObject* lutTrainer_seed(
+  LUTTrainerObject* self,
+  void*
+)
+{
+  return Py_BuildValue("I", self->base->seed());
+}
+
+static auto lutTrainer_round_doc = bob::extension::VariableDoc(
+  "round",
+  "int",
+  "The number of rounds that have been trained",
+  "The features and samples of each round are selected with a seed that is derived from the :py:attr:`seed` and the round, so that the selection can be continued after restoring the round, see :py:meth:`load_state`."
+);
+
+static PyObject* lutTrainer_round(
+  LUTTrainerObject* self,
+  void*
+)
+{
+  return Py_BuildValue("K", (unsigned long long)self->base->round());
+}
+
+static int lutTrainer_set_round(
+  LUTTrainerObject* self,
+  PyObject* value,
+  void*
+)
+{
+  if (!value){
+    PyErr_Format(PyExc_TypeError, "Cannot delete the '%s' attribute", lutTrainer_round_doc.name());
+    return -1;
+  }
+  unsigned long long round = PyLong_AsUnsignedLongLong(value);
+  if (PyErr_Occurred()) return -1;
+  self->base->setRound(round);
+  return 0;
+}
+
 
 static auto lutTrainer_train_doc = bob::extension::FunctionDoc(
   "train",
@@ -127,7 +264,7 @@ static auto lutTrainer_train_doc = bob::extension::FunctionDoc(
   true
 )
 .add_prototype("training_features, loss_gradient", "lut_machine")
-.add_parameter("training_features", "uint16 <#samples, #inputs>", "The feature vectors to train the weak machine")
+.add_parameter("training_features", "uint16 or uint8 <#samples, #inputs>", "The feature vectors to train the weak machine, in sample-major (C) or feature-major (Fortran) order")
 .add_parameter("loss_gradient", "float <#samples, #outputs>", "The gradient of the loss function for the training features")
 .add_return("lut_machine", "bob.boosting.machine.LUTMachine", "The weak machine that is obtained in the current round of boosting")
 ;
@@ -147,7 +284,7 @@ static PyObject* lutTrainer_train(
     if (!PyArg_ParseTupleAndKeywords(
             args, kwargs,
             "O&O&", kwlist,
-            &PyBlitzArray_Converter, &p_features,
+            &featuresConverter, &p_features,
             &PyBlitzArray_Converter, &p_gradient)
     ){
       lutTrainer_train_doc.print_usage();
@@ -156,15 +293,36 @@ static PyObject* lutTrainer_train(
 
     auto _1 = make_safe(p_features), _2 = make_safe(p_gradient);
 
-    auto features = PyBlitzArrayCxx_AsBlitz<uint16_t,2>(p_features, kwlist[0]);
     auto gradient = PyBlitzArrayCxx_AsBlitz<double,2>(p_gradient, kwlist[1]);
-
-    if (!features || !gradient){
+    if (!gradient){
       lutTrainer_train_doc.print_usage();
       return NULL;
     }
 
-    auto machine = self->base->train(*features, *gradient);
+    // the seed of this round is drawn while holding the GIL, so that the trainer is not modified by several threads at the same time
+    // the feature scan does not need the GIL
+    const uint32_t seed = self->base->nextSeed();
+    boost::shared_ptr<bob::learn::boosting::LUTMachine> machine;
+    switch (p_features->type_num){
+      case NPY_UINT16:{
+        auto features = PyBlitzArrayCxx_AsBlitz<uint16_t,2>(p_features, kwlist[0]);
+        if (!features) return NULL;
+        GILReleaser releaser;
+        machine = self->base->train(*features, *gradient, seed);
+        break;
+      }
+      case NPY_UINT8:{
+        auto features = PyBlitzArrayCxx_AsBlitz<uint8_t,2>(p_features, kwlist[0]);
+        if (!features) return NULL;
+        GILReleaser releaser;
+        machine = self->base->train(*features, *gradient, seed);
+        break;
+      }
+      default:
+        lutTrainer_train_doc.print_usage();
+        PyErr_Format(PyExc_TypeError, "%s only supports training features of type uint16 or uint8", Py_TYPE(self)->tp_name);
+        return NULL;
+    }
     return createMachine(boost::dynamic_pointer_cast<bob::learn::boosting::WeakMachine>(machine));
 
   } catch (std::exception& ex) {
@@ -179,6 +337,71 @@ static PyObject* lutTrainer_train(
 
 
 
+static auto lutTrainer_save_state_doc = bob::extension::FunctionDoc(
+  "save_state",
+  "Writes the :py:attr:`round` to the given HDF5 file, e.g., for a checkpoint of :py:class:`bob.learn.boosting.Boosting`",
+  "",
+  true
+)
+.add_prototype("hdf5")
+.add_parameter("hdf5", ":py:class:`bob.io.base.HDF5File`", "The HDF5 file to write into")
+;
+
+static PyObject* lutTrainer_save_state(
+  LUTTrainerObject* self,
+  PyObject* args,
+  PyObject* kwargs
+)
+{
+  char* kwlist[] = {c("hdf5"), NULL};
+  PyBobIoHDF5FileObject* file = 0;
+  if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O&", kwlist, PyBobIoHDF5File_Converter, &file)){
+    lutTrainer_save_state_doc.print_usage();
+    return NULL;
+  }
+  auto _1 = make_safe(file);
+  try{
+    self->base->saveState(*file->f);
+  } catch (std::exception& ex) {
+    PyErr_SetString(PyExc_RuntimeError, ex.what());
+    return NULL;
+  }
+  Py_RETURN_NONE;
+}
+
+static auto lutTrainer_load_state_doc = bob::extension::FunctionDoc(
+  "load_state",
+  "Reads the :py:attr:`round` written by :py:meth:`save_state`, so that the random selection of features and samples continues as if the training had not been interrupted",
+  "",
+  true
+)
+.add_prototype("hdf5")
+.add_parameter("hdf5", ":py:class:`bob.io.base.HDF5File`", "The HDF5 file to read from")
+;
+
+static PyObject* lutTrainer_load_state(
+  LUTTrainerObject* self,
+  PyObject* args,
+  PyObject* kwargs
+)
+{
+  char* kwlist[] = {c("hdf5"), NULL};
+  PyBobIoHDF5FileObject* file = 0;
+  if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O&", kwlist, PyBobIoHDF5File_Converter, &file)){
+    lutTrainer_load_state_doc.print_usage();
+    return NULL;
+  }
+  auto _1 = make_safe(file);
+  try{
+    self->base->loadState(*file->f);
+  } catch (std::exception& ex) {
+    PyErr_SetString(PyExc_RuntimeError, ex.what());
+    return NULL;
+  }
+  Py_RETURN_NONE;
+}
+
+
 // bind the class
 static PyGetSetDef lutTrainer_Getters[] = {
   {
@@ -202,6 +425,48 @@ static PyGetSetDef lutTrainer_Getters[] = {
     lutTrainer_selection_doc.doc(),
     NULL
   },
+  {
+    lutTrainer_output_doc.name(),
+    (getter)lutTrainer_output,
+    NULL,
+    lutTrainer_output_doc.doc(),
+    NULL
+  },
+  {
+    lutTrainer_threads_doc.name(),
+    (getter)lutTrainer_threads,
+    NULL,
+    lutTrainer_threads_doc.doc(),
+    NULL
+  },
+  {
+    lutTrainer_feature_fraction_doc.name(),
+    (getter)lutTrainer_feature_fraction,
+    NULL,
+    lutTrainer_feature_fraction_doc.doc(),
+    NULL
+  },
+  {
+    lutTrainer_sample_fraction_doc.name(),
+    (getter)lutTrainer_sample_fraction,
+    NULL,
+    lutTrainer_sample_fraction_doc.doc(),
+    NULL
+  },
+  {
+    lutTrainer_seed_doc.name(),
+    (getter)lutTrainer_seed,
+    NULL,
+    lutTrainer_seed_doc.doc(),
+    NULL
+  },
+  {
+    lutTrainer_round_doc.name(),
+    (getter)lutTrainer_round,
+    (setter)lutTrainer_set_round,
+    lutTrainer_round_doc.doc(),
+    NULL
+  },
   {NULL}
 };
 
@@ -212,6 +477,18 @@ static PyMethodDef lutTrainer_Methods[] = {
     METH_VARARGS | METH_KEYWORDS,
     lutTrainer_train_doc.doc(),
   },
+  {
+    lutTrainer_save_state_doc.name(),
+    (PyCFunction)lutTrainer_save_state,
+    METH_VARARGS | METH_KEYWORDS,
+    lutTrainer_save_state_doc.doc(),
+  },
+  {
+    lutTrainer_load_state_doc.name(),
+    (PyCFunction)lutTrainer_load_state,
+    METH_VARARGS | METH_KEYWORDS,
+    lutTrainer_load_state_doc.doc(),
+  },
   {NULL}
 };
 
@@ -4,49 +4,139 @@
 
 #include "main.h"
 #include <bob.learn.boosting/Functions.h>
+#include <algorithm>
+
+template <typename T>
+static void transposeFeatures(PyBlitzArrayObject* features){
+  PyBlitzArrayCxx_AsBlitz<T,2>(features)->transposeSelf(1,0);
+}
+
+int featuresConverter(PyObject* o, PyBlitzArrayObject** a){
+  PyArrayObject* array = reinterpret_cast<PyArrayObject*>(o);
+  if (!PyArray_Check(o) || PyArray_NDIM(array) != 2 || !PyArray_IS_F_CONTIGUOUS(array) || PyArray_IS_C_CONTIGUOUS(array)){
+    return PyBlitzArray_Converter(o, a);
+  }
+
+  // the transpose of a feature-major array is C-contiguous, and can be wrapped without copying
+  PyObject* transposed = PyArray_Transpose(array, NULL);
+  if (!transposed) return 0;
+  auto _ = make_safe(transposed);
+  if (!PyBlitzArray_Converter(transposed, a)) return 0;
+
+  // transpose the blitz array back, so that the feature-major strides are used
+  switch ((*a)->type_num){
+    case NPY_UINT16: transposeFeatures<uint16_t>(*a); break;
+    case NPY_UINT8: transposeFeatures<uint8_t>(*a); break;
+    case NPY_FLOAT64: transposeFeatures<double>(*a); break;
+    case NPY_FLOAT32: transposeFeatures<float>(*a); break;
+    default:
+      PyErr_Format(PyExc_TypeError, "feature-major arrays of type '%s' are not supported", PyBlitzArray_TypenumAsString((*a)->type_num));
+      Py_DECREF(*a);
+      return 0;
+  }
+  std::swap((*a)->shape[0], (*a)->shape[1]);
+  std::swap((*a)->stride[0], (*a)->stride[1]);
+  return 1;
+}
 
 auto weighted_histogram_doc = bob::extension::FunctionDoc(
   "weighted_histogram",
-  "Computes a weighted histogram from the given features."
+  "Computes a weighted histogram from the given features.",
+  "When the ``weights`` are 2D, one histogram per column of the weights (i.e., per output) is computed in a single pass over the features, and the ``histogram`` is 2D as well. "
+  "Instead of the ``histogram``, its ``size`` (i.e., the maximum feature value + 1) can be given, in which case a new histogram is created and returned."
 )
 .add_prototype("features, weights, histogram")
-.add_parameter("features", "array_like <1D, uint16>", "The vector of features to compute a histogram for")
-.add_parameter("weights", "array_like <1D, float>", "The vector of weights; must be of the same size as the features")
-.add_parameter("histogram", "array_like <1D, float>", "The histogram that will be filled")
+.add_prototype("features, weights, size", "histogram")
+.add_parameter("features", "array_like <1D, uint16> or array_like <1D, uint8>", "The vector of features to compute a histogram for")
+.add_parameter("weights", "array_like <1D, float> or array_like <2D, float>", "The vector of weights, or the weights for several outputs; must have as many rows as there are features")
+.add_parameter("histogram", "array_like <1D, float> or array_like <2D, float>", "The histogram that will be filled; for 2D ``weights``, the histogram has one column per output")
+.add_parameter("size", "int", "The number of bins of the histogram that will be created")
+.add_return("histogram", "array_like <1D, float> or array_like <2D, float>", "The newly created histogram, if the ``size`` was given")
 ;
 
-PyObject* weighted_histogram(PyObject* args, PyObject* kwargs){
+template <typename T>
+static bool _weighted_histogram(PyBlitzArrayObject* features, PyBlitzArrayObject* weights, PyBlitzArrayObject* histogram){
+  // check that all features fit into the histogram
+  const auto f = PyBlitzArrayCxx_AsBlitz<T,1>(features);
+  if (f->extent(0) && blitz::max(*f) >= histogram->shape[0]){
+    PyErr_Format(PyExc_RuntimeError, "weighted_histogram: the maximum feature value %d does not fit into the histogram of size %" PY_FORMAT_SIZE_T "d", (int)blitz::max(*f), histogram->shape[0]);
+    return false;
+  }
+
+  if (weights->ndim == 1){
+    bob::learn::boosting::weighted_histogram(
+      *f,
+      *PyBlitzArrayCxx_AsBlitz<double,1>(weights),
+      *PyBlitzArrayCxx_AsBlitz<double,1>(histogram)
+    );
+  } else {
+    bob::learn::boosting::weighted_histogram(
+      *f,
+      *PyBlitzArrayCxx_AsBlitz<double,2>(weights),
+      *PyBlitzArrayCxx_AsBlitz<double,2>(histogram)
+    );
+  }
+  return true;
+}
+
+PyObject* weighted_histogram(PyObject*, PyObject* args, PyObject* kwargs){
   char* kwlist[] = {c("features"), c("weights"), c("histogram"), NULL};
 
-  PyBlitzArrayObject* features,* weights,* histogram;
+  PyBlitzArrayObject* features,* weights;
+  PyObject* hist;
   if (!PyArg_ParseTupleAndKeywords(
     args, kwargs,
-    "O&O&O&", kwlist, &PyBlitzArray_Converter, &features, &PyBlitzArray_Converter, &weights, &PyBlitzArray_OutputConverter, &histogram
+    "O&O&O", kwlist, &PyBlitzArray_Converter, &features, &PyBlitzArray_Converter, &weights, &hist
   )){
+    weighted_histogram_doc.print_usage();
     return NULL;
   }
 
-  auto _1 = make_safe(features), _2 = make_safe(weights), _3 = make_safe(histogram);
+  auto _1 = make_safe(features), _2 = make_safe(weights);
 
   // tests
-  if (features->type_num != NPY_UINT16 || features->ndim != 1){
-    PyErr_Format(PyExc_RuntimeError, "weighted_histogram: features parameter must be 1D of numpy.uint16");
+  if ((features->type_num != NPY_UINT16 && features->type_num != NPY_UINT8) || features->ndim != 1){
+    PyErr_Format(PyExc_RuntimeError, "weighted_histogram: features parameter must be 1D of numpy.uint16 or numpy.uint8");
+    return NULL;
+  }
+  if (weights->type_num != NPY_FLOAT64 || (weights->ndim != 1 && weights->ndim != 2)){
+    PyErr_Format(PyExc_RuntimeError, "weighted_histogram: weights parameter must be 1D or 2D of numpy.float64");
     return NULL;
   }
-  if (weights->type_num != NPY_FLOAT16 || weights->ndim != 1){
-    PyErr_Format(PyExc_RuntimeError, "weighted_histogram: weights parameter must be 1D of numpy.float64");
+  if (weights->shape[0] != features->shape[0]){
+    PyErr_Format(PyExc_RuntimeError, "weighted_histogram: weights parameter must have as many rows as there are features");
     return NULL;
   }
-  if (histogram->type_num != NPY_FLOAT16 || histogram->ndim != 1){
-    PyErr_Format(PyExc_RuntimeError, "weighted_histogram: histogram parameter must be 1D of numpy.float64");
+
+  // get or create the histogram
+  PyBlitzArrayObject* histogram;
+  bool created = false;
+  if (PyNumber_Check(hist) && !PyArray_Check(hist)){
+    Py_ssize_t size = PyNumber_AsSsize_t(hist, PyExc_OverflowError);
+    if (PyErr_Occurred()) return NULL;
+    Py_ssize_t shape[] = {size, weights->ndim == 2 ? weights->shape[1] : 1};
+    histogram = reinterpret_cast<PyBlitzArrayObject*>(PyBlitzArray_SimpleNew(NPY_FLOAT64, weights->ndim, shape));
+    if (!histogram) return NULL;
+    created = true;
+  } else if (!PyBlitzArray_OutputConverter(hist, &histogram)){
     return NULL;
   }
-  bob::learn::boosting::weighted_histogram(
-    *PyBlitzArrayCxx_AsBlitz<uint16_t,1>(features),
-    *PyBlitzArrayCxx_AsBlitz<double,1>(weights),
-    *PyBlitzArrayCxx_AsBlitz<double,1>(histogram)
-  );
+  auto _3 = make_safe(histogram);
+
+  if (histogram->type_num != NPY_FLOAT64 || histogram->ndim != weights->ndim){
+    PyErr_Format(PyExc_RuntimeError, "weighted_histogram: histogram parameter must be of numpy.float64 and have the same number of dimensions as the weights");
+    return NULL;
+  }
+
+  if (weights->ndim == 2 && histogram->shape[1] != weights->shape[1]){
+    PyErr_Format(PyExc_RuntimeError, "weighted_histogram: histogram parameter must have as many columns as the weights");
+    return NULL;
+  }
+
+  bool valid = features->type_num == NPY_UINT16 ? _weighted_histogram<uint16_t>(features, weights, histogram) : _weighted_histogram<uint8_t>(features, weights, histogram);
+  if (!valid) return NULL;
 
+  if (created) return PyBlitzArray_AsNumpyArray(histogram, 0);
   Py_RETURN_NONE;
 
 }
@@ -54,7 +144,7 @@ PyObject* weighted_histogram(PyObject* args, PyObject* kwargs){
 static PyMethodDef BoostingMethods[] = {
   {
     weighted_histogram_doc.name(),
-    &weighted_histogram,
+    (PyCFunction)weighted_histogram,
     METH_VARARGS | METH_KEYWORDS,
     weighted_histogram_doc.doc()
   },
@@ -91,6 +181,9 @@ PyObject* create_module(void)
 
   if (!init_LossFunction(module)) return NULL;
   if (!init_JesorskyLoss(module)) return NULL;
+  if (!init_ExponentialLoss(module)) return NULL;
+  if (!init_LogitLoss(module)) return NULL;
+  if (!init_TangentialLoss(module)) return NULL;
 
 
   if (!init_WeakMachine(module)) return NULL;
@@ -99,6 +192,7 @@ PyObject* create_module(void)
   if (!init_BoostedMachine(module)) return NULL;
 
   if (!init_LUTTrainer(module)) return NULL;
+  if (!init_StumpTrainer(module)) return NULL;
 
 
   /* imports C-API dependencies */
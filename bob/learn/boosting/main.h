@@ -11,15 +11,33 @@
 
 #include <bob.learn.boosting/LossFunction.h>
 #include <bob.learn.boosting/JesorskyLoss.h>
+#include <bob.learn.boosting/ExponentialLoss.h>
+#include <bob.learn.boosting/LogitLoss.h>
+#include <bob.learn.boosting/TangentialLoss.h>
 #include <bob.learn.boosting/WeakMachine.h>
 #include <bob.learn.boosting/StumpMachine.h>
 #include <bob.learn.boosting/LUTMachine.h>
 #include <bob.learn.boosting/BoostedMachine.h>
 #include <bob.learn.boosting/LUTTrainer.h>
+#include <bob.learn.boosting/StumpTrainer.h>
 
 // helper function to convert const char* to char*
 inline char* c(const char* o){return const_cast<char*>(o);}
 
+// helper class that releases the GIL during its lifetime, e.g., while a long computation in C++ is running
+// NOTE: no Python API function must be called while an object of this class exists
+class GILReleaser{
+  public:
+    GILReleaser() : m_state(PyEval_SaveThread()) {}
+    ~GILReleaser() {PyEval_RestoreThread(m_state);}
+  private:
+    PyThreadState* m_state;
+};
+
+// converter for 2D feature arrays, which might be given in sample-major (C) or in feature-major (Fortran) order
+// feature-major arrays are wrapped without copying the data, i.e., the blitz array of the converted object has the strides of the given array
+int featuresConverter(PyObject*, PyBlitzArrayObject**);
+
 // Loss function
 typedef struct {
   PyObject_HEAD
@@ -40,6 +58,36 @@ extern PyTypeObject JesorskyLossType;
 
 bool init_JesorskyLoss(PyObject*);
 
+// Exponential loss
+typedef struct {
+  LossFunctionObject parent;
+  boost::shared_ptr<bob::learn::boosting::ExponentialLoss> base;
+} ExponentialLossObject;
+
+extern PyTypeObject ExponentialLossType;
+
+bool init_ExponentialLoss(PyObject*);
+
+// Logit loss
+typedef struct {
+  LossFunctionObject parent;
+  boost::shared_ptr<bob::learn::boosting::LogitLoss> base;
+} LogitLossObject;
+
+extern PyTypeObject LogitLossType;
+
+bool init_LogitLoss(PyObject*);
+
+// Tangential loss
+typedef struct {
+  LossFunctionObject parent;
+  boost::shared_ptr<bob::learn::boosting::TangentialLoss> base;
+} TangentialLossObject;
+
+extern PyTypeObject TangentialLossType;
+
+bool init_TangentialLoss(PyObject*);
+
 
 // Weak machine
 typedef PyObject*(*CreateFunction)(boost::shared_ptr<bob::learn::boosting::WeakMachine>);
@@ -101,4 +149,15 @@ extern PyTypeObject LUTTrainerType;
 bool init_LUTTrainer(PyObject*);
 
 
+// Stump trainer
+typedef struct {
+  PyObject_HEAD
+  boost::shared_ptr<bob::learn::boosting::StumpTrainer> base;
+} StumpTrainerObject;
+
+extern PyTypeObject StumpTrainerType;
+
+bool init_StumpTrainer(PyObject*);
+
+
 #endif // BOB_LEARN_BOOSTING_MAIN_H
@@ -137,7 +137,7 @@ static auto stumpMachine_forward_doc = bob::extension::FunctionDoc(
 )
 .add_prototype("features", "prediction")
 .add_prototype("features, predictions")
-.add_parameter("features", "float <#inputs> or float <#samples, #inputs>", "The feature vector(s) the prediction should be computed for. If only a single feature is given, the resulting prediction is returned as a float. Otherwise it is stored in the second ``predictions`` parameter.")
+.add_parameter("features", "float64, float32, uint16 or uint8 <#inputs> or <#samples, #inputs>", "The feature vector(s) the prediction should be computed for. If only a single feature is given, the resulting prediction is returned as a float. Otherwise it is stored in the second ``predictions`` parameter.")
 .add_parameter("predictions", "float <#samples> or float <#samples, 1>", "The predicted values -- in case several ``features`` are provided.")
 .add_return("prediction", "float", "The predicted value -- in case a single feature is provided")
 ;
@@ -145,6 +145,7 @@ static auto stumpMachine_forward_doc = bob::extension::FunctionDoc(
 template <typename T, int N> void _forward(StumpMachineObject* self, PyBlitzArrayObject* features, PyBlitzArrayObject* predictions){
   const auto f = PyBlitzArrayCxx_AsBlitz<T,2>(features);
   auto p = PyBlitzArrayCxx_AsBlitz<double,N>(predictions);
+  GILReleaser releaser;
   self->base->forward(*f, *p);
 }
 
@@ -162,7 +163,7 @@ static PyObject* stumpMachine_forward(
   if (!PyArg_ParseTupleAndKeywords(
           args, kwargs,
           "O&|O&", kwlist,
-          &PyBlitzArray_Converter, &p_features,
+          &featuresConverter, &p_features,
           &PyBlitzArray_Converter, &p_predictions)
   )
     return NULL;
@@ -172,9 +173,11 @@ static PyObject* stumpMachine_forward(
   try{
     const char* n1 = PyBlitzArray_TypenumAsString(NPY_UINT16);
     const char* n2 = PyBlitzArray_TypenumAsString(NPY_FLOAT64);
+    const char* n3 = PyBlitzArray_TypenumAsString(NPY_UINT8);
+    const char* n4 = PyBlitzArray_TypenumAsString(NPY_FLOAT32);
     // check for the different ways, the function can be called
-    if (p_features->type_num != NPY_UINT16 && p_features->type_num != NPY_FLOAT64){
-      PyErr_Format(PyExc_TypeError, "The parameter 'features' only supports 1D or 2D arrays of types '%s' or '%s'", n1, n2);
+    if (p_features->type_num != NPY_UINT16 && p_features->type_num != NPY_FLOAT64 && p_features->type_num != NPY_UINT8 && p_features->type_num != NPY_FLOAT32){
+      PyErr_Format(PyExc_TypeError, "The parameter 'features' only supports 1D or 2D arrays of types '%s', '%s', '%s' or '%s'", n1, n3, n2, n4);
       return NULL;
     }
     if (p_features->ndim == 1 && !p_predictions){
@@ -186,11 +189,21 @@ static PyObject* stumpMachine_forward(
           prediction = self->base->forward(*inputs);
           break;
         }
+        case NPY_UINT8:{
+          const auto inputs = PyBlitzArrayCxx_AsBlitz<uint8_t,1>(p_features);
+          prediction = self->base->forward(*inputs);
+          break;
+        }
         case NPY_FLOAT64:{
           const auto inputs = PyBlitzArrayCxx_AsBlitz<double,1>(p_features);
           prediction = self->base->forward(*inputs);
           break;
         }
+        case NPY_FLOAT32:{
+          const auto inputs = PyBlitzArrayCxx_AsBlitz<float,1>(p_features);
+          prediction = self->base->forward(*inputs);
+          break;
+        }
         default:
           // already handled
           return NULL;
@@ -205,14 +218,18 @@ static PyObject* stumpMachine_forward(
         case 1:
           switch (p_features->type_num){
             case NPY_UINT16: _forward<uint16_t,1>(self, p_features, p_predictions); break;
+            case NPY_UINT8: _forward<uint8_t,1>(self, p_features, p_predictions); break;
             case NPY_FLOAT64: _forward<double,1>(self, p_features, p_predictions); break;
+            case NPY_FLOAT32: _forward<float,1>(self, p_features, p_predictions); break;
             default: return NULL;
           }
           break;
         case 2:
           switch (p_features->type_num){
             case NPY_UINT16: _forward<uint16_t,2>(self, p_features, p_predictions); break;
+            case NPY_UINT8: _forward<uint8_t,2>(self, p_features, p_predictions); break;
             case NPY_FLOAT64: _forward<double,2>(self, p_features, p_predictions); break;
+            case NPY_FLOAT32: _forward<float,2>(self, p_features, p_predictions); break;
             default: return NULL;
           }
           break;
@@ -330,6 +347,23 @@ static PyObject* stumpMachine_save(
   Py_RETURN_NONE;
 }
 
+static auto stumpMachine_reduce_doc = bob::extension::FunctionDoc(
+  "__reduce__",
+  "Returns the constructor and its arguments for pickling",
+  "The threshold, polarity and feature index are passed to the constructor.",
+  true
+)
+.add_prototype("", "constructor, arguments")
+;
+
+static PyObject* stumpMachine_reduce(
+  StumpMachineObject* self,
+  PyObject*
+)
+{
+  return Py_BuildValue("(O(ddi))", Py_TYPE(self), self->base->getThreshold(), self->base->getPolarity(), self->base->getIndex());
+}
+
 // bind the class
 static PyGetSetDef stumpMachine_Getters[] = {
   {
@@ -374,6 +408,12 @@ static PyMethodDef stumpMachine_Methods[] = {
     METH_VARARGS | METH_KEYWORDS,
     stumpMachine_save_doc.doc(),
   },
+  {
+    stumpMachine_reduce_doc.name(),
+    (PyCFunction)stumpMachine_reduce,
+    METH_NOARGS,
+    stumpMachine_reduce_doc.doc(),
+  },
   {NULL}
 };
 
@@ -397,7 +437,9 @@ bool init_StumpMachine(PyObject* module)
 {
 
   // initialize the JesorskyLossType struct
-  StumpMachineType.tp_name = stumpMachine_doc.name();
+  // the name includes the module, so that the machines can be pickled
+  static const std::string name = std::string(BOB_EXT_MODULE_PREFIX "." BOB_EXT_MODULE_NAME ".") + stumpMachine_doc.name();
+  StumpMachineType.tp_name = name.c_str();
   StumpMachineType.tp_basicsize = sizeof(StumpMachineObject);
   StumpMachineType.tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE;
   StumpMachineType.tp_doc = stumpMachine_doc.doc();
@@ -0,0 +1,194 @@
+#include "main.h"
+
+
+static auto stumpTrainer_doc = bob::extension::ClassDoc(
+  "StumpTrainer",
+  "A trainer that computes weak decision stumps using the weak learner algorithm of Viola and Jones",
+  "This is the C++ implementation of the :py:class:`bob.learn.boosting.StumpTrainer`. "
+  "With the default parameters of the :py:class:`bob.learn.boosting.StumpTrainer`, it computes exactly the same thresholds, polarities and indices, but the computation is run without holding the Python global interpreter lock. "
+  "Models trained with older versions of the Python trainer, which summed the gradients in a different order, might differ when two thresholds have (almost) equal gains."
+)
+.add_constructor(
+  bob::extension::FunctionDoc(
+    "__init__",
+    "Initializes a StumpTrainer object",
+    "",
+    true
+  )
+  .add_prototype("", "")
+);
+
+
+// Some functions
+static int stumpTrainer_init(
+  StumpTrainerObject* self,
+  PyObject* args,
+  PyObject* kwargs
+)
+{
+  try{
+    char*  kwlist[] = {NULL};
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "", kwlist)){
+      stumpTrainer_doc.print_usage();
+      return -1;
+    }
+
+    self->base.reset(new bob::learn::boosting::StumpTrainer());
+  } catch (std::exception& ex) {
+    PyErr_SetString(PyExc_RuntimeError, ex.what());
+    return -1;
+  }
+  catch (...) {
+    PyErr_Format(PyExc_RuntimeError, "cannot create new object of type `%s' - unknown exception thrown", Py_TYPE(self)->tp_name);
+    return -1;
+  }
+
+  return 0;
+}
+
+static void stumpTrainer_exit(
+  StumpTrainerObject* self
+)
+{
+  self->base.reset();
+  Py_TYPE(self)->tp_free(reinterpret_cast<PyObject*>(self));
+}
+
+
+static auto stumpTrainer_train_doc = bob::extension::FunctionDoc(
+  "train",
+  "Trains and returns a weak stump machine",
+  "The best weak machine is chosen to maximize the dot product of the outputs and the negative loss gradient (gain).",
+  true
+)
+.add_prototype("training_features, loss_gradient", "stump_machine")
+.add_parameter("training_features", "float, uint16 or uint8 <#samples, #inputs>", "The feature vectors to train the weak machine, in sample-major (C) or feature-major (Fortran) order")
+.add_parameter("loss_gradient", "float <#samples> or float <#samples, 1>", "The gradient of the loss function for the training features")
+.add_return("stump_machine", ":py:class:`bob.learn.boosting.StumpMachine`", "The weak machine that is obtained in the current round of boosting")
+;
+
+static PyObject* stumpTrainer_train(
+  StumpTrainerObject* self,
+  PyObject* args,
+  PyObject* kwargs
+)
+{
+  try{
+    // get list of arguments
+    char* kwlist[] = {c("training_features"), c("loss_gradient"), NULL};
+
+    PyBlitzArrayObject* p_features = 0,* p_gradient = 0;
+
+    if (!PyArg_ParseTupleAndKeywords(
+            args, kwargs,
+            "O&O&", kwlist,
+            &featuresConverter, &p_features,
+            &PyBlitzArray_Converter, &p_gradient)
+    ){
+      stumpTrainer_train_doc.print_usage();
+      return NULL;
+    }
+
+    auto _1 = make_safe(p_features), _2 = make_safe(p_gradient);
+
+    // the loss gradient might be given as 1D or as 2D array with a single column
+    blitz::Array<double,1> gradient;
+    if (p_gradient->ndim == 2){
+      auto gradient2 = PyBlitzArrayCxx_AsBlitz<double,2>(p_gradient, kwlist[1]);
+      if (!gradient2) return NULL;
+      if (gradient2->extent(1) != 1){
+        PyErr_Format(PyExc_ValueError, "%s only supports uni-variate loss gradients, but the given gradient has %d columns", Py_TYPE(self)->tp_name, gradient2->extent(1));
+        return NULL;
+      }
+      gradient.reference((*gradient2)(blitz::Range::all(), 0));
+    } else {
+      auto gradient1 = PyBlitzArrayCxx_AsBlitz<double,1>(p_gradient, kwlist[1]);
+      if (!gradient1) return NULL;
+      gradient.reference(*gradient1);
+    }
+
+    boost::shared_ptr<bob::learn::boosting::StumpMachine> machine;
+    switch (p_features->type_num){
+      case NPY_UINT16:{
+        auto features = PyBlitzArrayCxx_AsBlitz<uint16_t,2>(p_features, kwlist[0]);
+        if (!features) return NULL;
+        GILReleaser releaser;
+        machine = self->base->train(*features, gradient);
+        break;
+      }
+      case NPY_UINT8:{
+        auto features = PyBlitzArrayCxx_AsBlitz<uint8_t,2>(p_features, kwlist[0]);
+        if (!features) return NULL;
+        GILReleaser releaser;
+        machine = self->base->train(*features, gradient);
+        break;
+      }
+      case NPY_FLOAT64:{
+        auto features = PyBlitzArrayCxx_AsBlitz<double,2>(p_features, kwlist[0]);
+        if (!features) return NULL;
+        GILReleaser releaser;
+        machine = self->base->train(*features, gradient);
+        break;
+      }
+      default:
+        stumpTrainer_train_doc.print_usage();
+        PyErr_Format(PyExc_TypeError, "%s only supports training features of type uint16, uint8 or float64", Py_TYPE(self)->tp_name);
+        return NULL;
+    }
+
+    return createMachine(boost::dynamic_pointer_cast<bob::learn::boosting::WeakMachine>(machine));
+
+  } catch (std::exception& ex) {
+    PyErr_SetString(PyExc_RuntimeError, ex.what());
+    return NULL;
+  }
+  catch (...) {
+    PyErr_Format(PyExc_RuntimeError, "cannot create new object of type `%s' - unknown exception thrown", Py_TYPE(self)->tp_name);
+    return NULL;
+  }
+}
+
+
+
+// bind the class
+static PyMethodDef stumpTrainer_Methods[] = {
+  {
+    stumpTrainer_train_doc.name(),
+    (PyCFunction)stumpTrainer_train,
+    METH_VARARGS | METH_KEYWORDS,
+    stumpTrainer_train_doc.doc(),
+  },
+  {NULL}
+};
+
+
+// Define Stump Trainer Type object; will be filled later
+PyTypeObject StumpTrainerType = {
+  PyVarObject_HEAD_INIT(0,0)
+  0
+};
+
+
+bool init_StumpTrainer(PyObject* module)
+{
+
+  // initialize the StumpTrainerType struct
+  StumpTrainerType.tp_name = stumpTrainer_doc.name();
+  StumpTrainerType.tp_basicsize = sizeof(StumpTrainerObject);
+  StumpTrainerType.tp_flags = Py_TPFLAGS_DEFAULT;
+  StumpTrainerType.tp_doc = stumpTrainer_doc.doc();
+
+  // set the functions
+  StumpTrainerType.tp_new = PyType_GenericNew;
+  StumpTrainerType.tp_init = reinterpret_cast<initproc>(stumpTrainer_init);
+  StumpTrainerType.tp_dealloc = reinterpret_cast<destructor>(stumpTrainer_exit);
+  StumpTrainerType.tp_methods = stumpTrainer_Methods;
+
+  // check that everyting is fine
+  if (PyType_Ready(&StumpTrainerType) < 0)
+    return false;
+
+  // add the type to the module
+  Py_INCREF(&StumpTrainerType);
+  return PyModule_AddObject(module, stumpTrainer_doc.name(), (PyObject*)&StumpTrainerType) >= 0;
+}
@@ -0,0 +1,77 @@
+#include "main.h"
+
+static auto tangentialLoss_doc = bob::extension::ClassDoc(
+  "TangentialLoss",
+  "Computes the tangential loss and its derivative.",
+  "The tangential loss between target :math:`t` and score :math:`s` is described in http://www.svcl.ucsd.edu/projects/LossDesign/TangentBoost.html:\n\n"
+  ".. math:: l(t, s) = \\left(2 \\arctan(ts) - 1\\right)^2\n\n"
+  "and the derivative is computed as in the python implementation:\n\n"
+  ".. math:: \\nabla(t, s) = \\frac{4 \\left(2 \\arctan(ts) - 1\\right)}{1 + (ts)^2}\n\n"
+  "The loss and the derivative are computed independently for each sample and each output, i.e., :py:meth:`loss` returns one value per sample and output.\n\n"
+  "This class is a C++ implementation of the python class :py:class:`bob.learn.boosting.TangentialLoss`, which computes the same values. "
+  "The :py:meth:`loss_sum` and :py:meth:`loss_gradient_sum` functions compute the sums in a single pass over the data, without creating temporary arrays, and release the global interpreter lock."
+)
+.add_constructor(
+  bob::extension::FunctionDoc(
+    "__init__",
+    "Initializes a TangentialLoss object.",
+    "The constructor comes with no parameters.",
+    true
+  ).add_prototype("", "")
+);
+
+
+static int tangentialLoss_init(
+  TangentialLossObject* self,
+  PyObject* args,
+  PyObject* kwargs
+)
+{
+  // get list of arguments
+  char* kwlist[] = {NULL};
+  if (!PyArg_ParseTupleAndKeywords(args, kwargs, "", kwlist)) return -1;
+
+  self->base.reset(new bob::learn::boosting::TangentialLoss());
+  self->parent.base = self->base;
+  return 0;
+}
+
+static void tangentialLoss_exit(
+  TangentialLossObject* self
+)
+{
+  self->base.reset();
+  self->parent.base.reset();
+  Py_TYPE(self)->tp_free(reinterpret_cast<PyObject*>(self));
+}
+
+
+// Define TangentialLoss Type object; will be filled later
+PyTypeObject TangentialLossType = {
+  PyVarObject_HEAD_INIT(0,0)
+  0
+};
+
+bool init_TangentialLoss(PyObject* module)
+{
+
+  // initialize the TangentialLossType struct
+  TangentialLossType.tp_name = tangentialLoss_doc.name();
+  TangentialLossType.tp_basicsize = sizeof(TangentialLossObject);
+  TangentialLossType.tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE;
+  TangentialLossType.tp_doc = tangentialLoss_doc.doc();
+  TangentialLossType.tp_base = &LossFunctionType;
+
+  // set the functions
+  TangentialLossType.tp_new = PyType_GenericNew;
+  TangentialLossType.tp_init = reinterpret_cast<initproc>(tangentialLoss_init);
+  TangentialLossType.tp_dealloc = reinterpret_cast<destructor>(tangentialLoss_exit);
+
+  // check that everyting is fine
+  if (PyType_Ready(&TangentialLossType) < 0)
+    return false;
+
+  // add the type to the module
+  Py_INCREF(&TangentialLossType);
+  return PyModule_AddObject(module, tangentialLoss_doc.name(), (PyObject*)&TangentialLossType) >= 0;
+}
@@ -0,0 +1,100 @@
+import unittest
+import bob.learn.boosting
+import bob.learn.boosting._library
+import numpy
+import scipy.optimize
+
+
+class TestAlphaSolver(unittest.TestCase):
+  """Tests the solvers for the weights of the weak machines"""
+
+  def _data(self, outputs, discrete = True):
+    numpy.random.seed(11)
+    targets = numpy.random.choice([-1., 1.], (200, outputs))
+    previous_scores = numpy.random.randn(200, outputs)
+    # the weak machine is correct for roughly 70 % of the samples
+    current_scores = targets * numpy.where(numpy.random.rand(200, outputs) < 0.7, 1., -1.)
+    if not discrete:
+      current_scores *= numpy.random.rand(200, outputs)
+    return targets, previous_scores, current_scores
+
+  def _optimum(self, loss_function, targets, previous_scores, current_scores):
+    # a precise L-BFGS solution
+    return scipy.optimize.fmin_l_bfgs_b(loss_function.loss_and_gradient_sum, numpy.zeros(targets.shape[1]), args = (targets, previous_scores, current_scores), factr = 10, pgtol = 1e-12)[0]
+
+  def test01_analytic(self):
+    solver = bob.learn.boosting.AnalyticAlphaSolver()
+    for loss_function in (bob.learn.boosting.ExponentialLoss(), bob.learn.boosting._library.ExponentialLoss()):
+      for outputs in (1, 3):
+        data = self._data(outputs)
+        alpha = solver.solve(loss_function, *data)
+        self.assertEqual(alpha.shape, (outputs,))
+        self.assertTrue(numpy.allclose(alpha, self._optimum(loss_function, *data), atol = 1e-6))
+
+    # not applicable to other losses or real-valued outputs
+    self.assertTrue(solver.solve(bob.learn.boosting.LogitLoss(), *self._data(1)) is None)
+    self.assertTrue(solver.solve(bob.learn.boosting.ExponentialLoss(), *self._data(1, False)) is None)
+
+  def test02_newton(self):
+    solver = bob.learn.boosting.NewtonAlphaSolver()
+    for loss_function in (bob.learn.boosting.ExponentialLoss(), bob.learn.boosting.LogitLoss(), bob.learn.boosting.TangentialLoss()):
+      for outputs in (1, 3):
+        for discrete in (True, False):
+          data = self._data(outputs, discrete)
+          alpha = solver.solve(loss_function, *data)
+          if isinstance(loss_function, bob.learn.boosting.TangentialLoss):
+            # the tangential loss is not convex, and its gradient sum might not have a root; then, L-BFGS is used instead
+            if alpha is None: continue
+          else:
+            self.assertTrue(numpy.allclose(alpha, self._optimum(loss_function, *data), atol = 1e-5))
+          self.assertEqual(alpha.shape, (outputs,))
+          gradient = loss_function.loss_gradient_sum(alpha, *data)
+          self.assertTrue(numpy.allclose(gradient, 0., atol = 1e-6))
+
+    # separable data has no finite optimum
+    targets, previous_scores, current_scores = self._data(1)
+    self.assertTrue(solver.solve(bob.learn.boosting.LogitLoss(), targets, previous_scores, targets) is None)
+    # losses without second derivative are not supported
+    self.assertTrue(solver.solve(bob.learn.boosting.JesorskyLoss(), targets, previous_scores, current_scores) is None)
+
+  def test03_boosting(self):
+    # all solvers result in the same strong machine
+    numpy.random.seed(3)
+    features = numpy.random.randint(0, 16, (200, 10)).astype(numpy.uint16)
+    targets = numpy.where(features[:,2] + features[:,5] + numpy.random.randint(0, 8, 200) > 18, 1., -1.)
+
+    for loss_function in (bob.learn.boosting.ExponentialLoss(), bob.learn.boosting.LogitLoss()):
+      machines = []
+      for solvers in (None, [bob.learn.boosting.LBFGSAlphaSolver()]):
+        booster = bob.learn.boosting.Boosting(bob.learn.boosting.LUTTrainer(16), loss_function, solvers)
+        machines.append(booster.train(features, targets, number_of_rounds=5))
+      self.assertTrue((machines[0].indices == machines[1].indices).all())
+      self.assertTrue(numpy.allclose(machines[0].weights, machines[1].weights, rtol = 1e-4))
+
+  def test04_buckets(self):
+    # the bucketed exponential loss computes the same sums as the full loss
+    loss_function = bob.learn.boosting.ExponentialLoss()
+    numpy.random.seed(5)
+    targets = numpy.random.choice([-1., 1.], (1000, 2))
+    previous_scores = numpy.random.randn(1000, 2)
+    # LUT outputs with a few distinct real values
+    current_scores = numpy.random.choice([-0.5, 0.25, 1.], (1000, 2))
+    alpha = numpy.array([0.3, -0.7])
+
+    buckets = loss_function.bucket_statistics(targets, previous_scores, current_scores)
+    self.assertTrue(isinstance(buckets, bob.learn.boosting.ExponentialLossBuckets))
+    self.assertTrue(numpy.allclose(buckets.loss_sum(alpha), loss_function.loss_sum(alpha, targets, previous_scores, current_scores)))
+    self.assertTrue(numpy.allclose(buckets.loss_gradient_sum(alpha), loss_function.loss_gradient_sum(alpha, targets, previous_scores, current_scores)))
+    total, gradient = buckets.loss_and_gradient_sum(alpha)
+    self.assertAlmostEqual(total, numpy.sum(loss_function.loss_sum(alpha, targets, previous_scores, current_scores)))
+    self.assertTrue(numpy.allclose(gradient, buckets.loss_gradient_sum(alpha)))
+    second = numpy.sum(loss_function.loss_second_derivative(targets, previous_scores + alpha * current_scores) * current_scores ** 2, 0)
+    self.assertTrue(numpy.allclose(buckets.loss_second_derivative_sum(alpha), second))
+
+    # both solvers use the buckets and find the optimum
+    for solver in (bob.learn.boosting.NewtonAlphaSolver(), bob.learn.boosting.LBFGSAlphaSolver()):
+      self.assertTrue(numpy.allclose(solver.solve(loss_function, targets, previous_scores, current_scores), self._optimum(loss_function, targets, previous_scores, current_scores), atol = 1e-4))
+
+    # real-valued outputs are not bucketed
+    self.assertTrue(loss_function.bucket_statistics(targets, previous_scores, numpy.random.randn(1000, 2)) is None)
+    self.assertTrue(bob.learn.boosting.LogitLoss().bucket_statistics(targets, previous_scores, current_scores) is None)
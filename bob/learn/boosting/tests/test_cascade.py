@@ -0,0 +1,87 @@
+import unittest
+import os
+import tempfile
+import bob.learn.boosting
+import numpy
+import bob.io.base
+
+import bob.learn.boosting.utils
+
+class TestCascade(unittest.TestCase):
+  """Tests the cascade evaluation and the cascade trainer"""
+
+  def _machine(self):
+    # train a small LUT machine on two MNIST digits
+    database = bob.learn.boosting.utils.MNIST()
+    inputs, targets = [], []
+    for digit in (3, 0):
+      input, target = database.data(labels = digit)
+      inputs.append(input[:100])
+      targets.append(target[:100])
+    features = numpy.vstack(inputs).astype(numpy.uint16)
+    aligned = numpy.ones(200)
+    aligned[100:] = -1
+
+    booster = bob.learn.boosting.Boosting(bob.learn.boosting.LUTTrainer(256), bob.learn.boosting.LogitLoss())
+    machine = booster.train(features, aligned, number_of_rounds = 10)
+    return machine, features, aligned
+
+
+  def test01_cascade(self):
+    machine, features, targets = self._machine()
+    full_scores = numpy.ndarray(targets.shape)
+    machine(features, full_scores)
+
+    trainer = bob.learn.boosting.CascadeTrainer(detection_rate = 0.9)
+    trainer.train(machine, features, targets, [2, 5, 10])
+    self.assertTrue((machine.cascade_stages == [2, 5, 10]).all())
+    self.assertEqual(machine.cascade_thresholds.shape, (3,))
+
+    # at least the desired fraction of positive samples is accepted
+    scores, labels = numpy.ndarray(targets.shape), numpy.ndarray(targets.shape)
+    machine(features, scores, labels)
+    self.assertTrue(numpy.count_nonzero(labels[targets > 0] > 0) >= 90)
+
+    # the rejection matches the partial scores
+    partial = trainer.partial_scores(machine, features, [2, 5, 10])
+    accepted = numpy.all(partial >= machine.cascade_thresholds, axis = 1)
+    self.assertTrue(((labels > 0) == accepted).all())
+    self.assertTrue(numpy.allclose(scores[accepted], full_scores[accepted]))
+    self.assertTrue(numpy.allclose(scores[accepted], partial[accepted, -1]))
+
+    # single samples give the same scores
+    for i in range(0, 200, 17):
+      self.assertEqual(machine(features[i]), scores[i])
+
+    # compiled cascades give the same results
+    machine.compile()
+    compiled_scores, compiled_labels = numpy.ndarray(targets.shape), numpy.ndarray(targets.shape)
+    machine(features, compiled_scores, compiled_labels)
+    self.assertTrue((compiled_scores == scores).all())
+    self.assertTrue((compiled_labels == labels).all())
+
+    # the cascade is stored in HDF5
+    temp = tempfile.mkstemp(prefix = "bbcascade_", suffix = ".hdf5")[1]
+    machine.save(bob.io.base.HDF5File(temp, 'w'))
+    loaded = bob.learn.boosting.BoostedMachine(bob.io.base.HDF5File(temp))
+    os.remove(temp)
+    self.assertTrue((loaded.cascade_stages == machine.cascade_stages).all())
+    self.assertTrue((loaded.cascade_thresholds == machine.cascade_thresholds).all())
+    loaded(features, compiled_scores, compiled_labels)
+    self.assertTrue((compiled_scores == scores).all())
+
+    # removing the cascade restores the full evaluation
+    machine.set_cascade(numpy.ndarray((0,), numpy.int32), numpy.ndarray((0,)))
+    self.assertTrue(machine.cascade_stages is None)
+    machine(features, scores)
+    self.assertTrue(numpy.allclose(scores, full_scores))
+
+
+  def test02_invalid_stages(self):
+    machine, features, targets = self._machine()
+    self.assertRaises(RuntimeError, machine.set_cascade, numpy.array([5, 3, 10], numpy.int32), numpy.zeros(3))
+    self.assertRaises(RuntimeError, machine.set_cascade, numpy.array([5, 9], numpy.int32), numpy.zeros(2))
+    machine.set_cascade(numpy.array([5, 10], numpy.int32), numpy.zeros(2))
+    # adding another weak machine removes the cascade
+    machine.add_weak_machine(machine.weak_machines[0], 1.)
+    self.assertTrue(machine.cascade_stages is None)
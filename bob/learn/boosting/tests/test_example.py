@@ -24,3 +24,10 @@ def test_example_mnist():
 
   mnist.main(options)
 
+
+
+def test_layout_benchmark():
+  # test that the benchmark of the feature layouts works
+  from bob.learn.boosting.examples import layout_benchmark
+
+  layout_benchmark.main(['-s', '200x20', '-r', '1', '-m', '16', '-o', '2'])
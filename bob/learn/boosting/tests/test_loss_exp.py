@@ -165,3 +165,35 @@ class TestExponentialLoss(unittest.TestCase):
 
     self.assertTrue((val4 == grad_sum_val).all())
 
+
+  def test05_update_loss_gradient(self):
+    # the multiplicative update gives the same gradient as the recomputation
+    loss_function = bob.learn.boosting.ExponentialLoss()
+    numpy.random.seed(1)
+    targets = numpy.random.choice([-1., 1.], (100, 3))
+    scores = numpy.random.randn(100, 3)
+    gradient = loss_function.loss_gradient(targets, scores)
+    for round in range(10):
+      alpha = numpy.random.randn(3)
+      current_scores = numpy.random.choice([-1., 1.], (100, 3))
+      scores += alpha * current_scores
+      loss_function.update_loss_gradient(targets, scores, gradient, alpha, current_scores)
+    self.assertTrue(numpy.allclose(gradient, loss_function.loss_gradient(targets, scores)))
+
+    # with the buckets of the discrete weak outputs, the gradient is scaled per bucket, and the result is identical to the dense update
+    dense = gradient.copy()
+    for round in range(10):
+      alpha = numpy.random.randn(3)
+      current_scores = numpy.random.choice([-1., 0., 1.], (100, 3))
+      buckets = loss_function.bucket_statistics(targets, scores, current_scores)
+      self.assertEqual(buckets.m_indices.shape, (100, 3))
+      scores += alpha * current_scores
+      loss_function.update_loss_gradient(targets, scores, dense, alpha, current_scores)
+      loss_function.update_loss_gradient(targets, scores, gradient, alpha, current_scores, buckets = buckets)
+      self.assertTrue(numpy.allclose(gradient, dense, rtol=1e-14, atol=0.))
+    self.assertTrue(numpy.allclose(gradient, loss_function.loss_gradient(targets, scores)))
+
+    # the default implementation recomputes the gradient
+    loss_function = bob.learn.boosting.LogitLoss()
+    loss_function.update_loss_gradient(targets, scores, gradient, alpha, current_scores)
+    self.assertTrue(numpy.allclose(gradient, loss_function.loss_gradient(targets, scores)))
@@ -0,0 +1,77 @@
+import unittest
+import bob.learn.boosting
+import bob.learn.boosting._library
+import numpy
+
+
+class TestNativeLoss(unittest.TestCase):
+  """Tests that the C++ loss functions compute the same values as the python implementations"""
+
+  def _data(self, outputs):
+    numpy.random.seed(7)
+    targets = numpy.random.choice([-1., 1.], (50, outputs))
+    previous_scores = numpy.random.randn(50, outputs)
+    current_scores = numpy.random.choice([-1., 1.], (50, outputs))
+    alpha = numpy.random.randn(outputs)
+    return alpha, targets, previous_scores, current_scores
+
+  def test01_compare(self):
+    for name in ('ExponentialLoss', 'LogitLoss', 'TangentialLoss'):
+      python = getattr(bob.learn.boosting, name)()
+      native = getattr(bob.learn.boosting._library, name)()
+      self.assertTrue(isinstance(native, bob.learn.boosting._library.LossFunction))
+
+      for outputs in (1, 3):
+        alpha, targets, previous_scores, current_scores = self._data(outputs)
+
+        loss = native.loss(targets, previous_scores)
+        self.assertEqual(loss.shape, (50, outputs))
+        self.assertTrue(numpy.allclose(loss, python.loss(targets, previous_scores)))
+
+        gradient = native.loss_gradient(targets, previous_scores)
+        self.assertEqual(gradient.shape, (50, outputs))
+        self.assertTrue(numpy.allclose(gradient, python.loss_gradient(targets, previous_scores)))
+
+        loss_sum = native.loss_sum(alpha, targets, previous_scores, current_scores)
+        self.assertEqual(loss_sum.shape, (outputs,))
+        self.assertTrue(numpy.allclose(loss_sum, python.loss_sum(alpha, targets, previous_scores, current_scores)))
+
+        gradient_sum = native.loss_gradient_sum(alpha, targets, previous_scores, current_scores)
+        self.assertEqual(gradient_sum.shape, (outputs,))
+        self.assertTrue(numpy.allclose(gradient_sum, python.loss_gradient_sum(alpha, targets, previous_scores, current_scores)))
+
+        # the combined function computes the total loss and the gradient sums at once
+        for loss_function in (python, native):
+          total, gradient_sum = loss_function.loss_and_gradient_sum(alpha, targets, previous_scores, current_scores)
+          self.assertAlmostEqual(total, numpy.sum(python.loss_sum(alpha, targets, previous_scores, current_scores)))
+          self.assertTrue(numpy.allclose(gradient_sum, python.loss_gradient_sum(alpha, targets, previous_scores, current_scores)))
+
+      # inconsistent shapes are detected
+      self.assertRaises(RuntimeError, native.loss_sum, alpha[:1], targets, previous_scores, current_scores)
+      self.assertRaises(RuntimeError, native.loss, targets, previous_scores[:10])
+
+  def test02_jesorsky(self):
+    # the combined function of the base class is used by regression losses
+    loss_function = bob.learn.boosting.JesorskyLoss()
+    targets = numpy.array([[10, 10, 10, 30], [12, 11, 13, 29]], 'float64')
+    prev_scores = numpy.array([[0.1, 0.2, 0.3, 0.4], [0.5, 0.5, 0.5, 0.5]], 'float64')
+    weak_scores = numpy.array([[0.2, 0.4, 0.5, 0.6], [0.5, 0.5, 0.5, 0.5]], 'float64')
+    alpha = numpy.array([0.5, 0.5, 0.5, 0.5])
+
+    total, gradient_sum = loss_function.loss_and_gradient_sum(alpha, targets, prev_scores, weak_scores)
+    self.assertAlmostEqual(total, loss_function.loss_sum(alpha, targets, prev_scores, weak_scores)[0])
+    self.assertTrue(numpy.allclose(gradient_sum, loss_function.loss_gradient_sum(alpha, targets, prev_scores, weak_scores)))
+
+  def test03_boosting(self):
+    # the native loss can be used for boosting instead of the python loss
+    numpy.random.seed(3)
+    features = numpy.random.randint(0, 16, (100, 10)).astype(numpy.uint16)
+    targets = numpy.where(features[:,2] + features[:,5] > 15, 1., -1.)
+
+    machines = []
+    for loss_function in (bob.learn.boosting.LogitLoss(), bob.learn.boosting._library.LogitLoss()):
+      booster = bob.learn.boosting.Boosting(bob.learn.boosting.LUTTrainer(16), loss_function)
+      machines.append(booster.train(features, targets, number_of_rounds=5))
+
+    self.assertTrue((machines[0].indices == machines[1].indices).all())
+    self.assertTrue(numpy.allclose(machines[0].weights, machines[1].weights))
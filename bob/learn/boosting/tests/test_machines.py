@@ -3,7 +3,9 @@ import numpy
 import bob
 import nose
 import os
+import pickle
 import tempfile
+import multiprocessing
 import bob.io.base
 
 
@@ -83,5 +85,415 @@ def test_machine():
   nose.tools.eq_(scores[0], 2)
   nose.tools.eq_(labels[0], 1)
 
+
+def test_concurrent_forward():
+  # test that a single boosted machine can be evaluated by several threads at the same time
+  import threading
+  numpy.random.seed(42)
+  boosted_machine = bob.learn.boosting.BoostedMachine()
+  for i in range(50):
+    lut = numpy.random.choice([-1., 1.], (16, 2))
+    indices = numpy.random.randint(0, 20, 2).astype(numpy.int32)
+    boosted_machine.add_weak_machine(bob.learn.boosting.LUTMachine(lut, indices), numpy.random.rand(2))
+
+  features = [numpy.random.randint(0, 16, (500, 20)).astype(numpy.uint16) for t in range(8)]
+  reference = []
+  for f in features:
+    scores = numpy.ndarray((500, 2), numpy.float64)
+    boosted_machine(f, scores)
+    reference.append(scores)
+
+  results = [numpy.ndarray((500, 2), numpy.float64) for t in range(8)]
+  def _evaluate(t):
+    for repeat in range(20):
+      boosted_machine(features[t], results[t])
+
+  threads = [threading.Thread(target=_evaluate, args=(t,)) for t in range(8)]
+  for thread in threads: thread.start()
+  for thread in threads: thread.join()
+
+  for t in range(8):
+    assert (results[t] == reference[t]).all()
+
+
+def _random_machines(outputs, count = 30, stumps = False):
+  # creates a boosted machine with random LUT or stump weak machines
+  machine = bob.learn.boosting.BoostedMachine()
+  for i in range(count):
+    if stumps:
+      weak = bob.learn.boosting.StumpMachine(numpy.random.rand() * 16., numpy.random.choice([-1., 1.]), int(numpy.random.randint(20)))
+    else:
+      weak = bob.learn.boosting.LUTMachine(numpy.random.choice([-1., 1.], (16, outputs)), numpy.random.randint(0, 20, outputs).astype(numpy.int32))
+    machine.add_weak_machine(weak, numpy.random.randn(outputs))
+  return machine
+
+
+def test_compiled_machine():
+  # test that the compiled machine gives exactly the same results as the non-compiled one
+  numpy.random.seed(21)
+  features = numpy.random.randint(0, 16, (100, 20)).astype(numpy.uint16)
+  for outputs, stumps in ((1, False), (3, False), (1, True)):
+    machine = _random_machines(outputs, stumps = stumps)
+    reference = numpy.ndarray((100, outputs))
+    machine(features, reference)
+    single = numpy.ndarray((outputs,))
+    if not stumps:
+      # stumps do not support multi-variate prediction of single features
+      machine(features[0], single)
+    uni = numpy.ndarray((100,))
+    machine(features, uni)
+
+    assert not machine.is_compiled
+    machine.compile()
+    assert machine.is_compiled
+
+    scores = numpy.ndarray((100, outputs))
+    machine(features, scores)
+    assert (scores == reference).all()
+    if not stumps:
+      scores = numpy.ndarray((outputs,))
+      machine(features[0], scores)
+      assert (scores == single).all()
+    scores = numpy.ndarray((100,))
+    machine(features, scores)
+    assert (scores == uni).all()
+    nose.tools.eq_(machine(features[0]), uni[0])
+
+    # adding a machine reverts compilation
+    machine.add_weak_machine(machine.weak_machines[0], numpy.ones(outputs))
+    assert not machine.is_compiled
+
+  # machines with different weak machine types cannot be compiled
+  machine = _random_machines(1)
+  machine.add_weak_machine(bob.learn.boosting.StumpMachine(0., 1., 0), 1.)
+  nose.tools.assert_raises(RuntimeError, machine.compile)
+
+
+def test_block_size():
+  # test that the block size does not influence the predictions
+  numpy.random.seed(12)
+  features = numpy.random.randint(0, 16, (1000, 20)).astype(numpy.uint16)
+  for outputs in (1, 3):
+    machine = _random_machines(outputs)
+    nose.tools.eq_(machine.block_size, 256)
+    machine.block_size = 0
+    reference = numpy.ndarray((1000, outputs))
+    machine(features, reference)
+    for block_size in (1, 7, 256, 5000):
+      machine.block_size = block_size
+      nose.tools.eq_(machine.block_size, block_size)
+      scores = numpy.ndarray((1000, outputs))
+      machine(features, scores)
+      assert (scores == reference).all()
+    if outputs == 1:
+      scores = numpy.ndarray((1000,))
+      machine(features, scores)
+      assert (scores == reference[:,0]).all()
+
+  def _set_negative():
+    machine.block_size = -1
+  nose.tools.assert_raises(ValueError, _set_negative)
+
+
+
+def test_uint8_features():
+  # test that uint8 features give the same predictions as uint16 features
+  numpy.random.seed(17)
+  features = numpy.random.randint(0, 16, (500, 20)).astype(numpy.uint8)
+  wide = features.astype(numpy.uint16)
+  for outputs, stumps in ((1, False), (3, False), (1, True)):
+    machine = _random_machines(outputs, stumps = stumps)
+    for weak in machine.weak_machines[:3]:
+      nose.tools.eq_(weak(features[0]), weak(wide[0]))
+      weak_scores, reference = numpy.ndarray((500, outputs)), numpy.ndarray((500, outputs))
+      weak(features, weak_scores)
+      weak(wide, reference)
+      assert (weak_scores == reference).all()
+
+    # blocked, compiled and cascade evaluation
+    reference, labels, reference_labels = numpy.ndarray((500, outputs)), numpy.ndarray((500, outputs)), numpy.ndarray((500, outputs))
+    for compile in (False, True):
+      if compile:
+        machine.compile()
+      machine(wide, reference, reference_labels)
+      scores = numpy.ndarray((500, outputs))
+      machine(features, scores, labels)
+      assert (scores == reference).all()
+      assert (labels == reference_labels).all()
+      nose.tools.eq_(machine(features[0]), machine(wide[0]))
+    if outputs == 1:
+      machine.set_cascade(numpy.array([10, 30], numpy.int32), numpy.array([-1., 0.]))
+      machine(wide, reference, reference_labels)
+      machine(features, scores, labels)
+      assert (scores == reference).all()
+      assert (labels == reference_labels).all()
+
+  # other integer types are rejected
+  nose.tools.assert_raises(TypeError, machine, features.astype(numpy.int16), numpy.ndarray((500, 1)))
+
+
+def test_float_features():
+  # test that stump machines can be evaluated on float64 and float32 features
+  numpy.random.seed(18)
+  machine = _random_machines(1, stumps = True)
+  weak_scores = numpy.ndarray((500, 1))
+  for dtype in (numpy.float64, numpy.float32):
+    features = (numpy.random.rand(500, 20) * 16.).astype(dtype)
+    # the reference is computed by evaluating the weak machines one by one
+    reference = numpy.zeros((500, 1))
+    for weak, weight in zip(machine.weak_machines, machine.weights):
+      weak(features, weak_scores)
+      reference += weight * weak_scores
+
+    # blocked and compiled evaluation
+    for compile in (False, True):
+      if compile:
+        machine.compile()
+      scores, labels = numpy.ndarray((500,)), numpy.ndarray((500,))
+      machine(features, scores, labels)
+      assert numpy.allclose(scores, reference[:,0])
+      assert (labels == numpy.where(scores > 0, 1., -1.)).all()
+      assert numpy.allclose(machine(features[0]), reference[0,0])
+      # the features can be given in feature-major order
+      scores = numpy.ndarray((500, 1))
+      machine(numpy.asfortranarray(features), scores)
+      assert numpy.allclose(scores, reference)
+    machine.add_weak_machine(machine.weak_machines[0], 0.)
+
+  # LUT machines cannot be evaluated on float features
+  machine = _random_machines(1)
+  nose.tools.assert_raises(RuntimeError, machine, features, numpy.ndarray((500, 1)))
+  machine.compile()
+  nose.tools.assert_raises(RuntimeError, machine, features, numpy.ndarray((500, 1)))
+
+
+def _assert_equal_machines(machine, reference):
+  assert (machine.weights == reference.weights).all()
+  assert len(machine.weak_machines) == len(reference.weak_machines)
+  for weak, weak_reference in zip(machine.weak_machines, reference.weak_machines):
+    assert type(weak) == type(weak_reference)
+    if isinstance(weak, bob.learn.boosting.StumpMachine):
+      nose.tools.eq_(weak.threshold, weak_reference.threshold)
+      nose.tools.eq_(weak.polarity, weak_reference.polarity)
+      assert (weak.feature_indices() == weak_reference.feature_indices()).all()
+    else:
+      assert (weak.lut == weak_reference.lut).all()
+      assert (weak.lut_indices == weak_reference.lut_indices).all()
+
+
+def test_packed_io():
+  # test that the machines are written in the packed layout, and that the old layouts can still be read
+  numpy.random.seed(23)
+  mixed = _random_machines(1, 5, stumps = True)
+  for weak, weight in zip(_random_machines(1, 5).weak_machines, numpy.random.randn(5)):
+    mixed.add_weak_machine(weak, weight)
+  # LUTs of different sizes
+  mixed.add_weak_machine(bob.learn.boosting.LUTMachine(numpy.random.randn(7, 1), numpy.array([3], numpy.int32)), 0.5)
+
+  temp = tempfile.mkstemp(prefix = "bbpacked_", suffix = ".hdf5")[1]
+  try:
+    for machine in (_random_machines(3, 50), _random_machines(1, 50, stumps = True), mixed):
+      hdf5 = bob.io.base.HDF5File(temp, 'w')
+      machine.save(hdf5)
+      del hdf5
+      hdf5 = bob.io.base.HDF5File(temp)
+      nose.tools.eq_(hdf5.get_attribute("version"), 3)
+      # no group per weak machine
+      assert not hdf5.has_group("WeakMachine_0")
+      _assert_equal_machines(bob.learn.boosting.BoostedMachine(hdf5), machine)
+      del hdf5
+
+      # the layouts of version 1 and 2 store one group per weak machine
+      for version in (1, 2):
+        hdf5 = bob.io.base.HDF5File(temp, 'w')
+        if version == 2:
+          hdf5.set_attribute("version", 2)
+        hdf5.set("Weights", machine.weights)
+        for i, weak in enumerate(machine.weak_machines):
+          hdf5.create_group("WeakMachine_%d" % i)
+          hdf5.cd("WeakMachine_%d" % i)
+          weak.save(hdf5)
+          hdf5.cd("..")
+        del hdf5
+        _assert_equal_machines(bob.learn.boosting.BoostedMachine(bob.io.base.HDF5File(temp)), machine)
+  finally:
+    os.remove(temp)
+
+
+def test_mapped_machine():
+  # test that the memory-mapped machine gives exactly the same results as the compiled one
+  numpy.random.seed(24)
+  features = numpy.random.randint(0, 16, (100, 20)).astype(numpy.uint16)
+  temp = tempfile.mkstemp(prefix = "bbmapped_", suffix = ".bin")[1]
+  try:
+    for outputs, stumps in ((1, False), (3, False), (1, True)):
+      machine = _random_machines(outputs, stumps = stumps)
+      machine.compile()
+      reference = numpy.ndarray((100, outputs))
+      machine(features, reference)
+      machine.save_mapped(temp)
+
+      mapped = bob.learn.boosting.BoostedMachine()
+      mapped.load_mapped(temp)
+      assert mapped.is_mapped and mapped.is_compiled
+      nose.tools.eq_(mapped.outputs, outputs)
+      assert (mapped.weights == machine.weights).all()
+      assert (mapped.indices == machine.indices).all()
+      assert (mapped.feature_indices(1, 5) == machine.feature_indices(1, 5)).all()
+      scores = numpy.ndarray((100, outputs))
+      mapped(features, scores)
+      assert (scores == reference).all()
+      nose.tools.eq_(mapped(features[0]), machine(features[0]))
+
+      # mapped machines are read-only
+      nose.tools.eq_(mapped.weak_machines, [])
+      nose.tools.assert_raises(RuntimeError, mapped.add_weak_machine, machine.weak_machines[0], numpy.ones(outputs))
+      nose.tools.assert_raises(RuntimeError, mapped.save, bob.io.base.HDF5File(temp + ".hdf5", 'w'))
+      nose.tools.assert_raises(RuntimeError, mapped.save_mapped, temp)
+
+      # replacing the file does not affect the machines that have mapped it
+      _random_machines(outputs, stumps = stumps).save_mapped(temp)
+      mapped(features, scores)
+      assert (scores == reference).all()
+
+    # the cascade is stored in the file, too
+    machine = _random_machines(1, 50)
+    machine.set_cascade(numpy.array([10, 30, 50], numpy.int32), numpy.array([-0.5, -0.2, 0.]))
+    predictions, labels = numpy.ndarray((100,)), numpy.ndarray((100,))
+    machine(features, predictions, labels)
+    machine.save_mapped(temp)
+    mapped = bob.learn.boosting.BoostedMachine()
+    mapped.load_mapped(temp)
+    assert (mapped.cascade_stages == machine.cascade_stages).all()
+    mapped_predictions, mapped_labels = numpy.ndarray((100,)), numpy.ndarray((100,))
+    mapped(features, mapped_predictions, mapped_labels)
+    assert (mapped_predictions == predictions).all()
+    assert (mapped_labels == labels).all()
+
+    # feature values outside of the LUTs are rejected instead of reading behind the LUT
+    invalid = features.copy()
+    invalid[:,machine.indices] = 16
+    nose.tools.assert_raises(RuntimeError, mapped, invalid, mapped_predictions, mapped_labels)
+    nose.tools.assert_raises(RuntimeError, mapped, invalid[0])
+
+    # loading from HDF5 turns the machine into a regular machine
+    hdf5 = bob.io.base.HDF5File(temp + ".hdf5", 'w')
+    machine.save(hdf5)
+    del hdf5
+    mapped.load(bob.io.base.HDF5File(temp + ".hdf5"))
+    assert not mapped.is_mapped and not mapped.is_compiled
+    _assert_equal_machines(mapped, machine)
+
+    # other and truncated files are rejected
+    nose.tools.assert_raises(RuntimeError, mapped.load_mapped, temp + ".hdf5")
+    with open(temp, 'rb') as f:
+      data = f.read()
+    with open(temp, 'wb') as f:
+      f.write(data[:-4])
+    nose.tools.assert_raises(RuntimeError, mapped.load_mapped, temp)
+
+    # a LUT that reaches behind the values is rejected
+    machines, outputs, indices, offsets, thresholds, values, stages = numpy.frombuffer(data[24:80], numpy.int64)
+    sizes = numpy.frombuffer(data, numpy.int64, offsets, 80 + 8 * (machines * outputs + values + thresholds + stages + offsets)).copy()
+    sizes[-1] += 1
+    with open(temp, 'wb') as f:
+      f.write(data[:80 + 8 * (machines * outputs + values + thresholds + stages + offsets)] + sizes.tobytes() + data[80 + 8 * (machines * outputs + values + thresholds + stages + 2 * offsets):])
+    nose.tools.assert_raises(RuntimeError, mapped.load_mapped, temp)
+    with open(temp, 'wb') as f:
+      f.write(data)
+    mapped.load_mapped(temp)
+  finally:
+    for filename in (temp, temp + ".hdf5"):
+      if os.path.exists(filename):
+        os.remove(filename)
+
+
+def _pickled(machine, protocol):
+  # pickles and unpickles the given machine; with protocol 5, the arrays are transferred as out-of-band buffers
+  buffers = []
+  data = pickle.dumps(machine, protocol = protocol, **({'buffer_callback' : buffers.append} if protocol >= 5 else {}))
+  return pickle.loads(data, buffers = buffers) if protocol >= 5 else pickle.loads(data)
+
+
+def _score(machine, features):
+  scores = numpy.ndarray((features.shape[0], machine.outputs))
+  machine(features, scores)
+  return scores
+
+
+def test_pickle():
+  # test that all machines can be pickled
+  numpy.random.seed(25)
+  features = numpy.random.randint(0, 16, (100, 20)).astype(numpy.uint16)
+  mixed = _random_machines(1, 5, stumps = True)
+  for weak, weight in zip(_random_machines(1, 5).weak_machines, numpy.random.randn(5)):
+    mixed.add_weak_machine(weak, weight)
+  cascade = _random_machines(1, 20)
+  cascade.set_cascade(numpy.array([5, 20], numpy.int32), numpy.array([-0.5, 0.]))
+  compiled = _random_machines(3)
+  compiled.compile()
+  compiled.block_size = 16
+
+  for protocol in sorted(set((2, pickle.HIGHEST_PROTOCOL))):
+    for machine in (_random_machines(3), _random_machines(1, stumps = True), mixed, cascade, compiled, bob.learn.boosting.BoostedMachine()):
+      restored = _pickled(machine, protocol)
+      assert type(restored) == bob.learn.boosting.BoostedMachine
+      if not machine.weak_machines:
+        nose.tools.eq_(restored.weak_machines, [])
+        continue
+      _assert_equal_machines(restored, machine)
+      nose.tools.eq_(restored.is_compiled, machine.is_compiled)
+      nose.tools.eq_(restored.block_size, machine.block_size)
+      assert (_score(restored, features) == _score(machine, features)).all()
+      if machine.cascade_stages is None:
+        assert restored.cascade_stages is None
+      else:
+        assert (restored.cascade_stages == machine.cascade_stages).all()
+        assert (restored.cascade_thresholds == machine.cascade_thresholds).all()
+
+    # the weak machines can be pickled on their own
+    for weak in mixed.weak_machines + compiled.weak_machines:
+      restored = _pickled(weak, protocol)
+      assert type(restored) == type(weak)
+      if isinstance(weak, bob.learn.boosting.StumpMachine):
+        nose.tools.eq_((restored.threshold, restored.polarity), (weak.threshold, weak.polarity))
+      else:
+        assert (restored.lut == weak.lut).all()
+        assert (restored.lut_indices == weak.lut_indices).all()
+      assert (restored.feature_indices() == weak.feature_indices()).all()
+
+  # memory-mapped machines are pickled with the content of their file
+  temp = tempfile.mkstemp(prefix = "bbpickle_", suffix = ".bin")[1]
+  try:
+    compiled.save_mapped(temp)
+    mapped = bob.learn.boosting.BoostedMachine()
+    mapped.load_mapped(temp)
+    for protocol in range(2, pickle.HIGHEST_PROTOCOL + 1):
+      data = pickle.dumps(mapped, protocol)
+      # replacing the file after pickling does not change the unpickled machine
+      _random_machines(compiled.outputs).save_mapped(temp)
+      restored = pickle.loads(data)
+      assert restored.is_mapped and restored.is_compiled
+      nose.tools.eq_(restored.weak_machines, [])
+      assert (_score(restored, features) == _score(compiled, features)).all()
+      compiled.save_mapped(temp)
+
+    # corrupt content is not loaded
+    state = mapped.__reduce__()[2]
+    state["mapped_data"] = state["mapped_data"][:-8]
+    nose.tools.assert_raises(RuntimeError, bob.learn.boosting.BoostedMachine().__setstate__, state)
+
+    # the machines can be sent to worker processes
+    pool = multiprocessing.Pool(2)
+    try:
+      for machine in (mixed, mapped):
+        scores = pool.apply(_score, (machine, features))
+        assert (scores == _score(machine, features)).all()
+    finally:
+      pool.close()
+      pool.join()
+  finally:
+    os.remove(temp)
+
 if __name__ == '__main__':
   test_machine()
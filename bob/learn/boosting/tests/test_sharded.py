@@ -0,0 +1,114 @@
+import unittest
+import bob.learn.boosting
+import numpy
+import multiprocessing
+import multiprocessing.connection
+import os
+import shutil
+import tempfile
+import time
+
+
+def _socket_worker(address, authkey, weak_trainer, features, first_feature):
+  # a stand-in for a worker on a different machine, which connects as soon as the coordinator listens
+  for attempt in range(100):
+    try:
+      connection = multiprocessing.connection.Client(address, authkey = authkey)
+      break
+    except (IOError, OSError):
+      time.sleep(0.05)
+  bob.learn.boosting.ShardedTrainer.serve(connection, weak_trainer, features, first_feature)
+
+
+class TestShardedTrainer(unittest.TestCase):
+  """Tests the boosting with feature columns that are distributed to several workers"""
+
+  def test01_lut(self):
+    # the sharded training selects the same weak machines as the training on all features
+    numpy.random.seed(4)
+    features = numpy.random.randint(0, 16, (200, 23)).astype(numpy.uint16)
+    targets = numpy.where(numpy.random.rand(200, 3) > 0.5, 1., -1.)
+    targets[:,0] = numpy.where(features[:,20] + features[:,3] > 15, 1., -1.)
+
+    for selection_style, output_style in (('independent', 'discrete'), ('shared', 'discrete'), ('independent', 'real'), ('shared', 'real')):
+      weak_trainer = bob.learn.boosting.LUTTrainer(16, 3, selection_style, output_style = output_style)
+      reference = bob.learn.boosting.Boosting(weak_trainer, bob.learn.boosting.LogitLoss()).train(features, targets, number_of_rounds = 5)
+
+      sharded_trainer = bob.learn.boosting.ShardedTrainer.local(weak_trainer, features, 3)
+      try:
+        machine = bob.learn.boosting.Boosting(sharded_trainer, bob.learn.boosting.LogitLoss()).train(None, targets, number_of_rounds = 5)
+      finally:
+        sharded_trainer.close()
+
+      self.assertTrue((machine.indices == reference.indices).all())
+      self.assertTrue(numpy.allclose(machine.weights, reference.weights))
+      for weak, weak_reference in zip(machine.weak_machines, reference.weak_machines):
+        self.assertTrue((weak.lut_indices == weak_reference.lut_indices).all())
+        self.assertTrue((weak.lut == weak_reference.lut).all())
+
+    # the gains of real-valued LUTs are the ones of the weak trainer, not the dot products of the LUT outputs and the gradient
+    for seed in range(20):
+      numpy.random.seed(seed)
+      features = numpy.random.randint(0, 8, (200, 6)).astype(numpy.uint16)
+      loss_gradient = numpy.random.randn(200, 1)
+      weak_trainer = bob.learn.boosting.LUTTrainer(8, 1, 'independent', output_style = 'real')
+      sharded_trainer = bob.learn.boosting.ShardedTrainer.local(weak_trainer, features, 6)
+      try:
+        machine = sharded_trainer.train(None, loss_gradient)
+      finally:
+        sharded_trainer.close()
+      self.assertTrue((machine.lut_indices == weak_trainer.train(features, loss_gradient).lut_indices).all())
+
+  def test02_stump_sockets(self):
+    # workers connect via sockets, and keep their shards of the features
+    numpy.random.seed(8)
+    features = numpy.random.randn(150, 17)
+    targets = numpy.where(features[:,12] - features[:,2] > 0., 1., -1.)
+    reference = bob.learn.boosting.Boosting(bob.learn.boosting.StumpTrainer(), bob.learn.boosting.ExponentialLoss()).train(features, targets, number_of_rounds = 6)
+
+    temp_dir = tempfile.mkdtemp(prefix="bob_boosting_")
+    address, authkey = os.path.join(temp_dir, "coordinator"), b"boosting"
+    shards = [(0, 5), (5, 13), (13, 17)]
+    # the workers connect in arbitrary order
+    workers = [multiprocessing.Process(target = _socket_worker, args = (address, authkey, bob.learn.boosting.StumpTrainer(), features[:,first:last], first)) for first, last in reversed(shards)]
+    try:
+      for worker in workers:
+        worker.start()
+      sharded_trainer = bob.learn.boosting.ShardedTrainer.listen(address, len(shards), authkey)
+      machine = bob.learn.boosting.Boosting(sharded_trainer, bob.learn.boosting.ExponentialLoss()).train(None, targets, number_of_rounds = 6)
+      sharded_trainer.close()
+    finally:
+      for worker in workers:
+        worker.join()
+      shutil.rmtree(temp_dir)
+
+    self.assertTrue((machine.indices == reference.indices).all())
+    self.assertTrue(numpy.allclose(machine.weights, reference.weights))
+    for weak, weak_reference in zip(machine.weak_machines, reference.weak_machines):
+      self.assertEqual(weak.threshold, weak_reference.threshold)
+      self.assertEqual(weak.polarity, weak_reference.polarity)
+
+  def test03_errors(self):
+    # errors of the workers are reported by the coordinator
+    features = numpy.random.randint(0, 16, (20, 4)).astype(numpy.uint16)
+    sharded_trainer = bob.learn.boosting.ShardedTrainer.local(bob.learn.boosting.LUTTrainer(16), features, 2)
+    try:
+      # the loss gradient does not fit to the number of samples
+      self.assertRaises(RuntimeError, sharded_trainer.train, None, numpy.random.randn(10, 1))
+      # the workers are still running
+      self.assertTrue(isinstance(sharded_trainer.train(None, numpy.random.randn(20, 1)), bob.learn.boosting.LUTMachine))
+    finally:
+      sharded_trainer.close()
+
+    # weak trainers that select their machines on a subsample of the samples are rejected
+    self.assertRaises(ValueError, bob.learn.boosting.ShardedTrainer.local, bob.learn.boosting.LUTTrainer(16, sample_fraction = 0.5), features, 2)
+    self.assertRaises(ValueError, bob.learn.boosting.ShardedTrainer.local, bob.learn.boosting.StumpTrainer(sample_fraction = 0.5), features, 2)
+    # also by the workers that are started separately
+    coordinator_end, worker_end = multiprocessing.Pipe()
+    coordinator_end.send(('prepare',))
+    coordinator_end.send(('close',))
+    bob.learn.boosting.ShardedTrainer.serve(worker_end, bob.learn.boosting.StumpTrainer(sample_fraction = 0.5), features)
+    status, message = coordinator_end.recv()
+    self.assertEqual(status, 'error')
+    self.assertTrue(message.startswith("ValueError"))
+    coordinator_end.close()
@@ -1,5 +1,6 @@
 import unittest
 import random
+import multiprocessing.pool
 import bob.learn.boosting
 import numpy
 import bob.io.base
@@ -9,7 +10,7 @@ import bob.io.base.test_utils
 class TestLutTrainer(unittest.TestCase):
     """Class to test the LUT trainer """
 
-    def notest01_hist_grad(self):
+    def test01_hist_grad(self):
 
         num_feature = 100
         range_feature = 10
@@ -104,19 +105,195 @@ class TestLutTrainer(unittest.TestCase):
         self.assertEqual(machine.feature_indices()[0], selected_index)
 
 
-    def notest05_weighted_histogram(self):
+    def test06_lut_threads(self):
+        # test that the multi-threaded feature scan gives the same results as the single-threaded one
+        numpy.random.seed(42)
+        num_outputs = 3
+        x_train = numpy.random.randint(0, 16, (200, 37)).astype(numpy.uint16)
+        loss_grad = numpy.random.randn(200, num_outputs)
+
+        for style in ("independent", "shared"):
+            reference = bob.learn.boosting.LUTTrainer(16, num_outputs, style).train(x_train, loss_grad)
+            for threads in (2, 5, 64, 0):
+                trainer = bob.learn.boosting.LUTTrainer(16, num_outputs, style, number_of_threads = threads)
+                self.assertTrue(trainer.number_of_threads >= 1)
+                machine = trainer.train(x_train, loss_grad)
+                self.assertTrue((machine.feature_indices() == reference.feature_indices()).all())
+                self.assertTrue((machine.lut == reference.lut).all())
+
+
+    def test07_memmap(self):
+        # test that the LUT trainer reads memory-mapped features in column chunks
+        import tempfile, os, shutil
+        import bob.learn.boosting.utils
+        numpy.random.seed(7)
+        num_outputs = 3
+        # with 20000 LUT entries and 3 outputs, the features are processed in chunks of 17 columns
+        maximum = 20000
+        x_train = (numpy.random.randint(0, 8, (300, 40)) * 2500).astype(numpy.uint16)
+        loss_grad = numpy.random.randn(300, num_outputs)
+
+        # compute the expected loss sums with numpy
+        loss_sums = numpy.array([[-numpy.sum(numpy.abs(numpy.bincount(x_train[:,f], loss_grad[:,o], maximum))) for o in range(num_outputs)] for f in range(x_train.shape[1])])
+
+        temp_dir = tempfile.mkdtemp(prefix="bob_boosting_")
+        try:
+            hdf5 = bob.io.base.HDF5File(os.path.join(temp_dir, "features.hdf5"), 'w')
+            hdf5.set("features", x_train)
+            features = bob.learn.boosting.utils.hdf5_to_memmap(hdf5, "features", os.path.join(temp_dir, "features.bin"))
+            del hdf5
+            self.assertTrue(isinstance(features, numpy.memmap))
+            self.assertTrue((features == x_train).all())
+
+            for threads in (1, 2):
+                trainer = bob.learn.boosting.LUTTrainer(maximum, num_outputs, "independent", number_of_threads = threads)
+                machine = trainer.train(features, loss_grad)
+                self.assertTrue((machine.feature_indices() == numpy.unique(loss_sums.argmin(0))).all())
+                reference = trainer.train(x_train, loss_grad)
+                self.assertTrue((machine.lut == reference.lut).all())
+            del features
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+    def test08_feature_major(self):
+        # test that the LUT trainer computes the same machines for features in feature-major order
+        numpy.random.seed(8)
+        num_outputs = 3
+        x_train = numpy.random.randint(0, 50, (500, 30)).astype(numpy.uint16)
+        loss_grad = numpy.random.randn(500, num_outputs)
+        fortran = numpy.asfortranarray(x_train)
+        self.assertFalse(fortran.flags.c_contiguous)
+
+        for selection in ("independent", "shared"):
+            for threads in (1, 3):
+                trainer = bob.learn.boosting.LUTTrainer(50, num_outputs, selection, number_of_threads = threads)
+                reference = trainer.train(x_train, loss_grad)
+                machine = trainer.train(fortran, loss_grad)
+                self.assertTrue((machine.feature_indices() == reference.feature_indices()).all())
+                self.assertTrue((machine.lut == reference.lut).all())
+
+
+    def test09_uint8(self):
+        # test that the LUT trainer computes the same machines for uint8 and uint16 features
+        numpy.random.seed(9)
+        num_outputs = 2
+        x_train = numpy.random.randint(0, 256, (400, 25)).astype(numpy.uint8)
+        loss_grad = numpy.random.randn(400, num_outputs)
+
+        for threads in (1, 2):
+            trainer = bob.learn.boosting.LUTTrainer(256, num_outputs, "independent", number_of_threads = threads)
+            reference = trainer.train(x_train.astype(numpy.uint16), loss_grad)
+            for features in (x_train, numpy.asfortranarray(x_train)):
+                machine = trainer.train(features, loss_grad)
+                self.assertTrue((machine.feature_indices() == reference.feature_indices()).all())
+                self.assertTrue((machine.lut == reference.lut).all())
+
+        # the weighted histogram supports uint8 features
+        histogram = bob.learn.boosting.weighted_histogram(x_train[:,0].copy(), loss_grad, 256)
+        self.assertTrue((histogram == bob.learn.boosting.weighted_histogram(x_train[:,0].astype(numpy.uint16), loss_grad, 256)).all())
+
+        self.assertRaises(TypeError, trainer.train, x_train.astype(numpy.int32), loss_grad)
+
+
+    def test10_subsampling(self):
+        # test that the LUT trainer evaluates only a subset of features and samples
+        numpy.random.seed(10)
+        x_train = numpy.random.randint(0, 16, (500, 40)).astype(numpy.uint16)
+        targets = numpy.where(x_train[:,17] > 7, 1., -1.)[:,numpy.newaxis]
+        loss_grad = -targets * numpy.random.rand(500, 1)
+
+        trainer = bob.learn.boosting.LUTTrainer(16, feature_fraction = 0.25, seed = 3)
+        self.assertEqual(trainer.feature_fraction, 0.25)
+        self.assertEqual(trainer.sample_fraction, 1.)
+        self.assertEqual(trainer.seed, 3)
+        # the features are selected randomly in each round, and the selection is reproducible with the same seed
+        indices = [trainer.train(x_train, loss_grad).feature_indices()[0] for round in range(20)]
+        self.assertGreater(len(set(indices)), 1)
+        self.assertIn(17, indices)
+        other = bob.learn.boosting.LUTTrainer(16, feature_fraction = 0.25, seed = 3)
+        self.assertEqual(indices, [other.train(numpy.asfortranarray(x_train), loss_grad).feature_indices()[0] for round in range(20)])
+
+        # several threads can train with the same trainer; each round uses one of the seeds that are drawn in sequence
+        trainer = bob.learn.boosting.LUTTrainer(16, feature_fraction = 0.25, sample_fraction = 0.5, seed = 3)
+        pool = multiprocessing.pool.ThreadPool(4)
+        try:
+            threaded = pool.map(lambda round: trainer.train(x_train, loss_grad).feature_indices()[0], range(20))
+        finally:
+            pool.close()
+            pool.join()
+        other = bob.learn.boosting.LUTTrainer(16, feature_fraction = 0.25, sample_fraction = 0.5, seed = 3)
+        self.assertEqual(sorted(threaded), sorted(other.train(x_train, loss_grad).feature_indices()[0] for round in range(20)))
+
+        # with a fraction of the samples, the informative feature is still found, and the LUT is computed from all samples
+        reference = bob.learn.boosting.LUTTrainer(16).train(x_train, loss_grad)
+        for threads in (1, 2):
+            trainer = bob.learn.boosting.LUTTrainer(16, number_of_threads = threads, sample_fraction = 0.2)
+            for features in (x_train, numpy.asfortranarray(x_train)):
+                machine = trainer.train(features, loss_grad)
+                self.assertEqual(machine.feature_indices()[0], 17)
+                self.assertTrue((machine.lut == reference.lut).all())
+
+        self.assertRaises(ValueError, bob.learn.boosting.LUTTrainer, 16, feature_fraction = 0.)
+        self.assertRaises(ValueError, bob.learn.boosting.LUTTrainer, 16, sample_fraction = 1.5)
+
+
+    def test11_real_outputs(self):
+        # test that the real-valued LUTs keep the magnitudes of the gradient histograms
+        numpy.random.seed(11)
+        x_train = numpy.random.randint(0, 16, (300, 12)).astype(numpy.uint16)
+        loss_grad = numpy.random.randn(300, 2)
+
+        discrete = bob.learn.boosting.LUTTrainer(16, 2).train(x_train, loss_grad)
+        trainer = bob.learn.boosting.LUTTrainer(16, 2, output_style = 'real')
+        self.assertEqual(trainer.output_style, 'real')
+        machine = trainer.train(x_train, loss_grad)
+        self.assertTrue((machine.lut_indices == discrete.lut_indices).all())
+        for output in range(2):
+            histogram = bob.learn.boosting.weighted_histogram(x_train[:,machine.lut_indices[output]].copy(), loss_grad[:,output].copy(), 16)
+            self.assertTrue(numpy.allclose(machine.lut[:,output], histogram / numpy.max(numpy.abs(histogram))))
+            self.assertTrue((numpy.sign(machine.lut[:,output]) == discrete.lut[:,output]).all())
+
+        # fewer rounds are needed to reach the same training loss
+        targets = numpy.where(x_train[:,3] + x_train[:,7] + numpy.random.randint(0, 6, 300) > 17, 1., -1.)
+        loss_function = bob.learn.boosting.LogitLoss()
+        losses = {}
+        for output_style in ('discrete', 'real'):
+            booster = bob.learn.boosting.Boosting(bob.learn.boosting.LUTTrainer(16, output_style = output_style), loss_function)
+            strong = booster.train(x_train, targets, number_of_rounds = 5)
+            scores = numpy.zeros(300)
+            strong(x_train, scores)
+            losses[output_style] = numpy.sum(loss_function.loss(targets[:,numpy.newaxis], scores[:,numpy.newaxis]))
+        self.assertLess(losses['real'], losses['discrete'])
+
+        self.assertRaises(ValueError, bob.learn.boosting.LUTTrainer, 16, output_style = 'confidence')
+
+
+    def test05_weighted_histogram(self):
       # test that the weighted histogram implementation in C++ returns the same values as numpy.histogram
 
       size = (2056,)
       max=512
-      test_data = numpy.random.random_integers(0, max-1, size).astype(numpy.uint16)
+      test_data = numpy.random.randint(0, max, size).astype(numpy.uint16)
       weights = numpy.random.random(size)
 
-      np = numpy.histogram(test_data, bins = max, range = (0,max-1), weights = weights)[0]
+      np = numpy.histogram(test_data, bins = max, range = (0,max), weights = weights)[0]
       cpp = bob.learn.boosting.weighted_histogram(test_data, weights, max)
 
       self.assertEqual(np.shape, cpp.shape)
       for i in range(cpp.shape[0]):
         self.assertAlmostEqual(np[i], cpp[i])
 
+      # the multi-output histogram computes the same histograms for all columns of the weights in one go
+      multi_weights = numpy.random.random(size + (4,))
+      multi = numpy.ndarray((max, 4))
+      bob.learn.boosting.weighted_histogram(test_data, multi_weights, multi)
+      for output in range(4):
+        single = numpy.ndarray((max,))
+        bob.learn.boosting.weighted_histogram(test_data, multi_weights[:,output].copy(), single)
+        self.assertTrue((multi[:,output] == single).all())
+
+      # features that do not fit into the histogram are rejected
+      self.assertRaises(RuntimeError, bob.learn.boosting.weighted_histogram, test_data, weights, max-1)
+
 
@@ -215,3 +215,169 @@ class TestStumpTrainer(unittest.TestCase):
     self.assertEqual(trained_polarity, polarity)
 
 
+
+  def test08_presorted_features(self):
+    # test that the sort order, which is computed once, is re-used correctly for different gradients
+    numpy.random.seed(42)
+    features = numpy.random.randint(0, 20, (50, 7)).astype(numpy.float64)
+    trainer = bob.learn.boosting.StumpTrainer()
+    trainer.prepare(features)
+
+    for round in range(3):
+      loss = numpy.random.randn(50)
+      stump = trainer.train(features, loss)
+      reference = bob.learn.boosting.StumpTrainer().train(features, loss)
+      self.assertEqual(stump.feature_indices(), reference.feature_indices())
+      self.assertEqual(stump.threshold, reference.threshold)
+      self.assertEqual(stump.polarity, reference.polarity)
+
+      # compare to an exhaustive search over all feature values
+      gains = [abs(numpy.sum(-loss[features[:,i] > t])) for i in range(7) for t in numpy.unique(features[:,i])[:-1]]
+      index = stump.feature_indices()[0]
+      gain = abs(numpy.sum(-loss[features[:,index] > stump.threshold]))
+      self.assertAlmostEqual(gain, max(gains))
+
+    # after modifying the features in place, prepare() computes the new sort order
+    features[:] = numpy.random.randint(0, 20, (50, 7))
+    trainer.prepare(features)
+    loss = numpy.random.randn(50)
+    stump = trainer.train(features, loss)
+    reference = bob.learn.boosting.StumpTrainer().train(features, loss)
+    self.assertEqual(stump.feature_indices(), reference.feature_indices())
+    self.assertEqual(stump.threshold, reference.threshold)
+    self.assertEqual(stump.polarity, reference.polarity)
+
+
+  def test09_native_trainer(self):
+    # test that the C++ implementation of the stump trainer gives exactly the same results as the Python implementation
+    numpy.random.seed(7)
+    native = bob.learn.boosting._library.StumpTrainer()
+    trainer = bob.learn.boosting.StumpTrainer()
+
+    for dtype in (numpy.float64, numpy.uint16):
+      features = numpy.random.randint(0, 30, (100, 11)).astype(dtype)
+      if dtype == numpy.float64:
+        features += numpy.random.randn(100, 11) * (numpy.random.rand(100, 11) > 0.5)
+      # one constant feature, which cannot be used
+      features[:,3] = 5
+
+      for round in range(5):
+        loss = numpy.random.randn(100, 1)
+        stump = native.train(features, loss)
+        reference = trainer.train(features, loss)
+        self.assertTrue(isinstance(stump, bob.learn.boosting.StumpMachine))
+        self.assertEqual(stump.feature_indices(), reference.feature_indices())
+        self.assertEqual(stump.threshold, reference.threshold)
+        self.assertEqual(stump.polarity, reference.polarity)
+
+
+  def test10_cache_directory(self):
+    # test that the memory-mapped sort order gives the same stumps
+    import tempfile, shutil, os
+    numpy.random.seed(9)
+    features = numpy.random.randint(0, 30, (100, 11)).astype(numpy.float64)
+    temp_dir = tempfile.mkdtemp(prefix="bob_boosting_")
+    try:
+      trainer = bob.learn.boosting.StumpTrainer(cache_directory = temp_dir)
+      trainer.prepare(features)
+      self.assertTrue(isinstance(trainer._sort_indices, numpy.memmap))
+      for round in range(3):
+        loss = numpy.random.randn(100, 1)
+        stump = trainer.train(features, loss)
+        reference = bob.learn.boosting.StumpTrainer().train(features, loss)
+        self.assertEqual(stump.feature_indices(), reference.feature_indices())
+        self.assertEqual(stump.threshold, reference.threshold)
+        self.assertEqual(stump.polarity, reference.polarity)
+
+      # several trainers can share the cache directory without overwriting each other's sort order
+      other_features = numpy.random.randint(0, 30, (100, 11)).astype(numpy.float64)
+      other = bob.learn.boosting.StumpTrainer(cache_directory = temp_dir)
+      other.prepare(other_features)
+      loss = numpy.random.randn(100, 1)
+      for t, f in ((trainer, features), (other, other_features)):
+        stump = t.train(f, loss)
+        reference = bob.learn.boosting.StumpTrainer().train(f, loss)
+        self.assertEqual(stump.feature_indices(), reference.feature_indices())
+        self.assertEqual(stump.threshold, reference.threshold)
+        self.assertEqual(stump.polarity, reference.polarity)
+      # the files are removed as soon as they are mapped
+      self.assertEqual(os.listdir(temp_dir), [])
+      del trainer, other
+    finally:
+      shutil.rmtree(temp_dir)
+
+
+  def test11_bins(self):
+    # test that the binned stump trainer computes real-valued thresholds
+    numpy.random.seed(13)
+    features = numpy.random.randint(0, 20, (200, 9)).astype(numpy.float64)
+    features[:,4] = numpy.random.randn(200)
+
+    # with enough bins, the same stumps are computed as without binning
+    trainer = bob.learn.boosting.StumpTrainer(number_of_bins = 256)
+    exact = bob.learn.boosting.StumpTrainer()
+    for round in range(3):
+      loss = numpy.random.randn(200, 1)
+      stump = trainer.train(features, loss)
+      reference = exact.train(features, loss)
+      self.assertEqual(stump.feature_indices(), reference.feature_indices())
+      self.assertEqual(stump.threshold, reference.threshold)
+      self.assertEqual(stump.polarity, reference.polarity)
+
+    # with less bins, the thresholds still lie between two feature values
+    trainer = bob.learn.boosting.StumpTrainer(number_of_bins = 8)
+    trainer.prepare(features)
+    self.assertEqual(trainer._bins.dtype, numpy.uint8)
+    self.assertTrue((trainer._bins < 8).all())
+    for round in range(3):
+      loss = numpy.random.randn(200, 1)
+      stump = trainer.train(features, loss)
+      index = stump.feature_indices()[0]
+      self.assertFalse(numpy.any(features[:,index] == stump.threshold))
+      self.assertTrue(features[:,index].min() < stump.threshold < features[:,index].max())
+      # the gain is computed on the original features, and cannot exceed the exact gain
+      gain = abs(numpy.sum(loss[features[:,index] > stump.threshold]))
+      self.assertLessEqual(gain, abs(exact.compute_threshold(features[:,index], -loss)[2]) + 1e-8)
+      # the binned stump is the best stump among the thresholds between the bins
+      gains = [abs(numpy.sum(loss[features[:,i] > t])) for i in range(9) for t in trainer._bin_thresholds[:,i] if not numpy.isnan(t)]
+      self.assertAlmostEqual(gain, max(gains))
+
+    self.assertRaises(ValueError, bob.learn.boosting.StumpTrainer, number_of_bins = 1)
+
+
+  def test12_bins_boosting(self):
+    # test that boosting with binned features works
+    numpy.random.seed(17)
+    features = numpy.random.randn(300, 5)
+    targets = numpy.where(features[:,1] + 0.5 * features[:,3] > 0, 1., -1.)
+    booster = bob.learn.boosting.Boosting(bob.learn.boosting.StumpTrainer(number_of_bins = 16), bob.learn.boosting.ExponentialLoss())
+    machine = booster.train(features, targets, number_of_rounds = 10)
+    predictions = numpy.zeros(300)
+    labels = numpy.zeros(300)
+    machine(features, predictions, labels)
+    self.assertGreater(numpy.mean(labels == targets), 0.9)
+
+
+  def test13_subsampling(self):
+    # test that the stump trainer evaluates only a subset of features and samples
+    numpy.random.seed(21)
+    features = numpy.random.randn(1000, 30)
+    targets = numpy.where(features[:,11] > 0., 1., -1.)
+    loss = -targets * numpy.random.rand(1000)
+
+    for number_of_bins in (None, 32):
+      trainer = bob.learn.boosting.StumpTrainer(number_of_bins = number_of_bins, feature_fraction = 0.2, seed = 5)
+      indices = [trainer.train(features, loss).feature_indices()[0] for round in range(20)]
+      self.assertGreater(len(set(indices)), 1)
+      self.assertIn(11, indices)
+      # the selection is reproducible with the same seed
+      other = bob.learn.boosting.StumpTrainer(number_of_bins = number_of_bins, feature_fraction = 0.2, seed = 5)
+      self.assertEqual(indices, [other.train(features, loss).feature_indices()[0] for round in range(20)])
+
+      # with a fraction of the samples, the informative feature is still found
+      trainer = bob.learn.boosting.StumpTrainer(number_of_bins = number_of_bins, sample_fraction = 0.25)
+      stump = trainer.train(features, loss)
+      self.assertEqual(stump.feature_indices()[0], 11)
+      self.assertLess(abs(stump.threshold), 0.2)
+
+    self.assertRaises(ValueError, bob.learn.boosting.StumpTrainer, feature_fraction = 0.)
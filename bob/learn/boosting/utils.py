@@ -53,3 +53,40 @@ class MNIST:
     return numpy.array(_data, numpy.uint8), numpy.array(_labels, numpy.uint8)
 
 
+
+
+def hdf5_to_memmap(hdf5_file, dataset, memmap_file, dtype = None):
+  """Copies a (large) feature matrix from an HDF5 file into a memory-mapped file, sample by sample.
+
+  The HDF5 dataset is read through :py:class:`bob.io.base.HDF5File`, one row at a time, so that the feature matrix never needs to fit into memory.
+  The returned :py:class:`numpy.memmap` can be used as training features, e.g., in :py:class:`bob.learn.boosting.Boosting`.
+
+  Keyword parameters
+
+    hdf5_file : str or :py:class:`bob.io.base.HDF5File`
+      The HDF5 file to read from
+
+    dataset : str
+      The name of the 2D dataset of shape (#samples, #features) in the HDF5 file
+
+    memmap_file : str
+      The name of the file to write the memory-mapped features into
+
+    dtype : numpy.dtype or None
+      The data type of the memory-mapped features; by default, the data type of the dataset is used
+
+  Returns : numpy.memmap <#samples, #features>
+    The read-only memory-mapped features
+  """
+  if isinstance(hdf5_file, str):
+    hdf5_file = bob.io.base.HDF5File(hdf5_file)
+
+  (data_type, shape), number_of_samples, _ = hdf5_file.describe(dataset)[0]
+  dtype = dtype or data_type
+  features = numpy.memmap(memmap_file, dtype, 'w+', shape = (number_of_samples,) + shape)
+  for i in range(number_of_samples):
+    features[i] = hdf5_file.lread(dataset, i)
+  features.flush()
+  del features
+
+  return numpy.memmap(memmap_file, dtype, 'r', shape = (number_of_samples,) + shape)
@@ -56,11 +56,15 @@ setup(
           "bob/learn/boosting/main.cpp",
           "bob/learn/boosting/loss_function.cpp",
           "bob/learn/boosting/jesorsky_loss.cpp",
+          "bob/learn/boosting/exponential_loss.cpp",
+          "bob/learn/boosting/logit_loss.cpp",
+          "bob/learn/boosting/tangential_loss.cpp",
           "bob/learn/boosting/weak_machine.cpp",
           "bob/learn/boosting/stump_machine.cpp",
           "bob/learn/boosting/lut_machine.cpp",
           "bob/learn/boosting/boosted_machine.cpp",
           "bob/learn/boosting/lut_trainer.cpp",
+          "bob/learn/boosting/stump_trainer.cpp",
 
           # old Library components
           "bob/learn/boosting/cpp/LossFunction.cpp",
@@ -69,12 +73,16 @@ setup(
           "bob/learn/boosting/cpp/LUTMachine.cpp",
           "bob/learn/boosting/cpp/BoostedMachine.cpp",
           "bob/learn/boosting/cpp/LUTTrainer.cpp",
+          "bob/learn/boosting/cpp/StumpTrainer.cpp",
         ],
         bob_packages = bob_packages,
         version = version,
         packages = packages,
         boost_modules = boost_modules,
         include_dirs=[include_dir],
+        # the LUTTrainer uses std::thread
+        extra_compile_args=['-pthread'],
+        extra_link_args=['-pthread'],
       ),
     ],
 
@@ -85,6 +93,8 @@ setup(
     entry_points={
       'console_scripts': [
         'boosting_example.py = bob.learn.boosting.examples.mnist:main',
+        'boosting_benchmark.py = bob.learn.boosting.examples.benchmark:main',
+        'boosting_layout_benchmark.py = bob.learn.boosting.examples.layout_benchmark:main',
       ],
     },
 